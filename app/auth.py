@@ -1,13 +1,26 @@
 """Authentication and user management."""
+import asyncio
 import hashlib
+import hmac
 import secrets
 import json
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict
 from datetime import datetime, timedelta
 import jwt
 
-# Simple file-based user storage (in production, use a database)
+from app.config import settings
+from app.metering import UsageMeter
+from app.user_store import UserStore, open_user_store, api_key_digest, hash_users_file
+
+logger = logging.getLogger(__name__)
+
+# Legacy file-based user storage, still readable by the "json" backend and migrate_users.py
 USERS_FILE = os.path.join(os.path.dirname(__file__), '..', 'users.json')
 SECRET_KEY = os.getenv('JWT_SECRET_KEY', secrets.token_urlsafe(32))
 
@@ -18,47 +31,252 @@ PLAN_LIMITS = {
     'enterprise': float('inf')
 }
 
-def load_users() -> Dict:
-    """Load users from file."""
-    if os.path.exists(USERS_FILE):
-        try:
-            with open(USERS_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            return {}
-    return {}
-
-def save_users(users: Dict):
-    """Save users to file."""
-    os.makedirs(os.path.dirname(USERS_FILE), exist_ok=True)
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+# Rate limits: (requests per second, characters per second); None means unlimited.
+# "system" applies to keys from API_KEYS, "anonymous" to requests without a valid key (per IP).
+PLAN_RATE_LIMITS = {
+    'anonymous': None,
+    'free': (2, 1000),
+    'pro': (10, 10000),
+    'enterprise': (50, 100000),
+    'system': None
+}
+
+_store: Optional[UserStore] = None
+_meter: Optional[UsageMeter] = None
+_store_lock = threading.Lock()
+
+def get_user_store() -> UserStore:
+    """Get the configured user store, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = open_user_store(settings.user_store, settings.user_store_file)
+                if settings.user_store != 'json' and store.count() == 0 and os.path.exists(USERS_FILE):
+                    # First start after upgrading: bring existing accounts along
+                    try:
+                        with open(USERS_FILE, 'r') as f:
+                            imported = store.import_users(json.load(f))
+                        logger.info(f"Imported {imported} users from {USERS_FILE}")
+                        # Do not leave a second copy of the raw keys behind
+                        replaced = hash_users_file(USERS_FILE)
+                        if replaced:
+                            logger.info(f"Replaced {replaced} plaintext API keys in {USERS_FILE} with their digests")
+                    except (OSError, ValueError) as e:
+                        logger.warning(f"Could not import users from {USERS_FILE}: {e}")
+                _store = store
+    return _store
+
+def get_usage_meter() -> UsageMeter:
+    """Get the write-behind usage meter for the configured user store."""
+    global _meter
+    if _meter is None:
+        store = get_user_store()
+        with _store_lock:
+            if _meter is None:
+                _meter = UsageMeter(
+                    store,
+                    flush_interval=settings.usage_flush_interval,
+                    flush_threshold=settings.usage_flush_threshold,
+                    on_flush=_token_cache.invalidate_users
+                )
+    return _meter
+
+def flush_usage():
+    """Write buffered usage to the user store and stop the meter (called on shutdown)."""
+    if _meter is not None:
+        _meter.close()
+
+# Keys from API_KEYS, digested once at import instead of re-splitting the setting per request
+SYSTEM_API_KEY_DIGESTS = frozenset(api_key_digest(key) for key in settings.valid_api_keys or () if key)
+
+def is_system_api_key(api_key: str) -> bool:
+    """Check if a key is one of the configured API_KEYS."""
+    return api_key_digest(api_key) in SYSTEM_API_KEY_DIGESTS
+
+# Fields never kept in in-memory caches of user records
+_SECRET_USER_FIELDS = ('password_hash', 'api_key', 'api_key_hash')
+
+def public_user(user: Dict) -> Dict:
+    """Copy a user record without its password hash and API key (plaintext or digest)."""
+    return {k: v for k, v in user.items() if k not in _SECRET_USER_FIELDS}
+
+class ApiKeyIndex:
+    """
+    In-process map from API key digest to user record.
+
+    Filled from the user store on first use and kept current by create_user()
+    and upgrade_user_plan(). Records are kept without password hash and API
+    key, so the index holds no credentials beyond the digests it is keyed on.
+    Keys missing from the index (for example created by another worker
+    process) fall back to one indexed store lookup and are added on success;
+    configured system keys skip that fallback. Failed lookups are remembered
+    for miss_ttl seconds, so a client retrying an invalid key does not query
+    the store on every request.
+    """
+
+    def __init__(self, miss_ttl: float = 5.0, max_misses: int = 10000):
+        self.miss_ttl = miss_ttl
+        self.max_misses = max_misses
+        self._users: Dict[str, Dict] = {}
+        self._digests: Dict[str, str] = {}  # email -> digest, for refreshes
+        self._misses: "OrderedDict[str, float]" = OrderedDict()  # digest -> expiry
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def lookup(self, api_key: str) -> Optional[Dict]:
+        """Get the user owning an API key."""
+        if not self._loaded:
+            self._load()
+        digest = api_key_digest(api_key)
+        user = self._users.get(digest)
+        if user is None and digest not in SYSTEM_API_KEY_DIGESTS and not self._recent_miss(digest):
+            user = get_user_store().get_by_api_key_hash(digest)
+            if user is not None:
+                self.put(user)
+            else:
+                self._add_miss(digest)
+        return public_user(user) if user is not None else None
+
+    def put(self, user: Dict):
+        """Add or replace a user's entry."""
+        with self._lock:
+            self._put(user)
+
+    def refresh(self, email: str):
+        """Reload a user's entry from the store after it changed."""
+        user = get_user_store().get(email)
+        with self._lock:
+            digest = self._digests.pop(email, None)
+            if digest is not None:
+                self._users.pop(digest, None)
+            if user is not None:
+                self._put(user)
+
+    def _put(self, user: Dict):
+        """Index a user. Caller holds the lock."""
+        digest = user.get('api_key_hash')
+        if not digest:
+            return
+        previous = self._digests.get(user['email'])
+        if previous is not None:
+            self._users.pop(previous, None)
+        self._users[digest] = public_user(user)
+        self._digests[user['email']] = digest
+        self._misses.pop(digest, None)
+
+    def _recent_miss(self, digest: str) -> bool:
+        """Check if a lookup of this digest failed within miss_ttl seconds."""
+        with self._lock:
+            expires_at = self._misses.get(digest)
+            if expires_at is None:
+                return False
+            if time.monotonic() >= expires_at:
+                del self._misses[digest]
+                return False
+            return True
+
+    def _add_miss(self, digest: str):
+        """Remember a failed lookup."""
+        if self.miss_ttl <= 0:
+            return
+        with self._lock:
+            self._misses[digest] = time.monotonic() + self.miss_ttl
+            self._misses.move_to_end(digest)
+            while len(self._misses) > self.max_misses:
+                self._misses.popitem(last=False)
+
+    def _load(self):
+        """Index every user in the store."""
+        with self._lock:
+            if self._loaded:
+                return
+            for user in get_user_store().iter_users():
+                self._put(user)
+            self._loaded = True
+        logger.info(f"API key index loaded: {len(self._users)} users")
+
+_api_key_index = ApiKeyIndex()
+
+def _derive(password: str, scheme: str, cost: int, salt: bytes) -> bytes:
+    """Run the key derivation function for a password hash scheme."""
+    if scheme == 'scrypt':
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=cost, r=8, p=1,
+            maxmem=256 * cost * 8 + 1024 * 1024, dklen=32
+        )
+    if scheme == 'pbkdf2_sha256':
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, cost, dklen=32)
+    raise ValueError(f"Unknown password hash scheme: {scheme}")
+
+def _hash_settings() -> tuple:
+    """Get the configured (scheme, cost) for new password hashes."""
+    if settings.password_hash_scheme == 'pbkdf2_sha256' or not hasattr(hashlib, 'scrypt'):
+        return 'pbkdf2_sha256', settings.password_pbkdf2_iterations
+    return 'scrypt', settings.password_scrypt_n
 
 def hash_password(password: str) -> str:
-    """Hash a password."""
-    return hashlib.sha256(password.encode()).hexdigest()
+    """
+    Hash a password with a salted key derivation function.
+    
+    Returns "<scheme>$<cost>$<salt hex>$<hash hex>", where scheme is scrypt
+    (cost = N) or pbkdf2_sha256 (cost = iterations). This is CPU-heavy by
+    design; call it from run_password_task() in async code.
+    """
+    scheme, cost = _hash_settings()
+    salt = secrets.token_bytes(16)
+    return f"{scheme}${cost}${salt.hex()}${_derive(password, scheme, cost, salt).hex()}"
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verify a password."""
-    return hash_password(password) == hashed
+    """Verify a password against a KDF hash or a legacy unsalted SHA-256 hash."""
+    if '$' not in hashed:
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, hashed)
+    try:
+        scheme, cost, salt, expected = hashed.split('$')
+        derived = _derive(password, scheme, int(cost), bytes.fromhex(salt))
+    except ValueError:
+        return False
+    return hmac.compare_digest(derived.hex(), expected)
+
+def password_needs_rehash(hashed: str) -> bool:
+    """Check if a stored hash is legacy or uses weaker settings than configured."""
+    scheme, cost = _hash_settings()
+    return not hashed.startswith(f"{scheme}${cost}$")
+
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="password-hash"
+)
+
+async def run_password_task(func, *args):
+    """
+    Run password hashing work (signup, login) on a small dedicated thread pool.
+    
+    hashlib releases the GIL while deriving keys, so bursts of logins queue on
+    this pool instead of blocking the event loop or the inference workers.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, func, *args)
 
 def generate_api_key() -> str:
     """Generate a new API key."""
     return secrets.token_urlsafe(32)
 
 def create_user(email: str, password: str, name: str) -> Dict:
-    """Create a new user."""
-    users = load_users()
-    
-    if email in users:
-        raise ValueError("User already exists")
+    """
+    Create a new user.
     
+    Only the API key's digest is stored; the returned record carries the
+    plaintext api_key so it can be shown to the user this one time.
+    """
+    api_key = generate_api_key()
     user = {
         'email': email,
         'name': name,
         'password_hash': hash_password(password),
         'plan': 'free',
-        'api_key': generate_api_key(),
+        'api_key_hash': api_key_digest(api_key),
         'created_at': datetime.now().isoformat(),
         'usage': {
             'used': 0,
@@ -66,108 +284,184 @@ def create_user(email: str, password: str, name: str) -> Dict:
         }
     }
     
-    users[email] = user
-    save_users(users)
-    return user
+    get_user_store().create(user)
+    _api_key_index.put(user)
+    return dict(user, api_key=api_key)
+
+def regenerate_api_key(email: str) -> str:
+    """Replace a user's API key and return the new plaintext key (only its digest is stored)."""
+    api_key = generate_api_key()
+    get_user_store().update(email, api_key_hash=api_key_digest(api_key))
+    _api_key_index.refresh(email)
+    _token_cache.invalidate_users([email])
+    return api_key
 
 def authenticate_user(email: str, password: str) -> Optional[Dict]:
     """Authenticate a user."""
-    users = load_users()
+    user = get_user_store().get(email)
     
-    if email not in users:
+    if not user:
         return None
     
-    user = users[email]
     if not verify_password(password, user['password_hash']):
         return None
     
+    # Transparently move legacy SHA-256 (or weaker KDF) hashes to the current settings
+    if password_needs_rehash(user['password_hash']):
+        user['password_hash'] = hash_password(password)
+        get_user_store().update(email, password_hash=user['password_hash'])
+        _api_key_index.refresh(email)
+    
     return user
 
 def get_user(email: str) -> Optional[Dict]:
     """Get user by email."""
-    users = load_users()
-    return users.get(email)
+    return get_user_store().get(email)
 
-def update_user_usage(email: str, characters: int):
-    """Update user usage."""
-    users = load_users()
+def _plan_limit(plan: str) -> float:
+    """Get the monthly character limit of a plan."""
+    return PLAN_LIMITS.get(plan, PLAN_LIMITS['free'])
+
+class QuotaLedger:
+    """
+    Per-user quota state cached in memory.
     
-    if email not in users:
-        return
+    Each entry holds the user's plan, characters used in the current period
+    (including usage not yet flushed by the usage meter), characters reserved
+    by requests in flight, and the period's reset date. reserve() checks and
+    books characters in one step under a lock, so concurrent requests cannot
+    overshoot the plan limit; commit() turns a reservation into usage and
+    refunds whatever was not used. Entries are reloaded from the store after
+    QUOTA_CACHE_TTL seconds to pick up usage recorded by other processes.
+    """
     
-    user = users[email]
-    usage = user['usage']
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
     
-    # Reset if past reset date
-    reset_date = datetime.fromisoformat(usage['reset_date'])
-    if datetime.now() > reset_date:
-        usage['used'] = 0
-        usage['reset_date'] = (datetime.now() + timedelta(days=30)).isoformat()
+    def reserve(self, email: str, characters: int) -> bool:
+        """Book characters for a request. Returns False if the user is unknown or over the limit."""
+        with self._lock:
+            entry = self._entry(email)
+            if entry is None:
+                return False
+            if entry['used'] + entry['reserved'] + characters > entry['limit']:
+                return False
+            entry['reserved'] += characters
+            return True
     
-    usage['used'] += characters
-    save_users(users)
-
-def check_usage_limit(email: str, characters: int) -> bool:
-    """Check if user has enough usage limit."""
-    users = load_users()
+    def commit(self, email: str, reserved: int, used: int):
+        """Settle a reservation: record the characters actually used and refund the rest."""
+        with self._lock:
+            entry = self._entry(email)
+            if entry is None:
+                return
+            entry['reserved'] = max(0, entry['reserved'] - reserved)
+            if used > 0:
+                entry['used'] += used
+                get_usage_meter().add(email, used)
     
-    if email not in users:
-        return False
+    def has_room(self, email: str, characters: int) -> bool:
+        """Check if characters would fit within the limit, without reserving them."""
+        with self._lock:
+            entry = self._entry(email)
+            return entry is not None and entry['used'] + entry['reserved'] + characters <= entry['limit']
+    
+    def usage(self, email: str) -> Optional[Dict]:
+        """Get a snapshot of a user's quota entry."""
+        with self._lock:
+            entry = self._entry(email)
+            return dict(entry) if entry is not None else None
     
-    user = users[email]
-    plan = user.get('plan', 'free')
-    limit = PLAN_LIMITS.get(plan, PLAN_LIMITS['free'])
+    def invalidate(self, email: str):
+        """Reload a user's plan and usage on next access, keeping reservations in flight."""
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None:
+                entry['loaded_at'] = 0.0
     
-    if limit == float('inf'):
-        return True
+    def _entry(self, email: str) -> Optional[Dict]:
+        """Get a fresh entry for a user. Caller holds the lock."""
+        entry = self._entries.get(email)
+        now = time.monotonic()
+        if entry is None or now - entry['loaded_at'] > self.ttl:
+            user = get_usage_meter().stored_usage(email)
+            if user is None:
+                self._entries.pop(email, None)
+                return None
+            entry = {
+                'plan': user.get('plan', 'free'),
+                'limit': _plan_limit(user.get('plan', 'free')),
+                'used': user['usage']['used'],
+                'reset_date': user['usage'].get('reset_date'),
+                'reserved': entry['reserved'] if entry is not None else 0,
+                'loaded_at': now
+            }
+            self._entries[email] = entry
+        self._start_new_period_if_due(email, entry)
+        return entry
     
-    usage = user['usage']
+    def _start_new_period_if_due(self, email: str, entry: Dict):
+        """Monthly reset: zero usage once the reset date has passed. Caller holds the lock."""
+        try:
+            due = datetime.now() > datetime.fromisoformat(entry['reset_date'])
+        except (TypeError, ValueError):
+            due = True
+        if due:
+            entry['used'] = 0
+            entry['reset_date'] = (datetime.now() + timedelta(days=30)).isoformat()
+            get_usage_meter().discard(email)
+            get_user_store().reset_usage(email, entry['reset_date'])
+
+_quota = QuotaLedger(ttl=settings.quota_cache_ttl)
+
+def reserve_usage(email: str, characters: int) -> bool:
+    """
+    Reserve characters before doing work for a user.
     
-    # Reset if past reset date
-    reset_date = datetime.fromisoformat(usage['reset_date'])
-    if datetime.now() > reset_date:
-        usage['used'] = 0
-        usage['reset_date'] = (datetime.now() + timedelta(days=30)).isoformat()
-        save_users(users)
+    Every successful reservation must be settled with commit_usage(), also
+    when the work fails (commit 0 characters to refund it).
     
-    return (usage['used'] + characters) <= limit
+    Returns:
+        False if the user does not exist or the plan limit would be exceeded
+    """
+    return _quota.reserve(email, characters)
+
+def commit_usage(email: str, reserved: int, used: int):
+    """Settle a reservation made with reserve_usage(), refunding reserved - used characters."""
+    _quota.commit(email, reserved, used)
+
+def update_user_usage(email: str, characters: int):
+    """Update user usage."""
+    _quota.commit(email, 0, characters)
+
+def check_usage_limit(email: str, characters: int) -> bool:
+    """Check if user has enough usage limit."""
+    return _quota.has_room(email, characters)
 
 def get_user_usage(email: str) -> Dict:
     """Get user usage information."""
-    users = load_users()
+    entry = _quota.usage(email)
     
-    if email not in users:
+    if not entry:
         return {'used': 0, 'limit': PLAN_LIMITS['free']}
     
-    user = users[email]
-    plan = user.get('plan', 'free')
-    limit = PLAN_LIMITS.get(plan, PLAN_LIMITS['free'])
-    usage = user['usage']
-    
-    # Reset if past reset date
-    reset_date = datetime.fromisoformat(usage['reset_date'])
-    if datetime.now() > reset_date:
-        usage['used'] = 0
-        usage['reset_date'] = (datetime.now() + timedelta(days=30)).isoformat()
-        save_users(users)
-    
+    limit = entry['limit']
     return {
-        'used': usage['used'],
+        'used': entry['used'],
         'limit': limit if limit != float('inf') else 999999999
     }
 
 def upgrade_user_plan(email: str, plan: str):
     """Upgrade user plan."""
-    users = load_users()
-    
-    if email not in users:
-        raise ValueError("User not found")
-    
     if plan not in PLAN_LIMITS:
         raise ValueError("Invalid plan")
     
-    users[email]['plan'] = plan
-    save_users(users)
+    get_user_store().update(email, plan=plan)
+    _api_key_index.refresh(email)
+    _quota.invalidate(email)
+    _token_cache.invalidate_users([email])
 
 def generate_token(user: Dict) -> str:
     """Generate JWT token."""
@@ -185,11 +479,79 @@ def verify_token(token: str) -> Optional[str]:
     except:
         return None
 
+class TokenCache:
+    """
+    Short-lived cache of verified JWTs and the user each one resolves to.
+    
+    Dashboard pages poll with the same token every few seconds; a hit skips
+    both the signature check and the user store read. Entries expire after
+    TOKEN_CACHE_TTL seconds or with the token itself, and are dropped when the
+    user's plan changes or their usage is flushed.
+    """
+    
+    def __init__(self, ttl: float = 30.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, token: str) -> Optional[Dict]:
+        """Get the cached user for a token, or None on a miss."""
+        key = api_key_digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if now - entry['cached_at'] > self.ttl or now >= entry['expires_at']:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(entry['user'])
+    
+    def put(self, token: str, expires_at: float, user: Dict):
+        """Cache the user a verified token resolved to."""
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[api_key_digest(token)] = {
+                'email': user['email'],
+                'user': public_user(user),
+                'expires_at': expires_at,
+                'cached_at': time.time()
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate_users(self, emails):
+        """Drop every cached token belonging to the given users."""
+        emails = set(emails)
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry['email'] in emails]:
+                del self._entries[key]
+
+_token_cache = TokenCache(ttl=settings.token_cache_ttl)
+
+def get_user_by_token(token: str) -> Optional[Dict]:
+    """Verify a JWT and return its user, using the token cache when possible."""
+    user = _token_cache.get(token)
+    if user is not None:
+        return user
+    
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=['HS256'])
+    except jwt.PyJWTError:
+        return None
+    email = payload.get('email')
+    if not email:
+        return None
+    
+    user = get_user(email)
+    if user is None:
+        return None
+    _token_cache.put(token, float(payload.get('exp', time.time() + _token_cache.ttl)), user)
+    return public_user(user)
+
 def get_user_by_api_key(api_key: str) -> Optional[Dict]:
     """Get user by API key."""
-    users = load_users()
-    for user in users.values():
-        if user.get('api_key') == api_key:
-            return user
-    return None
-
+    return _api_key_index.lookup(api_key)
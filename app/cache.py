@@ -0,0 +1,238 @@
+"""Translation result cache with an in-memory LRU tier and an optional SQLite tier."""
+from typing import Optional, Dict, Any
+from collections import OrderedDict
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Prune the disk tier once every this many writes
+_DISK_PRUNE_INTERVAL = 1000
+
+
+def make_cache_key(text: str, source: str, target: str, model_version: str) -> str:
+    """
+    Build a content-addressed cache key.
+
+    Args:
+        text: Text being translated (Unicode-normalized before hashing)
+        source: Source language code
+        target: Target language code
+        model_version: Version string of the package(s) used for the pair
+
+    Returns:
+        Hex SHA-256 digest identifying the translation
+    """
+    normalized = unicodedata.normalize("NFC", text)
+    digest = hashlib.sha256()
+    for part in (source, target, model_version, normalized):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class TranslationCache:
+    """
+    Thread-safe LRU cache of translation results.
+
+    Entries live in a bounded in-memory OrderedDict. When a disk path is given,
+    entries are also written to a SQLite database so they survive restarts;
+    memory misses fall through to disk and are promoted back into memory.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        disk_path: Optional[str] = None,
+        disk_max_entries: int = 1000000
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept in memory
+            disk_path: SQLite file for the persistent tier (None disables it)
+            disk_max_entries: Maximum number of entries kept on disk
+        """
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+        self._fingerprint: Optional[str] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+                self._db = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute("PRAGMA synchronous=NORMAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS translations ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, accessed_at REAL NOT NULL)"
+                )
+                self._db.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_translations_accessed ON translations (accessed_at)"
+                )
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+                )
+                logger.info(f"Translation cache disk tier: {disk_path}")
+            except sqlite3.Error as e:
+                logger.warning(f"Could not open translation cache at {disk_path}, using memory only: {e}")
+                self._db = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.max_entries > 0 or self._db is not None
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached translation for key, or None on a miss."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value FROM translations WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"Translation cache read failed: {e}")
+                    row = None
+                if row is not None:
+                    try:
+                        self._db.execute(
+                            "UPDATE translations SET accessed_at = ? WHERE key = ?", (time.time(), key)
+                        )
+                    except sqlite3.Error:
+                        pass
+                    self.disk_hits += 1
+                    self.hits += 1
+                    self._remember(key, row[0])
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """Store a translation in every enabled tier."""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO translations (key, value, accessed_at) VALUES (?, ?, ?)",
+                        (key, value, time.time())
+                    )
+                    self._disk_writes += 1
+                    if self._disk_writes % _DISK_PRUNE_INTERVAL == 0:
+                        self._prune_disk()
+                except sqlite3.Error as e:
+                    logger.warning(f"Translation cache write failed: {e}")
+
+    def clear(self):
+        """Drop every cached entry from all tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM translations")
+                except sqlite3.Error as e:
+                    logger.warning(f"Translation cache clear failed: {e}")
+        logger.info("Translation cache cleared")
+
+    def sync_fingerprint(self, fingerprint: str) -> bool:
+        """
+        Invalidate the cache if the installed package set changed.
+
+        Args:
+            fingerprint: Digest of the installed (from, to, version) packages
+
+        Returns:
+            True if the cache was cleared
+        """
+        with self._lock:
+            previous = self._fingerprint
+            if previous is None and self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value FROM meta WHERE name = 'fingerprint'"
+                    ).fetchone()
+                    previous = row[0] if row else None
+                except sqlite3.Error:
+                    previous = None
+            self._fingerprint = fingerprint
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO meta (name, value) VALUES ('fingerprint', ?)",
+                        (fingerprint,)
+                    )
+                except sqlite3.Error as e:
+                    logger.warning(f"Translation cache fingerprint write failed: {e}")
+
+        if previous is not None and previous != fingerprint:
+            logger.info("Installed packages changed, invalidating translation cache")
+            self.clear()
+            return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes."""
+        with self._lock:
+            disk_entries = None
+            if self._db is not None:
+                try:
+                    disk_entries = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+                except sqlite3.Error:
+                    disk_entries = None
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_max_entries": self.max_entries,
+                "disk_path": self.disk_path if self._db is not None else None,
+                "disk_entries": disk_entries
+            }
+
+    def _remember(self, key: str, value: str):
+        """Insert into the memory tier, evicting least recently used entries. Caller holds the lock."""
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune_disk(self):
+        """Trim the disk tier to disk_max_entries, oldest first. Caller holds the lock."""
+        self._db.execute(
+            "DELETE FROM translations WHERE key IN ("
+            "SELECT key FROM translations ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
@@ -1,6 +1,6 @@
 """Configuration management for the LibreTranslate server."""
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 import os
 
 
@@ -15,16 +15,70 @@ class Settings(BaseSettings):
     load_only: Optional[str] = None
     update_models: bool = False
     auto_install_models: bool = True  # Auto-install models if missing
+    install_concurrency: int = 4  # Packages downloaded in parallel when installing models
+    
+    # Inference Configuration
+    inference_backend: str = "thread"  # "thread" (shared models) or "process" (one warm copy per worker)
+    inference_workers: Optional[int] = None  # Defaults to the number of CPU cores
+    inference_queue_size: int = 64  # Requests allowed to wait once all workers are busy
+    batch_max_items: int = 500  # Maximum segments per /translate/batch request
+    stream_chunk_chars: int = 400  # Sentences are grouped up to this size per /translate/stream message
+    languages_cache_max_age: int = 300  # Cache-Control max-age (seconds) of /languages responses
+    
+    # Translation Result Cache
+    translation_cache_size: int = 10000  # In-memory LRU entries (0 disables)
+    translation_cache_persist: bool = False  # Keep a SQLite copy that survives restarts
+    translation_cache_path: Optional[str] = None  # Defaults to <model_directory>/translation_cache.sqlite3
+    sentence_cache_size: int = 50000  # Translated sentences kept in memory (0 disables sentence-level caching)
+    
+    # Readiness (/ready)
+    ready_max_queue_ratio: float = 0.9  # Not ready once the inference queue is this full
+    ready_max_p99_ms: Optional[float] = None  # Not ready while recent p99 latency exceeds this
+    ready_latency_window: float = 60.0  # Seconds of latency history used for p50/p99
+    
+    # Warm-up
+    warmup_pairs: Optional[str] = None  # Pairs to preload at startup, e.g. "en-es,es-en"
+    warmup_top_pairs: int = 10  # Without WARMUP_PAIRS, preload the busiest pairs of the previous run
+    warmup_concurrency: int = 4  # Models loaded in parallel during warm-up
+    traffic_stats_path: Optional[str] = None  # Defaults to <model_directory>/traffic_stats.json
+    
+    # Model Residency
+    model_memory_budget: Optional[str] = None  # e.g. "6GB"; least recently used models are unloaded beyond it
+    
+    # Pivot Routing
+    route_quality_scores: Optional[str] = None  # Per-package quality, e.g. "en-es:0.9,de-en:0.8"
     
     # API Configuration
     api_key_required: bool = False
     api_keys: Optional[str] = None
     
+    # User Accounts
+    user_store: str = "sqlite"  # "sqlite" (indexed, WAL) or "json" (legacy users.json)
+    user_store_path: Optional[str] = None  # Defaults to users.sqlite3 / users.json in the project root
+    password_hash_scheme: str = "scrypt"  # "scrypt" or "pbkdf2_sha256"
+    password_scrypt_n: int = 16384  # scrypt CPU/memory cost (power of two)
+    password_pbkdf2_iterations: int = 600000  # PBKDF2-HMAC-SHA256 iterations
+    password_hash_workers: int = 2  # Threads hashing passwords for signup/login
+    usage_flush_interval: float = 5.0  # Seconds between batched writes of usage counters
+    usage_flush_threshold: int = 100  # Buffered usage updates that wake the background writer early
+    token_cache_ttl: float = 30.0  # Seconds a verified login token and its user are cached (0 disables)
+    quota_cache_ttl: float = 30.0  # Seconds a cached plan/usage record is trusted before re-reading the store
+    
+    # Rate Limiting
+    rate_limit_enabled: bool = True
+    rate_limits: Optional[str] = None  # Per-plan overrides, e.g. "free:2/1000,pro:10/10000,anonymous:1/500"
+    rate_limit_burst: float = 2.0  # Seconds of traffic a client may send in one burst
+    rate_limit_backend: str = "memory"  # "memory" (per process) or "sqlite" (shared by workers on this host)
+    rate_limit_path: Optional[str] = None  # Defaults to <model_directory>/rate_limits.sqlite3
+    max_request_body_bytes: int = 10 * 1024 * 1024  # Larger translate/detect bodies are rejected with 413
+    
     # CORS Configuration
     cors_origins: str = "*"  # Default: allow all. Set to frontend domain for production (e.g., "https://translate.shravani.group")
     
     # Model Storage (for Coolify/persistent volumes)
     model_directory: Optional[str] = None
+    package_manifest_path: Optional[str] = None  # Defaults to <model_directory>/package_manifest.json
+    language_profiles_path: Optional[str] = None  # Defaults to <model_directory>/language_profiles.json
     
     class Config:
         env_file = ".env"
@@ -45,6 +99,109 @@ class Settings(BaseSettings):
             return [key.strip() for key in self.api_keys.split(",")]
         return None
     
+    @property
+    def route_quality_map(self) -> Dict[str, float]:
+        """Get per-package quality scores keyed by "from-to"."""
+        scores = {}
+        if self.route_quality_scores:
+            for entry in self.route_quality_scores.split(","):
+                pair, _, score = entry.strip().partition(":")
+                if pair and score:
+                    scores[pair.strip()] = float(score)
+        return scores
+    
+    @property
+    def warmup_pair_list(self) -> List[Tuple[str, str]]:
+        """Get the configured warm-up pairs as (source, target) tuples."""
+        pairs = []
+        if self.warmup_pairs:
+            for entry in self.warmup_pairs.split(","):
+                source, _, target = entry.strip().partition("-")
+                if source and target:
+                    pairs.append((source.strip(), target.strip()))
+        return pairs
+    
+    @property
+    def traffic_stats_file(self) -> str:
+        """Get the file used to persist per-pair traffic counts between runs."""
+        if self.traffic_stats_path:
+            return self.traffic_stats_path
+        base_dir = self.model_directory or os.path.expanduser('~/.local/share/argos-translate')
+        return os.path.join(base_dir, "traffic_stats.json")
+    
+    @property
+    def package_manifest_file(self) -> str:
+        """Get the file recording installed packages, read at startup instead of scanning them."""
+        if self.package_manifest_path:
+            return self.package_manifest_path
+        base_dir = self.model_directory or os.path.expanduser('~/.local/share/argos-translate')
+        return os.path.join(base_dir, "package_manifest.json")
+    
+    @property
+    def language_profiles_file(self) -> str:
+        """Get the file holding the sample text language detection profiles are built from."""
+        if self.language_profiles_path:
+            return self.language_profiles_path
+        base_dir = self.model_directory or os.path.expanduser('~/.local/share/argos-translate')
+        return os.path.join(base_dir, "language_profiles.json")
+    
+    @property
+    def model_memory_budget_bytes(self) -> Optional[int]:
+        """Get the model memory budget in bytes (accepts plain bytes or KB/MB/GB suffixes)."""
+        if not self.model_memory_budget:
+            return None
+        value = self.model_memory_budget.strip().upper().rstrip("B")
+        multipliers = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+        if value and value[-1] in multipliers:
+            return int(float(value[:-1]) * multipliers[value[-1]])
+        return int(value)
+    
+    @property
+    def translation_cache_file(self) -> Optional[str]:
+        """Get the SQLite file for the persistent translation cache, if enabled."""
+        if not self.translation_cache_persist:
+            return None
+        if self.translation_cache_path:
+            return self.translation_cache_path
+        base_dir = self.model_directory or os.path.expanduser('~/.local/share/argos-translate')
+        return os.path.join(base_dir, "translation_cache.sqlite3")
+    
+    @property
+    def rate_limit_map(self) -> Dict[str, Optional[Tuple[float, float]]]:
+        """Get per-plan (requests/sec, characters/sec) overrides; "none" or 0 disables a limit."""
+        limits = {}
+        if self.rate_limits:
+            for entry in self.rate_limits.split(","):
+                plan, _, value = entry.strip().partition(":")
+                if not plan or not value:
+                    continue
+                if value.strip().lower() == "none":
+                    limits[plan.strip()] = None
+                    continue
+                rates = tuple(
+                    float(part) if part.strip() and part.strip().lower() != "none" else 0.0
+                    for part in (value.partition("/")[0], value.partition("/")[2])
+                )
+                limits[plan.strip()] = rates if any(rates) else None
+        return limits
+    
+    @property
+    def rate_limit_file(self) -> str:
+        """Get the SQLite file shared by workers when RATE_LIMIT_BACKEND=sqlite."""
+        if self.rate_limit_path:
+            return self.rate_limit_path
+        base_dir = self.model_directory or os.path.expanduser('~/.local/share/argos-translate')
+        return os.path.join(base_dir, "rate_limits.sqlite3")
+    
+    @property
+    def user_store_file(self) -> str:
+        """Get the file backing the user store."""
+        if self.user_store_path:
+            return self.user_store_path
+        project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        filename = "users.json" if self.user_store == "json" else "users.sqlite3"
+        return os.path.join(project_dir, filename)
+    
     @property
     def cors_origins_list(self) -> List[str]:
         """Get CORS origins as a list."""
@@ -0,0 +1,358 @@
+"""Inference worker pool that keeps blocking translation calls off the event loop."""
+from typing import Optional, List, Dict, Any, Tuple
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Translation service owned by a worker process (process backend only)
+_worker_service = None
+# Package generation the worker's service was last loaded at
+_worker_generation = 0
+# Report of the warm-up the worker ran while starting (process backend only)
+_worker_warmup: Optional[Dict[str, Any]] = None
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue is at capacity and the request is rejected."""
+
+
+def _init_worker(
+    service_options: Dict[str, Any],
+    warmup_pairs: Optional[List[Tuple[str, str]]] = None,
+    warmup_concurrency: int = 4
+):
+    """
+    Load a TranslationService once per worker process so models stay warm.
+
+    The pool runs this in every worker it starts, so warming up here is the
+    one way to be sure each worker, not just some of them, loads the hot pairs.
+    """
+    global _worker_service, _worker_warmup
+    from app.translation import TranslationService
+
+    _worker_service = TranslationService(**service_options)
+    _worker_service.initialize(update_models=False)
+    if warmup_pairs:
+        try:
+            _worker_warmup = _worker_service.warm_up(warmup_pairs, warmup_concurrency)
+        except Exception as e:
+            _worker_warmup = {"error": str(e)}
+
+
+def _worker_status() -> Dict[str, int]:
+    """Identify the worker and count its loaded models, sent back with every call."""
+    return {"pid": os.getpid(), "loaded_models": _worker_service.loaded_model_count()}
+
+
+def _worker_report(method: Optional[str], hold: float) -> Tuple[Any, Dict[str, int]]:
+    """
+    Get a report from this worker: its start-up warm-up report (method None)
+    or the result of a TranslationService stats method.
+
+    Holding the worker briefly makes concurrent calls spread over idle workers.
+    """
+    time.sleep(hold)
+    report = _worker_warmup if method is None else getattr(_worker_service, method)()
+    return report, _worker_status()
+
+
+def _call_worker(method: str, args: tuple, kwargs: Dict[str, Any], generation: int = 0) -> Tuple[Any, Dict]:
+    """
+    Run a TranslationService method inside a worker process.
+
+    A worker behind the parent's package generation rescans the installed
+    packages first, so models installed after the pool started are picked up.
+
+    Returns:
+        (method result, per-pair request counts of the call, worker status) so
+        the parent can keep the traffic stats that pick warm-up pairs on the
+        next start and report how many models each worker has loaded
+    """
+    global _worker_generation
+    if generation > _worker_generation:
+        _worker_service.reload_packages()
+        _worker_generation = generation
+    result = getattr(_worker_service, method)(*args, **kwargs)
+    return result, _worker_service.take_traffic(), _worker_status()
+
+
+class InferenceExecutor:
+    """
+    Bounded executor for TranslationService calls.
+
+    Argos/CTranslate2 inference is synchronous, so every call is dispatched to a
+    thread or process pool. The number of requests waiting or running is capped;
+    once the cap is reached new work is rejected with InferenceQueueFull instead
+    of piling up behind the slowest request in flight.
+    """
+
+    BACKENDS = ("thread", "process")
+
+    def __init__(
+        self,
+        service: Any,
+        backend: str = "thread",
+        workers: Optional[int] = None,
+        queue_size: int = 64
+    ):
+        """
+        Initialize the inference executor.
+
+        Args:
+            service: TranslationService used directly by the thread backend
+            backend: 'thread' (shared service) or 'process' (one warm service per worker)
+            workers: Number of workers (defaults to the CPU count)
+            queue_size: Number of requests allowed to wait once all workers are busy
+        """
+        if backend not in self.BACKENDS:
+            logger.warning(f"Unknown inference backend '{backend}', falling back to 'thread'")
+            backend = "thread"
+
+        self.service = service
+        self.backend = backend
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = max(0, queue_size)
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._generation = 0
+        self._worker_loaded: Dict[int, int] = {}  # pid -> loaded models (process backend)
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of requests that may be running or queued at once."""
+        return self.workers + self.queue_size
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests currently running or waiting for a worker."""
+        return self._pending
+
+    def start(self, warmup_pairs: Optional[List[Tuple[str, str]]] = None, warmup_concurrency: int = 4):
+        """
+        Create the underlying worker pool.
+
+        Args:
+            warmup_pairs: Pairs every worker process warms up as it starts
+                (process backend; the thread backend is warmed by warm_up())
+            warmup_concurrency: Models loaded at the same time in each worker
+        """
+        if self._executor is not None:
+            return
+
+        if self.backend == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.service.options, list(warmup_pairs or ()), warmup_concurrency)
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="inference"
+            )
+        logger.info(
+            f"Inference executor started: backend={self.backend}, "
+            f"workers={self.workers}, queue_size={self.queue_size}"
+        )
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker pool."""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._executor = None
+        logger.info("Inference executor stopped")
+
+    def packages_changed(self):
+        """
+        Tell the workers that installed packages changed.
+
+        The thread backend shares the service that was reloaded in place.
+        Process workers reload their own service before their next call.
+        """
+        self._generation += 1
+
+    async def warm_up(self, pairs: List[Tuple[str, str]], concurrency: int = 4) -> Dict[str, Any]:
+        """
+        Warm up models in every worker.
+
+        The thread backend shares one service, so it is warmed once. Process
+        workers warm themselves as they start, with the pairs given to start()
+        (which is called with pairs and concurrency here if the pool is not
+        running yet); this waits until every worker has reported and merges
+        the reports, so a worker that failed to warm up is not hidden behind
+        one that succeeded. Warm-up does not count against the request queue.
+
+        Args:
+            pairs: (source, target) language pairs to warm up
+            concurrency: Number of models loaded at the same time in each worker
+
+        Returns:
+            Warm-up report from TranslationService.warm_up(); with the process
+            backend failures are keyed "<pair>@<worker pid>" and "workers" counts
+            the workers that reported
+        """
+        if self._executor is None:
+            self.start(pairs, concurrency)
+
+        loop = asyncio.get_running_loop()
+        if self.backend != "process":
+            return await loop.run_in_executor(self._executor, partial(self.service.warm_up, pairs, concurrency))
+
+        started = time.perf_counter()
+        reports = await self._ask_every_worker(None, hold=0.05)
+        return self._merge_warmup_reports(pairs, reports, time.perf_counter() - started)
+
+    async def collect(self, method: str) -> Dict[int, Any]:
+        """
+        Call a TranslationService stats method in every worker process.
+
+        Stats such as loaded models and cache counters live in the workers
+        with the process backend; the server process serves no translations.
+
+        Args:
+            method: Name of a TranslationService method without arguments
+
+        Returns:
+            Result per worker pid
+        """
+        if self._executor is None:
+            self.start()
+        return await self._ask_every_worker(method, hold=0.01)
+
+    def loaded_models_per_worker(self) -> Dict[int, int]:
+        """Models loaded in each worker process, as of its last call (process backend)."""
+        return dict(self._worker_loaded)
+
+    async def _ask_every_worker(self, method: Optional[str], hold: float) -> Dict[int, Any]:
+        """Run _worker_report until every worker process has answered."""
+        # A worker only takes a call once its initializer (and warm-up) finished,
+        # so keep asking until every worker process has answered
+        loop = asyncio.get_running_loop()
+        reports: Dict[int, Any] = {}
+        while len(reports) < self.workers:
+            answers = await asyncio.gather(*(
+                loop.run_in_executor(self._executor, _worker_report, method, hold)
+                for _ in range(self.workers)
+            ))
+            for report, status in answers:
+                reports[status["pid"]] = report
+                self._worker_loaded[status["pid"]] = status["loaded_models"]
+        return reports
+
+    @staticmethod
+    def _merge_warmup_reports(
+        pairs: List[Tuple[str, str]],
+        reports: Dict[int, Optional[Dict[str, Any]]],
+        elapsed: float
+    ) -> Dict[str, Any]:
+        """Combine the warm-up reports of all worker processes."""
+        models: List[str] = []
+        failed: Dict[str, str] = {}
+        seconds = elapsed
+        for pid, report in sorted(reports.items()):
+            if not report:
+                continue
+            seconds = max(seconds, report.get("seconds", 0.0))
+            if "error" in report:
+                failed[f"*@{pid}"] = report["error"]
+            for model in report.get("models", []):
+                if model not in models:
+                    models.append(model)
+            for model, error in report.get("failed", {}).items():
+                failed[f"{model}@{pid}"] = error
+        return {
+            "pairs": [f"{source}->{target}" for source, target in pairs],
+            "models": models,
+            "failed": failed,
+            "workers": len(reports),
+            "seconds": round(seconds, 2)
+        }
+
+    async def run_background(self, method: str, *args, **kwargs) -> Any:
+        """
+        Run maintenance work (such as a language profile build step) on the worker pool.
+
+        Like warm-up it does not count against the request queue; callers send
+        one short call at a time, so it occupies at most one worker while live
+        requests keep the others. With the process backend the call runs in a
+        worker process, never in the server process.
+
+        Args:
+            method: Name of the TranslationService method to call
+            *args: Positional arguments for the method
+            **kwargs: Keyword arguments for the method
+
+        Returns:
+            The method's return value
+        """
+        if self._executor is None:
+            self.start()
+
+        loop = asyncio.get_running_loop()
+        if self.backend == "process":
+            call = partial(_call_worker, method, args, kwargs, self._generation)
+        else:
+            call = partial(getattr(self.service, method), *args, **kwargs)
+        return self._result(await loop.run_in_executor(self._executor, call))
+
+    async def submit(self, method: str, *args, **kwargs) -> Any:
+        """
+        Run a TranslationService method on the worker pool.
+
+        Args:
+            method: Name of the TranslationService method to call
+            *args: Positional arguments for the method
+            **kwargs: Keyword arguments for the method
+
+        Returns:
+            The method's return value
+
+        Raises:
+            InferenceQueueFull: If the queue is at capacity
+        """
+        if self._executor is None:
+            self.start()
+
+        # Only touched from the event loop thread, so no lock is needed
+        if self._pending >= self.capacity:
+            raise InferenceQueueFull(
+                f"Inference queue is full ({self._pending}/{self.capacity})"
+            )
+
+        loop = asyncio.get_running_loop()
+        if self.backend == "process":
+            call = partial(_call_worker, method, args, kwargs, self._generation)
+        else:
+            call = partial(getattr(self.service, method), *args, **kwargs)
+        future = self._executor.submit(call)
+        self._pending += 1
+        # A cancelled caller stops waiting but cannot stop a running call, so the
+        # slot is released when the work itself finishes, not when the caller leaves
+        future.add_done_callback(partial(self._release, loop))
+        return self._result(await asyncio.wrap_future(future, loop=loop))
+
+    def _result(self, value: Any) -> Any:
+        """Unpack a worker process result, adding its traffic to the parent's stats."""
+        if self.backend != "process":
+            return value
+        result, traffic, status = value
+        self.service.record_traffic(traffic)
+        self._worker_loaded[status["pid"]] = status["loaded_models"]
+        return result
+
+    def _release(self, loop: asyncio.AbstractEventLoop, _future: Any):
+        """Give back a queue slot; runs in the worker (or a pool thread) when a call finishes."""
+        try:
+            loop.call_soon_threadsafe(self._decrement_pending)
+        except RuntimeError:
+            # Event loop already closed (shutdown)
+            self._decrement_pending()
+
+    def _decrement_pending(self):
+        self._pending -= 1
@@ -0,0 +1,380 @@
+"""Parallel, resumable installation of Argos Translate packages."""
+from typing import Optional, Dict, Any, List, Tuple, Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+try:
+    import argostranslate.package
+    import argostranslate.settings
+except ImportError:
+    argostranslate = None
+
+# Bytes read per network round trip
+_CHUNK_SIZE = 1024 * 1024
+_USER_AGENT = "ArgosTranslate"
+
+
+class InstallCancelled(Exception):
+    """Raised inside workers when an installation is cancelled."""
+
+
+def package_label(pkg: Any) -> str:
+    """Human-readable name of a package, e.g. "en -> es"."""
+    if getattr(pkg, "type", "translate") != "translate":
+        return f"{pkg.type}:{getattr(pkg, 'code', None) or pkg.from_code}"
+    return f"{pkg.from_code} -> {pkg.to_code}"
+
+
+def package_key(pkg: Any) -> Tuple[str, str, str, str]:
+    """Identity of a package release: (type, from_code, to_code, version)."""
+    return (
+        getattr(pkg, "type", "translate"),
+        pkg.from_code or "",
+        pkg.to_code or "",
+        str(getattr(pkg, "package_version", "") or "")
+    )
+
+
+def select_packages(
+    packages: Iterable[Any],
+    languages: Optional[List[str]] = None,
+    match: str = "both"
+) -> List[Any]:
+    """
+    Filter available translation packages by language.
+
+    Args:
+        packages: Available packages
+        languages: Language codes to keep (None keeps everything)
+        match: "both" keeps packages whose source and target are listed,
+            "any" keeps packages with either side listed
+
+    Returns:
+        Matching packages
+    """
+    if not languages:
+        return list(packages)
+    wanted = set(languages)
+    if match == "any":
+        return [pkg for pkg in packages if pkg.from_code in wanted or pkg.to_code in wanted]
+    return [pkg for pkg in packages if pkg.from_code in wanted and pkg.to_code in wanted]
+
+
+class PackageInstaller:
+    """
+    Downloads and installs packages concurrently.
+
+    - Up to `concurrency` packages download at once; extraction is serialized
+      by argostranslate's own package lock.
+    - Downloads go to "<name>.argosmodel.part" and continue from where they
+      stopped (HTTP Range) after a crash or restart.
+    - Every archive is verified before installing: its SHA-256 against the
+      package index when the index provides one, otherwise the CRC of every
+      zip member, plus the language pair in its metadata.json.
+    - Packages whose (from, to, version) is already installed are skipped.
+
+    Progress is reported through progress(label, status), where status is a
+    dict with "state" (queued, downloading, installing, installed, skipped,
+    failed or cancelled), "downloaded" and "total" bytes and "error".
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        downloads_dir: Optional[str] = None,
+        progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+        retries: int = 3
+    ):
+        """
+        Initialize the installer.
+
+        Args:
+            concurrency: Maximum number of simultaneous downloads
+            downloads_dir: Where archives are downloaded (defaults to argostranslate's)
+            progress: Optional callback receiving per-package status updates
+            cancel_event: Set it to stop the installation between chunks
+            retries: Download attempts per link before moving to the next link
+        """
+        self.concurrency = max(1, concurrency)
+        self.downloads_dir = Path(downloads_dir) if downloads_dir else None
+        self.progress = progress
+        self.cancel_event = cancel_event or threading.Event()
+        self.retries = max(1, retries)
+        self.status: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def install(self, packages: List[Any]) -> Dict[str, Any]:
+        """
+        Install packages that are not installed yet.
+
+        Args:
+            packages: Available packages to install
+
+        Returns:
+            Report with installed, skipped and failed package labels,
+            bytes downloaded, whether it was cancelled, and elapsed seconds
+        """
+        started = time.perf_counter()
+        installed_keys = {package_key(pkg) for pkg in argostranslate.package.get_installed_packages()}
+
+        to_install = []
+        skipped = []
+        seen = set()
+        for pkg in self._with_dependencies(packages, installed_keys):
+            key = package_key(pkg)
+            if key in seen:
+                continue
+            seen.add(key)
+            if key in installed_keys:
+                skipped.append(package_label(pkg))
+                self._update(pkg, state="skipped")
+            else:
+                to_install.append(pkg)
+                self._update(pkg, state="queued", downloaded=0, total=None)
+
+        logger.info(
+            f"Installing {len(to_install)} packages "
+            f"({len(skipped)} already installed, {self.concurrency} concurrent downloads)"
+        )
+
+        installed, failed = [], []
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="model-install") as pool:
+            futures = {pool.submit(self._install_one, pkg): pkg for pkg in to_install}
+            for future in as_completed(futures):
+                pkg = futures[future]
+                label = package_label(pkg)
+                try:
+                    future.result()
+                    installed.append(label)
+                except InstallCancelled:
+                    self._update(pkg, state="cancelled")
+                except Exception as e:
+                    failed.append({"package": label, "error": str(e)})
+                    self._update(pkg, state="failed", error=str(e))
+                    logger.warning(f"Failed to install {label}: {e}")
+
+        report = {
+            "installed": sorted(installed),
+            "skipped": sorted(skipped),
+            "failed": failed,
+            "cancelled": self.cancel_event.is_set(),
+            "bytes_downloaded": sum(status.get("downloaded") or 0 for status in self.status.values()),
+            "seconds": round(time.perf_counter() - started, 1)
+        }
+        logger.info(
+            f"Installed {len(installed)} packages, {len(failed)} failed, "
+            f"{len(skipped)} skipped in {report['seconds']}s"
+        )
+        return report
+
+    def download(self, pkg: Any) -> Path:
+        """
+        Download and verify a package archive, resuming a partial download.
+
+        Returns:
+            Path of the verified .argosmodel file
+        """
+        downloads_dir = self.downloads_dir or Path(argostranslate.settings.downloads_dir)
+        downloads_dir.mkdir(parents=True, exist_ok=True)
+        path = downloads_dir / f"{argostranslate.package.argospm_package_name(pkg)}.argosmodel"
+        partial = path.with_name(path.name + ".part")
+        expected_sha256 = getattr(pkg, "checksum", None) or getattr(pkg, "sha256", None)
+
+        if path.exists():
+            try:
+                self._verify(path, pkg, expected_sha256)
+                self._update(pkg, downloaded=0, total=path.stat().st_size)
+                return path
+            except ValueError as e:
+                logger.warning(f"Discarding invalid download {path.name}: {e}")
+                path.unlink()
+
+        errors = []
+        for url in pkg.links:
+            for attempt in range(self.retries):
+                try:
+                    self._fetch(url, partial, pkg)
+                    try:
+                        self._verify(partial, pkg, expected_sha256)
+                    except ValueError:
+                        # A corrupt partial file cannot be resumed; start over next attempt
+                        partial.unlink()
+                        raise
+                    os.replace(partial, path)
+                    return path
+                except InstallCancelled:
+                    raise
+                except Exception as e:
+                    errors.append(f"{url}: {e}")
+                    logger.debug(f"Download attempt {attempt + 1} of {url} failed: {e}")
+        raise RuntimeError(f"Download failed for {package_label(pkg)}: {'; '.join(errors[-3:]) or 'no links'}")
+
+    def _install_one(self, pkg: Any):
+        """Download, verify and install one package."""
+        self._check_cancelled()
+        self._update(pkg, state="downloading")
+        path = self.download(pkg)
+        self._check_cancelled()
+        self._update(pkg, state="installing")
+        argostranslate.package.install_from_path(path)
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        self._update(pkg, state="installed")
+        logger.info(f"Installed {package_label(pkg)}")
+
+    def _fetch(self, url: str, partial: Path, pkg: Any):
+        """Download url into partial, continuing from its current size."""
+        offset = partial.stat().st_size if partial.exists() else 0
+        headers = {"User-Agent": _USER_AGENT}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+
+        try:
+            response = urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=60)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                return  # Nothing left to fetch; the partial file is complete
+            raise
+
+        with response:
+            if offset and response.status != 206:
+                offset = 0  # Server ignored the range; restart
+            length = response.headers.get("Content-Length")
+            total = offset + int(length) if length else None
+            if offset:
+                logger.info(f"Resuming {package_label(pkg)} at {offset} bytes")
+            self._update(pkg, downloaded=offset, total=total)
+
+            with open(partial, "ab" if offset else "wb") as f:
+                downloaded = offset
+                while True:
+                    self._check_cancelled()
+                    chunk = response.read(_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    self._update(pkg, downloaded=downloaded)
+
+        if total is not None and downloaded < total:
+            raise IOError(f"Connection closed after {downloaded} of {total} bytes")
+
+    def _verify(self, path: Path, pkg: Any, expected_sha256: Optional[str]):
+        """Check a downloaded archive. Raises ValueError if it is unusable."""
+        if expected_sha256:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            if digest.hexdigest() != expected_sha256.lower():
+                raise ValueError("SHA-256 checksum mismatch")
+
+        if not zipfile.is_zipfile(path):
+            raise ValueError("not a zip archive")
+        with zipfile.ZipFile(path) as archive:
+            bad_member = archive.testzip()
+            if bad_member is not None:
+                raise ValueError(f"CRC check failed for {bad_member}")
+            metadata_name = next(
+                (name for name in archive.namelist() if name.endswith("/metadata.json")), None
+            )
+            if metadata_name is not None:
+                metadata = json.loads(archive.read(metadata_name))
+                if metadata.get("from_code", pkg.from_code) != pkg.from_code or \
+                        metadata.get("to_code", pkg.to_code) != pkg.to_code:
+                    raise ValueError("archive contains a different language pair")
+
+    def _with_dependencies(self, packages: List[Any], installed_keys: set) -> List[Any]:
+        """Add sentence boundary packages that translation packages need without Stanza."""
+        packages = list(packages)
+        needs_sbd = (
+            any(getattr(pkg, "type", "translate") == "translate" for pkg in packages)
+            and not getattr(argostranslate.settings, "stanza_available", True)
+            and not any(key[0] == "sbd" for key in installed_keys)
+        )
+        if needs_sbd:
+            sbd = [pkg for pkg in argostranslate.package.get_available_packages() if pkg.type == "sbd"]
+            packages = sbd + packages
+        return packages
+
+    def _check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise InstallCancelled()
+
+    def _update(self, pkg: Any, **fields):
+        """Record and report a package's progress."""
+        label = package_label(pkg)
+        with self._lock:
+            status = self.status.setdefault(label, {"state": "queued", "downloaded": 0, "total": None, "error": None})
+            status.update(fields)
+            snapshot = dict(status)
+        if self.progress is not None:
+            self.progress(label, snapshot)
+
+
+def install_packages(
+    packages: List[Any],
+    concurrency: int = 4,
+    progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> Dict[str, Any]:
+    """Install packages with a PackageInstaller. See PackageInstaller.install()."""
+    return PackageInstaller(concurrency=concurrency, progress=progress, cancel_event=cancel_event).install(packages)
+
+
+def main():
+    """Command line entry point used by start.sh: python -m app.installer"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Install Argos Translate packages in parallel")
+    parser.add_argument(
+        "--languages",
+        type=str,
+        default=None,
+        help="Comma-separated language codes; installs packages with either side listed (default: all)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.getenv("INSTALL_CONCURRENCY", "4")),
+        help="Simultaneous downloads (default: INSTALL_CONCURRENCY or 4)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if argostranslate is None:
+        logger.error("argostranslate package is not available")
+        return 1
+
+    print("Updating package index...")
+    argostranslate.package.update_package_index()
+    available = argostranslate.package.get_available_packages()
+    print(f"Found {len(available)} available packages")
+
+    languages = [code.strip() for code in args.languages.split(",")] if args.languages else None
+    report = install_packages(select_packages(available, languages, match="any"), concurrency=args.concurrency)
+    print(
+        f"Installed {len(report['installed'])} packages, skipped {len(report['skipped'])}, "
+        f"failed {len(report['failed'])} in {report['seconds']}s"
+    )
+    for failure in report["failed"]:
+        print(f"Warning: Failed to install {failure['package']}: {failure['error']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
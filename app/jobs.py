@@ -0,0 +1,187 @@
+"""Background jobs for long-running admin operations."""
+from typing import Optional, Dict, Any, Callable, Tuple
+from collections import OrderedDict
+import logging
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Job states; the last three are final
+QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED = "queued", "running", "completed", "failed", "cancelled"
+FINAL_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class InstallJob:
+    """
+    A model installation running in a background thread.
+
+    Per-package status is fed by the installer's progress callback; the job
+    itself only aggregates it. Cancelling sets the event the installer checks
+    between download chunks.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.state = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.packages: Dict[str, Dict[str, Any]] = {}
+        self.report: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.state not in FINAL_STATES
+
+    def progress(self, label: str, status: Dict[str, Any]):
+        """Installer progress callback."""
+        with self._lock:
+            self.packages[label] = status
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot of the job for the API."""
+        with self._lock:
+            packages = {label: dict(status) for label, status in sorted(self.packages.items())}
+
+        counts: Dict[str, int] = {}
+        for status in packages.values():
+            counts[status["state"]] = counts.get(status["state"], 0) + 1
+        downloaded = sum(status.get("downloaded") or 0 for status in packages.values())
+        known_totals = [status["total"] for status in packages.values() if status.get("total")]
+
+        end = self.finished_at or time.time()
+        return {
+            "id": self.id,
+            "type": "install-models",
+            "state": self.state,
+            "cancel_requested": self.cancel_event.is_set(),
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "elapsed_seconds": round(end - self.started_at, 1) if self.started_at else 0.0,
+            "progress": {
+                "packages": len(packages),
+                "states": counts,
+                "bytes_downloaded": downloaded,
+                # Only packages whose download has started report a size
+                "bytes_total": sum(known_totals) if known_totals else None
+            },
+            "packages": packages,
+            "report": self.report,
+            "error": self.error
+        }
+
+
+class JobManager:
+    """
+    Runs install jobs one at a time and keeps the most recent ones for inspection.
+
+    Starting a job while another is active returns the active job instead of
+    queueing a second one, so repeated admin calls never install twice.
+    """
+
+    def __init__(self, max_jobs: int = 20):
+        """
+        Initialize the manager.
+
+        Args:
+            max_jobs: Finished jobs kept for GET /admin/jobs/{id}
+        """
+        self.max_jobs = max(1, max_jobs)
+        self._jobs: "OrderedDict[str, InstallJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start_install(
+        self,
+        run: Callable[[Callable[[str, Dict[str, Any]], None], threading.Event], Dict[str, Any]],
+        on_complete: Optional[Callable[[InstallJob], None]] = None
+    ) -> Tuple[InstallJob, bool]:
+        """
+        Start an install job in a background thread.
+
+        Args:
+            run: Called as run(progress, cancel_event) in the job thread; returns the installer report
+            on_complete: Called in the job thread after run() returns or raises
+
+        Returns:
+            (job, created) where created is False if an active job was returned instead
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if job.active:
+                    return job, False
+            job = InstallJob()
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.max_jobs:
+                oldest_id = next(iter(self._jobs))
+                if self._jobs[oldest_id].active:
+                    break
+                del self._jobs[oldest_id]
+
+        thread = threading.Thread(
+            target=self._run, args=(job, run, on_complete),
+            name=f"install-job-{job.id[:8]}", daemon=True
+        )
+        thread.start()
+        return job, True
+
+    def get(self, job_id: str) -> Optional[InstallJob]:
+        """Get a job by ID."""
+        return self._jobs.get(job_id)
+
+    def active(self) -> Optional[InstallJob]:
+        """Get the running or queued job, if any."""
+        for job in list(self._jobs.values()):
+            if job.active:
+                return job
+        return None
+
+    def cancel(self, job_id: str) -> Optional[InstallJob]:
+        """
+        Request cancellation of a job.
+
+        Packages already installed stay installed; downloads in progress stop
+        and keep their partial files so the next job resumes them.
+
+        Returns:
+            The job, or None if it does not exist
+        """
+        job = self._jobs.get(job_id)
+        if job is not None and job.active:
+            job.cancel_event.set()
+            logger.info(f"Cancellation requested for install job {job.id}")
+        return job
+
+    def _run(self, job: InstallJob, run: Callable, on_complete: Optional[Callable]):
+        job.started_at = time.time()
+        job.state = RUNNING
+        logger.info(f"Install job {job.id} started")
+        try:
+            job.report = run(job.progress, job.cancel_event)
+            if job.cancel_event.is_set():
+                state = CANCELLED
+            elif job.report.get("failed"):
+                state = FAILED
+                job.error = f"{len(job.report['failed'])} packages failed to install"
+            else:
+                state = COMPLETED
+        except Exception as e:
+            logger.error(f"Install job {job.id} failed: {e}")
+            job.error = str(e)
+            state = CANCELLED if job.cancel_event.is_set() else FAILED
+
+        # The hook runs before the job reports a final state, so a client polling
+        # for completion never sees "completed" ahead of the switch to new packages
+        if on_complete is not None:
+            try:
+                on_complete(job)
+            except Exception as e:
+                logger.error(f"Install job {job.id} completion hook failed: {e}")
+        job.finished_at = time.time()
+        job.state = state
+        logger.info(f"Install job {job.id} {state} after {job.finished_at - job.started_at:.1f}s")
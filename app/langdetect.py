@@ -0,0 +1,366 @@
+"""Offline language detection with character n-gram profiles."""
+from typing import Optional, List, Dict, Any, Tuple, Iterable
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    logger.warning("numpy not installed, statistical language detection disabled. Install it with: pip install numpy")
+    np = None
+
+# English text translated into every installed language to build its profile.
+# Short everyday phrases come first because detection input is often that short.
+SEED_SENTENCES = (
+    "Hello, how are you?",
+    "Thank you very much.",
+    "Good morning, my friend.",
+    "Where is the train station?",
+    "I would like a cup of coffee, please.",
+    "What time is it now?",
+    "Please close the door.",
+    "I do not understand.",
+    "Can you help me with this?",
+    "See you tomorrow.",
+    "Yes, of course.",
+    "How much does this cost?",
+    "My name is Anna and I live in a small town near the sea.",
+    "The weather is very nice today, so we are going to the park.",
+    "We need to buy bread, milk, eggs and some fresh vegetables.",
+    "Children play in the garden while their parents cook dinner.",
+    "The meeting has been moved to Thursday afternoon at three o'clock.",
+    "She reads a book every week and writes short stories in the evening.",
+    "The doctor said that I should drink more water and sleep longer.",
+    "Our team won the match after a difficult second half.",
+    "The museum is closed on Mondays but open late on Fridays.",
+    "He forgot his keys at the office and had to wait outside.",
+    "This restaurant serves the best soup in the whole city.",
+    "The government announced new measures to support small businesses.",
+    "Scientists discovered a new species of bird in the northern forests.",
+    "Prices for energy and food have risen sharply this year.",
+    "The president will visit three countries during his trip next month.",
+    "Heavy rain caused flooding in several villages along the river.",
+    "The company reported higher profits thanks to strong sales abroad.",
+    "Students must submit their applications before the end of the month.",
+    "The new bridge connects the old part of the city with the airport.",
+    "Thousands of people gathered in the square to celebrate the holiday.",
+    "Please read the instructions carefully before using the device.",
+    "Your order has been shipped and will arrive within five working days.",
+    "Enter your password to continue.",
+    "The file could not be saved because the disk is full.",
+    "Click the button below to confirm your email address.",
+    "We are sorry, but this product is currently out of stock.",
+    "If you have any questions, do not hesitate to contact us.",
+    "The hotel room was clean, quiet and had a beautiful view of the mountains.",
+    "I have been learning to play the piano since I was a child.",
+    "Why did you not call me when you arrived at the airport?",
+    "My grandmother tells wonderful stories about her youth in the village.",
+    "The cat is sleeping on the warm windowsill in the kitchen.",
+    "Every morning he walks the dog before going to work.",
+    "They decided to sell their car and travel by bicycle instead.",
+    "Water boils at one hundred degrees at sea level.",
+    "History teaches us that peace requires patience and courage.",
+    "The library offers free courses in languages, computers and art.",
+    "After the long winter, the first flowers finally appeared in spring.",
+    "Could you speak more slowly, please?",
+    "I think that this is a very good idea.",
+    "The shop on the corner sells newspapers, sweets and cigarettes.",
+    "Our neighbours are building a new house with a large garden.",
+    "Music and dance are an important part of our culture.",
+    "The road to the castle is long, narrow and very steep.",
+    "We will discuss the results of the survey at the next meeting.",
+    "Do not forget to take your umbrella, it is going to rain.",
+    "The river flows through the valley towards the ocean.",
+    "Happy birthday, I wish you health and happiness!",
+)
+
+# Character n-gram orders used as features
+NGRAM_ORDERS = (1, 2, 3)
+
+# Longest prefix of a text that is scored; more text adds no accuracy, only time
+_MAX_CHARS = 512
+
+# Digits and punctuation carry no language signal. Combining vowel signs of
+# Indic and Southeast Asian scripts are not \w, so their blocks are kept whole.
+_NON_LETTERS = re.compile(
+    r"(?:[^\w\u0300-\u036F\u0591-\u05C7\u0610-\u061A\u064B-\u065F\u0900-\u0DFF"
+    r"\u0E00-\u0EFF\u1000-\u109F\u1780-\u17FF]|[\d_])+"
+)
+
+# Multiplier of the Fibonacci hash (2^64 / golden ratio)
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# Distinctive scripts, used while no profiles are available.
+# (first code point, last code point, language)
+_SCRIPT_RANGES = (
+    (0x3040, 0x30FF, "ja"),   # Hiragana, Katakana
+    (0xAC00, 0xD7AF, "ko"),   # Hangul syllables
+    (0x1100, 0x11FF, "ko"),   # Hangul jamo
+    (0x4E00, 0x9FFF, "zh"),   # CJK ideographs
+    (0x0E00, 0x0E7F, "th"),   # Thai
+    (0x0370, 0x03FF, "el"),   # Greek
+    (0x0590, 0x05FF, "he"),   # Hebrew
+    (0x0600, 0x06FF, "ar"),   # Arabic
+    (0x0530, 0x058F, "hy"),   # Armenian
+    (0x10A0, 0x10FF, "ka"),   # Georgian
+    (0x0900, 0x097F, "hi"),   # Devanagari
+    (0x0980, 0x09FF, "bn"),   # Bengali
+    (0x0A80, 0x0AFF, "gu"),   # Gujarati
+    (0x0B80, 0x0BFF, "ta"),   # Tamil
+    (0x0C00, 0x0C7F, "te"),   # Telugu
+    (0x0C80, 0x0CFF, "kn"),   # Kannada
+    (0x0D00, 0x0D7F, "ml"),   # Malayalam
+    (0x0D80, 0x0DFF, "si"),   # Sinhala
+    (0x1000, 0x109F, "my"),   # Myanmar
+    (0x1780, 0x17FF, "km"),   # Khmer
+    (0x0E80, 0x0EFF, "lo"),   # Lao
+    (0x0400, 0x04FF, "ru"),   # Cyrillic
+)
+
+
+def normalize(text: str) -> str:
+    """Lowercase a text, reduce digits and punctuation to single spaces and pad it."""
+    return " " + _NON_LETTERS.sub(" ", text[:_MAX_CHARS].lower()).strip() + " "
+
+
+def _fragments(normalized: str) -> List[str]:
+    """A normalized sentence and its one- and two-word prefixes (without duplicates)."""
+    words = normalized.split()
+    fragments = {" " + " ".join(words[:count]) + " " for count in (1, 2)}
+    fragments.add(normalized)
+    return sorted(fragments)
+
+
+def detect_script(text: str, languages: Iterable[str]) -> Optional[str]:
+    """
+    Guess a language from its script alone.
+
+    Returns:
+        The language of the first distinctive script found among languages, or None
+    """
+    languages = set(languages)
+    for char in text[:_MAX_CHARS]:
+        code_point = ord(char)
+        if code_point < 0x0370:
+            continue
+        for first, last, language in _SCRIPT_RANGES:
+            if first <= code_point <= last and language in languages:
+                return language
+    return None
+
+
+class LanguageDetector:
+    """
+    Multinomial naive Bayes over hashed character n-grams.
+
+    Every language has a profile: smoothed log-probabilities of the 1- to
+    3-grams of its sample text, hashed into a fixed number of buckets. The
+    profiles form one (buckets, languages) matrix, so scoring a text is a
+    single gather of its n-gram rows and a sum, and a batch of texts is one
+    gather and one segmented sum. Scores are turned into probabilities with a
+    softmax whose temperature is fitted on held-out sample sentences, so the
+    confidence of the top candidate tracks how often it is right.
+    """
+
+    def __init__(self, bits: int = 15, alpha: float = 0.5):
+        """
+        Initialize an empty detector.
+
+        Args:
+            bits: log2 of the number of hash buckets
+            alpha: Additive smoothing for unseen n-grams
+        """
+        self.bits = bits
+        self.alpha = alpha
+        self.languages: Tuple[str, ...] = ()
+        self.temperature = 1.0
+        self._log_probs = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether profiles are loaded."""
+        return self._log_probs is not None and len(self.languages) > 0
+
+    def ngram_ids(self, texts: List[str]) -> Tuple[Any, Any]:
+        """
+        Hash the character n-grams of normalized texts into bucket ids.
+
+        All texts are concatenated into one code point array; n-grams are
+        built with vectorized shifts, n-grams spanning two texts are dropped,
+        and every n-gram is hashed with a multiplicative hash, so ids are
+        identical across processes and runs.
+
+        Args:
+            texts: Texts already passed through normalize()
+
+        Returns:
+            (bucket ids grouped by text, number of ids per text)
+        """
+        code_points = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        if len(texts) == 1:
+            # Nothing to separate; skips the ownership bookkeeping on the hot path
+            grams = self._grams(code_points)
+            ids = self._hash(np.concatenate(grams)) if grams else np.empty(0, dtype=np.int64)
+            return ids, np.array([len(ids)])
+
+        owner = np.repeat(np.arange(len(texts)), [len(text) for text in texts])
+        grams, owners = [], []
+        for order, gram in zip(NGRAM_ORDERS, self._grams(code_points)):
+            starts = owner[:len(owner) - order + 1]
+            within = starts == owner[order - 1:]
+            grams.append(gram[within])
+            owners.append(starts[within])
+        if not grams:
+            return np.empty(0, dtype=np.int64), np.zeros(len(texts), dtype=np.int64)
+        owners = np.concatenate(owners)
+        by_text = np.argsort(owners, kind="stable")
+        return self._hash(np.concatenate(grams)[by_text]), np.bincount(owners, minlength=len(texts))
+
+    @staticmethod
+    def _grams(code_points) -> List[Any]:
+        """
+        N-grams of a code point array, one array per order in NGRAM_ORDERS.
+
+        Each code point takes 21 bits, so 1-, 2- and 3-grams of text (which
+        never contains code points below a space) fall into disjoint ranges.
+        """
+        grams = []
+        current = None
+        for order in range(1, max(NGRAM_ORDERS) + 1):
+            if len(code_points) < order:
+                break
+            current = code_points if current is None else (current[:-1] << np.uint64(21)) | code_points[order - 1:]
+            if order in NGRAM_ORDERS:
+                grams.append(current)
+        return grams
+
+    def _hash(self, grams):
+        """Multiplicative (Fibonacci) hash of n-grams into bucket ids."""
+        return ((grams * np.uint64(_HASH_MULTIPLIER)) >> np.uint64(64 - self.bits)).astype(np.intp)
+
+    def fit(self, samples: Dict[str, List[str]], holdout_every: int = 5):
+        """
+        Build profiles from sample sentences per language.
+
+        Every holdout_every-th sentence is first left out to fit the softmax
+        temperature; the final profiles use all sentences.
+
+        Args:
+            samples: Sample sentences per language code
+            holdout_every: Hold out one sentence in this many for calibration (0 skips calibration)
+        """
+        languages = tuple(sorted(code for code, sentences in samples.items() if sentences))
+        if not languages:
+            self.languages, self._log_probs = (), None
+            return
+        normalized = {code: [normalize(sentence) for sentence in samples[code]] for code in languages}
+
+        if holdout_every and len(languages) > 1:
+            train = {
+                code: [s for i, s in enumerate(sentences) if i % holdout_every]
+                for code, sentences in normalized.items()
+            }
+            # Whole sentences plus their first one and two words, so the
+            # temperature also fits the short inputs detection mostly sees
+            held_out = [
+                (column, fragment)
+                for column, code in enumerate(languages)
+                for i, s in enumerate(normalized[code]) if not i % holdout_every and s.strip()
+                for fragment in _fragments(s)
+            ]
+            self.languages, self._log_probs = languages, self._profiles(train, languages)
+            if held_out:
+                scores = self._score(*self.ngram_ids([s for _column, s in held_out]))
+                self.temperature = self._fit_temperature(scores, np.array([column for column, _s in held_out]))
+
+        self.languages, self._log_probs = languages, self._profiles(normalized, languages)
+        logger.info(
+            f"Language detector fitted for {len(languages)} languages "
+            f"(temperature {self.temperature:.2f})"
+        )
+
+    def detect(self, text: str, k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Rank the most likely languages of a text.
+
+        Returns:
+            Up to k {"language", "confidence"} candidates, most likely first
+            (empty if the text has no letters or no profiles are loaded)
+        """
+        normalized = normalize(text)
+        if not self.ready or not normalized.strip():
+            return []
+        ids, _lengths = self.ngram_ids([normalized])
+        scores = self._log_probs[ids].sum(axis=0) / self.temperature
+        probabilities = np.exp(scores - scores.max())
+        probabilities /= probabilities.sum()
+        top = np.argsort(-probabilities)[:max(1, k)]
+        return self._candidates(top.tolist(), probabilities[top].tolist())
+
+    def detect_batch(self, texts: List[str], k: int = 3) -> List[List[Dict[str, Any]]]:
+        """
+        Rank the most likely languages of every text with one vectorized pass.
+
+        Returns:
+            Candidates per text, as for detect()
+        """
+        if not self.ready:
+            return [[] for _ in texts]
+        if not texts:
+            return []
+        normalized = [normalize(text) for text in texts]
+        probabilities = self._softmax(self._score(*self.ngram_ids(normalized)) / self.temperature)
+
+        top = np.argsort(-probabilities, axis=1)[:, :max(1, k)]
+        top_probabilities = np.take_along_axis(probabilities, top, axis=1).tolist()
+        return [
+            self._candidates(columns, confidences) if text.strip() else []
+            for text, columns, confidences in zip(normalized, top.tolist(), top_probabilities)
+        ]
+
+    def _candidates(self, columns: List[int], confidences: List[float]) -> List[Dict[str, Any]]:
+        return [
+            {"language": self.languages[column], "confidence": round(confidence, 4)}
+            for column, confidence in zip(columns, confidences)
+        ]
+
+    def _profiles(self, samples: Dict[str, List[str]], languages: Tuple[str, ...]):
+        """Smoothed log-probability matrix (buckets, languages) from normalized samples."""
+        buckets = 1 << self.bits
+        counts = np.zeros((buckets, len(languages)), dtype=np.float64)
+        for column, code in enumerate(languages):
+            if samples[code]:
+                ids, _lengths = self.ngram_ids(samples[code])
+                counts[:, column] = np.bincount(ids, minlength=buckets)
+        totals = counts.sum(axis=0) + self.alpha * buckets
+        return np.log((counts + self.alpha) / totals).astype(np.float32)
+
+    def _score(self, ids, lengths):
+        """Log-likelihood of every text under every profile, shape (texts, languages)."""
+        scores = np.zeros((len(lengths), len(self.languages)), dtype=np.float32)
+        non_empty = lengths > 0
+        if not non_empty.any():
+            return scores
+        offsets = np.concatenate(([0], np.cumsum(lengths[non_empty])[:-1]))
+        scores[non_empty] = np.add.reduceat(self._log_probs[ids], offsets, axis=0)
+        return scores
+
+    @staticmethod
+    def _softmax(scores):
+        shifted = scores - scores.max(axis=1, keepdims=True)
+        exp = np.exp(shifted)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def _fit_temperature(self, scores, labels) -> float:
+        """Temperature minimizing the negative log-likelihood of the true languages."""
+        best, best_loss = 1.0, np.inf
+        for temperature in np.logspace(-1, 2, 61):
+            shifted = scores / temperature
+            shifted = shifted - shifted.max(axis=1, keepdims=True)
+            log_probs = shifted - np.log(np.exp(shifted).sum(axis=1, keepdims=True))
+            loss = -log_probs[np.arange(len(labels)), labels].mean()
+            if loss < best_loss:
+                best, best_loss = float(temperature), loss
+        return best
@@ -0,0 +1,207 @@
+"""Persisted manifest of installed packages, so startup does not rescan the package directories."""
+from typing import Optional, List, Dict, Any, Tuple
+from pathlib import Path
+import json
+import logging
+import os
+import threading
+
+from app.residency import model_size_bytes
+
+logger = logging.getLogger(__name__)
+
+try:
+    import argostranslate.package
+    import argostranslate.settings
+except ImportError:
+    argostranslate = None
+
+# Bump when the entry format changes; older manifests are ignored and rebuilt
+MANIFEST_VERSION = 1
+
+# Package attributes recorded in the manifest besides its path and size
+_FIELDS = (
+    "type", "from_code", "to_code", "from_name", "to_name",
+    "package_version", "package_name", "argos_version",
+)
+
+# (package directory, mtime in ns, subdirectories with their mtimes)
+DirectoryStamp = List[Tuple[str, Optional[int], List[Tuple[str, int]]]]
+
+
+def package_dirs() -> List[Path]:
+    """Directories argostranslate loads installed packages from."""
+    dirs = getattr(argostranslate.settings, "package_dirs", None)
+    if not dirs:
+        dirs = [argostranslate.settings.package_data_dir]
+    return [Path(d) for d in dirs]
+
+
+def _mtime_ns(path: Path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def directory_stamp(dirs: List[Path]) -> DirectoryStamp:
+    """
+    Describe the package directories without reading any package.
+
+    Each package is a subdirectory, so installing, removing or replacing one
+    changes the subdirectory list or a subdirectory's mtime. Plain files next
+    to the packages (caches, traffic stats) are ignored.
+    """
+    stamp = []
+    for directory in dirs:
+        subdirs = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        subdirs.append((entry.name, entry.stat().st_mtime_ns))
+        except OSError:
+            pass
+        stamp.append((str(directory), _mtime_ns(directory), sorted(subdirs)))
+    return stamp
+
+
+def _same_packages(a: DirectoryStamp, b: DirectoryStamp) -> bool:
+    """Compare two stamps, ignoring the directories' own mtimes."""
+    return [(d, subdirs) for d, _m, subdirs in a] == [(d, subdirs) for d, _m, subdirs in b]
+
+
+class ManifestPackage:
+    """
+    An installed package restored from the manifest.
+
+    Carries the attributes the package index and language list need. Anything
+    else (tokenizer, target prefix, ...) loads the real argostranslate Package
+    from package_path on first access, i.e. when the pair is first translated.
+    """
+
+    def __init__(self, entry: Dict[str, Any]):
+        for field in _FIELDS:
+            setattr(self, field, entry.get(field))
+        self.package_path = Path(entry["path"])
+        self.size_bytes = entry.get("size_bytes", 0)
+        self._package = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes not set in __init__
+        if name.startswith("__") or name in ("_package", "_lock"):
+            raise AttributeError(name)
+        with self._lock:
+            if self._package is None:
+                self._package = argostranslate.package.Package(self.package_path)
+        return getattr(self._package, name)
+
+    def __repr__(self) -> str:
+        return f"ManifestPackage({self.from_code} -> {self.to_code}, {self.package_version})"
+
+
+class PackageManifest:
+    """
+    JSON record of the installed packages (pair, version, size, path).
+
+    Written after every scan of the package directories together with a stamp
+    of those directories. Loading it costs one small file read instead of
+    parsing every package's metadata; it is trusted only while the directory
+    stamp still matches. changed() is cheap enough for the request path: it
+    stats the package directories and lists them only when their mtime moved.
+    """
+
+    def __init__(self, path: Optional[str]):
+        """
+        Initialize the manifest.
+
+        Args:
+            path: Manifest file (None keeps the change tracking but never persists)
+        """
+        self.path = path
+        self._stamp: Optional[DirectoryStamp] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[List[ManifestPackage]]:
+        """
+        Read the installed packages from the manifest.
+
+        Returns:
+            The packages, or None if the manifest is missing, unreadable or out of date
+        """
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                return None
+            recorded = [(d, m, [tuple(s) for s in subdirs]) for d, m, subdirs in data["directories"]]
+            current = directory_stamp(package_dirs())
+            if not _same_packages(recorded, current):
+                logger.info("Package directories changed since the manifest was written, rescanning")
+                return None
+            packages = [ManifestPackage(entry) for entry in data["packages"]]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable package manifest {self.path}: {e}")
+            return None
+
+        with self._lock:
+            self._stamp = current
+        logger.info(f"Loaded {len(packages)} packages from manifest {self.path}")
+        return packages
+
+    def stamp(self) -> DirectoryStamp:
+        """Stamp of the package directories now; take it before scanning them."""
+        return directory_stamp(package_dirs())
+
+    def write(self, packages: List[Any], stamp: DirectoryStamp):
+        """
+        Record scanned packages.
+
+        Args:
+            packages: Packages returned by argostranslate.package.get_installed_packages()
+            stamp: Directory stamp taken before that scan, so changes made
+                during the scan are detected by the next changed() call
+        """
+        with self._lock:
+            self._stamp = stamp
+        if not self.path:
+            return
+
+        entries = []
+        for pkg in packages:
+            entry = {field: getattr(pkg, field, None) for field in _FIELDS}
+            entry["path"] = str(pkg.package_path)
+            size = getattr(pkg, "size_bytes", None)
+            entry["size_bytes"] = size if size is not None else model_size_bytes(str(pkg.package_path))
+            entries.append(entry)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({"version": MANIFEST_VERSION, "directories": stamp, "packages": entries}, f, indent=2)
+            os.replace(tmp_path, self.path)
+            logger.info(f"Wrote package manifest with {len(entries)} packages to {self.path}")
+        except OSError as e:
+            logger.warning(f"Could not write package manifest {self.path}: {e}")
+
+    def changed(self) -> bool:
+        """Check whether packages were added, removed or replaced since the last load or write."""
+        with self._lock:
+            previous = self._stamp
+        if previous is None:
+            return True
+        dirs = package_dirs()
+        if [(str(d), _mtime_ns(d)) for d in dirs] == [(d, m) for d, m, _s in previous]:
+            return False
+
+        current = directory_stamp(dirs)
+        if _same_packages(previous, current):
+            # Only files next to the packages changed; remember the new mtimes
+            with self._lock:
+                self._stamp = current
+            return False
+        return True
@@ -0,0 +1,129 @@
+"""Write-behind usage metering."""
+from typing import Optional, Dict, Any, Callable, Iterable
+import logging
+import threading
+
+from app.user_store import UserStore
+
+logger = logging.getLogger(__name__)
+
+
+class UsageMeter:
+    """
+    Buffers per-user character counts and writes them to the user store in batches.
+
+    Requests only bump an in-memory counter. A background thread flushes all
+    pending counts every flush_interval seconds, and a request that brings the
+    number of buffered increments to flush_threshold wakes that thread to flush
+    right away; the request itself never waits for the store. Each
+    flush is a single store call (one transaction for SQLite, one atomic file
+    rewrite for JSON); if it fails the counts are put back and retried later.
+    """
+
+    def __init__(
+        self,
+        store: UserStore,
+        flush_interval: float = 5.0,
+        flush_threshold: int = 100,
+        on_flush: Optional[Callable[[Iterable[str]], None]] = None
+    ):
+        """
+        Initialize the meter.
+
+        Args:
+            store: User store that receives the flushed counts
+            flush_interval: Seconds between background flushes
+            flush_threshold: Buffered increments that trigger an early background flush
+            on_flush: Called with the emails whose usage was written by a flush
+        """
+        self.store = store
+        self.on_flush = on_flush
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self._pending: Dict[str, int] = {}
+        self._increments = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self.flushes = 0
+
+    def add(self, email: str, characters: int):
+        """Record characters used by a user."""
+        if characters <= 0:
+            return
+        with self._lock:
+            self._pending[email] = self._pending.get(email, 0) + characters
+            self._increments += 1
+            flush_now = self._increments >= self.flush_threshold
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._run, name="usage-meter", daemon=True)
+                self._thread.start()
+        if flush_now:
+            self._wake.set()
+
+    def pending(self, email: str) -> int:
+        """Get characters recorded for a user but not yet written to the store."""
+        return self._pending.get(email, 0)
+
+    def stored_usage(self, email: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a user from the store with their buffered characters added to usage.
+
+        Holds the flush lock so a concurrent flush cannot make the same
+        characters appear in both the store and the buffer, or in neither.
+        """
+        with self._flush_lock:
+            user = self.store.get(email)
+            if user is not None:
+                user['usage']['used'] += self.pending(email)
+            return user
+
+    def discard(self, email: str):
+        """Drop a user's buffered characters (their usage period was just reset)."""
+        with self._lock:
+            self._pending.pop(email, None)
+
+    def flush(self) -> int:
+        """
+        Write every buffered count to the store.
+
+        Returns:
+            Number of users whose usage was written
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._increments = 0
+            if not batch:
+                return 0
+            try:
+                self.store.add_usage_batch(batch)
+            except Exception as e:
+                logger.error(f"Usage flush failed, keeping {len(batch)} pending users: {e}")
+                with self._lock:
+                    for email, characters in batch.items():
+                        self._pending[email] = self._pending.get(email, 0) + characters
+                return 0
+            self.flushes += 1
+            if self.on_flush is not None:
+                self.on_flush(batch.keys())
+            return len(batch)
+
+    def close(self):
+        """Stop the background thread and flush what is left."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+    def _run(self):
+        """Background flush loop."""
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self.flush()
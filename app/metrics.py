@@ -0,0 +1,52 @@
+"""Rolling request latency statistics."""
+from typing import Optional, Dict, Any
+from collections import deque
+import math
+import time
+
+
+def _nearest_rank(sorted_values: list, percent: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted latencies (seconds), in milliseconds."""
+    if not sorted_values:
+        return None
+    rank = math.ceil(percent / 100.0 * len(sorted_values))
+    return round(sorted_values[max(0, rank - 1)] * 1000.0, 1)
+
+
+class LatencyTracker:
+    """
+    Keeps the most recent request latencies and reports percentiles.
+
+    Samples older than the window, or beyond the last max_samples requests,
+    are dropped so the figures describe current behaviour.
+    """
+
+    def __init__(self, window_seconds: float = 60.0, max_samples: int = 2000):
+        """
+        Initialize the tracker.
+
+        Args:
+            window_seconds: Only samples this recent are reported
+            max_samples: Maximum number of samples kept
+        """
+        self.window_seconds = window_seconds
+        self._samples: deque = deque(maxlen=max_samples)
+
+    def record(self, seconds: float):
+        """Record one request latency."""
+        self._samples.append((time.monotonic(), seconds))
+
+    def summary(self) -> Dict[str, Any]:
+        """Get p50/p99 latency (ms) and the number of samples in the window."""
+        values = sorted(self._recent())
+        return {
+            "p50": _nearest_rank(values, 50),
+            "p99": _nearest_rank(values, 99),
+            "samples": len(values),
+            "window_seconds": self.window_seconds
+        }
+
+    def _recent(self) -> list:
+        """Latencies (seconds) recorded within the window."""
+        cutoff = time.monotonic() - self.window_seconds
+        return [seconds for recorded_at, seconds in list(self._samples) if recorded_at >= cutoff]
@@ -1,6 +1,6 @@
 """Pydantic models for API requests and responses."""
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Union
 
 
 class TranslateRequest(BaseModel):
@@ -17,22 +17,55 @@ class TranslateResponse(BaseModel):
     translatedText: str = Field(..., description="Translated text")
 
 
+class BatchTranslateRequest(BaseModel):
+    """Request model for batch translation."""
+    q: List[str] = Field(..., description="Segments to translate")
+    source: str = Field(default="auto", description="Source language code or 'auto' (detected per segment)")
+    target: str = Field(..., description="Target language code")
+    format: str = Field(default="text", description="Format of the text (text or html)")
+    api_key: Optional[str] = Field(None, description="API key for authentication")
+
+
+class BatchTranslateResult(BaseModel):
+    """Translation result for a single segment of a batch."""
+    translatedText: Optional[str] = Field(None, description="Translated text, if the segment succeeded")
+    error: Optional[str] = Field(None, description="Error message, if the segment failed")
+
+
+class BatchTranslateResponse(BaseModel):
+    """Response model for batch translation."""
+    translations: List[BatchTranslateResult] = Field(..., description="Results in input order")
+
+
 class LanguageInfo(BaseModel):
     """Language information model."""
     code: str = Field(..., description="Language code")
     name: str = Field(..., description="Language name")
+    targets: Optional[List[str]] = Field(
+        None, description="Languages reachable from this one, directly or via pivot (with ?targets=1)"
+    )
 
 
 class DetectRequest(BaseModel):
     """Request model for language detection."""
-    q: str = Field(..., description="Text to detect language for")
+    q: Union[str, List[str]] = Field(
+        ..., description="Text to detect language for, or a list of texts to detect in one request"
+    )
+    top_k: int = Field(default=3, ge=1, le=20, description="Number of ranked candidates to return")
     api_key: Optional[str] = Field(None, description="API key for authentication")
 
 
+class DetectCandidate(BaseModel):
+    """One ranked language detection candidate."""
+    language: str = Field(..., description="Language code")
+    confidence: float = Field(..., description="Probability that the text is in this language")
+
+
 class DetectResponse(BaseModel):
     """Response model for language detection."""
     confidence: float = Field(..., description="Confidence score")
     language: str = Field(..., description="Detected language code")
+    candidates: List[DetectCandidate] = Field(default_factory=list, description="Most likely languages, best first")
 
 
 class HealthResponse(BaseModel):
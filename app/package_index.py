@@ -0,0 +1,58 @@
+"""Precomputed lookups over the installed translation packages."""
+from typing import List, Dict, Any, Tuple, FrozenSet
+import hashlib
+
+
+class PackageIndex:
+    """
+    Immutable index of installed packages.
+
+    Built once whenever the package set changes and swapped in with a single
+    attribute assignment, so readers always see a consistent snapshot.
+
+    Attributes:
+        pairs: Set of (from_code, to_code) pairs with an installed package
+        targets: Adjacency map from each source language to its direct targets (sorted)
+        languages: Every language code appearing in any package
+        versions: Package version for each (from_code, to_code) pair
+        fingerprint: Digest of the installed (from, to, version) packages
+    """
+
+    def __init__(self, packages: List[Any]):
+        """
+        Build the index.
+
+        Args:
+            packages: Installed argostranslate packages (non-translation packages are ignored)
+        """
+        versions: Dict[Tuple[str, str], str] = {}
+        targets: Dict[str, set] = {}
+        languages = set()
+
+        for pkg in packages:
+            # Skip sentence boundary detection and other non-translation packages
+            if getattr(pkg, "type", "translate") != "translate" or not pkg.from_code or not pkg.to_code:
+                continue
+            pair = (pkg.from_code, pkg.to_code)
+            versions[pair] = str(getattr(pkg, "package_version", "") or "")
+            targets.setdefault(pkg.from_code, set()).add(pkg.to_code)
+            languages.add(pkg.from_code)
+            languages.add(pkg.to_code)
+
+        self.versions: Dict[Tuple[str, str], str] = versions
+        self.pairs: FrozenSet[Tuple[str, str]] = frozenset(versions)
+        self.targets: Dict[str, Tuple[str, ...]] = {
+            code: tuple(sorted(codes)) for code, codes in targets.items()
+        }
+        self.languages: FrozenSet[str] = frozenset(languages)
+        self.fingerprint = hashlib.sha256(
+            repr(sorted(versions.items())).encode("utf-8")
+        ).hexdigest()
+
+    def has_pair(self, from_code: str, to_code: str) -> bool:
+        """Check if a direct package exists for the pair."""
+        return (from_code, to_code) in self.pairs
+
+    def targets_of(self, from_code: str) -> Tuple[str, ...]:
+        """Get the languages directly reachable from a source language."""
+        return self.targets.get(from_code, ())
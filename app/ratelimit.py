@@ -0,0 +1,335 @@
+"""Token-bucket rate limiting per API key."""
+from typing import Optional, Dict, Any, List, Tuple, Callable
+import asyncio
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# (bucket key, refill rate per second, capacity, cost)
+BucketRequest = Tuple[str, float, float, float]
+
+
+def _refill(tokens: float, updated_at: float, rate: float, capacity: float, now: float) -> float:
+    """Tokens in a bucket after refilling since updated_at."""
+    return min(capacity, tokens + max(0.0, now - updated_at) * rate)
+
+
+def _take(levels: List[float], requests: List[BucketRequest]) -> float:
+    """
+    Decide whether every bucket can pay its cost.
+
+    A cost larger than the bucket's capacity is accepted once the bucket is
+    full and leaves it in debt, so oversized requests are slowed down rather
+    than rejected forever.
+
+    Returns:
+        0.0 if all buckets can pay, otherwise seconds until they all can
+    """
+    wait = 0.0
+    for tokens, (_key, rate, capacity, cost) in zip(levels, requests):
+        needed = min(cost, capacity)
+        if tokens < needed:
+            wait = max(wait, (needed - tokens) / rate if rate > 0 else math.inf)
+    return wait
+
+
+class MemoryBucketBackend:
+    """Token buckets held in this process."""
+
+    # take() only holds an in-process lock, so it may run on the event loop
+    blocking = False
+
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, requests: List[BucketRequest]) -> float:
+        """
+        Charge every bucket in requests, or none of them.
+
+        Returns:
+            0.0 if charged, otherwise seconds to wait before retrying
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, rate, capacity, _cost in requests:
+                tokens, updated_at = self._buckets.get(key, (capacity, now))
+                levels.append(_refill(tokens, updated_at, rate, capacity, now))
+            wait = _take(levels, requests)
+            if wait == 0.0:
+                for tokens, (key, _rate, _capacity, cost) in zip(levels, requests):
+                    self._buckets[key] = (tokens - cost, now)
+            return wait
+
+
+class SqliteBucketBackend:
+    """
+    Token buckets in a local SQLite file, shared by every worker process on the host.
+
+    Each check is one short IMMEDIATE transaction, so uvicorn workers see the
+    same bucket levels and a key's limit holds across all of them. The
+    transaction waits at most busy_timeout for another worker's lock and lets
+    the request through if it cannot get it. RateLimiter.acheck() runs it in
+    a thread, off the event loop.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str, busy_timeout: float = 0.05):
+        """
+        Initialize the backend.
+
+        Args:
+            path: SQLite database file (created if missing)
+            busy_timeout: Seconds to wait for the write lock before failing open
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=busy_timeout)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        logger.info(f"Rate limit buckets shared through {path}")
+
+    def take(self, requests: List[BucketRequest]) -> float:
+        """
+        Charge every bucket in requests, or none of them.
+
+        Returns:
+            0.0 if charged, otherwise seconds to wait before retrying
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute("BEGIN IMMEDIATE")
+            except sqlite3.Error as e:
+                # Never turn a storage problem into rejected traffic
+                logger.warning(f"Rate limit check skipped: {e}")
+                return 0.0
+            try:
+                levels = []
+                for key, rate, capacity, _cost in requests:
+                    row = self._db.execute(
+                        "SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)
+                    ).fetchone()
+                    tokens, updated_at = row if row else (capacity, now)
+                    levels.append(_refill(tokens, updated_at, rate, capacity, now))
+                wait = _take(levels, requests)
+                if wait == 0.0:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                        [(key, tokens - cost, now) for tokens, (key, _r, _c, cost) in zip(levels, requests)]
+                    )
+                self._db.execute("COMMIT")
+                return wait
+            except sqlite3.Error as e:
+                self._db.execute("ROLLBACK")
+                logger.warning(f"Rate limit check skipped: {e}")
+                return 0.0
+
+
+class RateLimiter:
+    """
+    Requests-per-second and characters-per-second limits per client.
+
+    Each client (an API key digest, or an IP address for anonymous traffic)
+    has two token buckets sized by its plan: one paying one token per request
+    and one paying one token per character of text submitted. Bucket capacity
+    is burst_seconds worth of the rate, so short bursts are absorbed.
+    """
+
+    def __init__(
+        self,
+        plan_limits: Dict[str, Optional[Tuple[float, float]]],
+        backend: Any,
+        burst_seconds: float = 2.0
+    ):
+        """
+        Initialize the limiter.
+
+        Args:
+            plan_limits: (requests per second, characters per second) per plan; None means unlimited
+            backend: MemoryBucketBackend or SqliteBucketBackend
+            burst_seconds: Bucket capacity in seconds of refill
+        """
+        self.plan_limits = plan_limits
+        self.backend = backend
+        self.burst_seconds = burst_seconds
+        self.rejected = 0
+
+    def check(self, client: str, plan: str, characters: int) -> float:
+        """
+        Charge a request against a client's buckets.
+
+        Args:
+            client: Stable client identifier (never a plaintext API key)
+            plan: Plan whose limits apply
+            characters: Characters of text submitted with the request
+
+        Returns:
+            0.0 if the request may proceed, otherwise seconds to wait
+        """
+        limits = self.plan_limits.get(plan)
+        if not limits:
+            return 0.0
+        requests_per_second, characters_per_second = limits
+        buckets: List[BucketRequest] = []
+        if requests_per_second:
+            buckets.append((
+                f"{client}:requests", requests_per_second,
+                max(1.0, requests_per_second * self.burst_seconds), 1.0
+            ))
+        if characters_per_second and characters > 0:
+            buckets.append((
+                f"{client}:characters", characters_per_second,
+                max(1.0, characters_per_second * self.burst_seconds), float(characters)
+            ))
+        if not buckets:
+            return 0.0
+        wait = self.backend.take(buckets)
+        if wait:
+            self.rejected += 1
+        return wait
+
+    async def acheck(self, client: str, plan: str, characters: int) -> float:
+        """check() for async callers; backends that do I/O run in a thread."""
+        if getattr(self.backend, "blocking", False):
+            return await asyncio.to_thread(self.check, client, plan, characters)
+        return self.check(client, plan, characters)
+
+
+def _count_characters(body: bytes) -> int:
+    """Characters of text in a JSON request body's "q" field (string or list of strings)."""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return 0
+    if not isinstance(payload, dict):
+        return 0
+    text = payload.get("q")
+    if isinstance(text, str):
+        return len(text)
+    if isinstance(text, list):
+        return sum(len(item) for item in text if isinstance(item, str))
+    return 0
+
+
+def _replay(body: bytes, receive):
+    """ASGI receive callable yielding an already-read body, then deferring to the real channel."""
+    replayed = False
+
+    async def replay_receive():
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay_receive
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying a RateLimiter before requests reach the endpoints.
+
+    Only metered paths (the endpoints that run inference) are limited; health,
+    metadata and account endpoints never count against a client's buckets.
+    The client and plan come from resolve_client(api_key, client_host), which
+    returns (client id, plan) or None to skip limiting. For metered paths the
+    JSON body is read up front to count characters and then replayed to the
+    application unchanged; bodies over max_body_bytes are rejected with 413
+    before they are buffered. Rejected requests get 429 with Retry-After.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiter: RateLimiter,
+        resolve_client: Callable[[Optional[str], Optional[str]], Optional[Tuple[str, str]]],
+        metered_paths: Tuple[str, ...] = (),
+        max_body_bytes: int = 10 * 1024 * 1024
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.resolve_client = resolve_client
+        self.metered_paths = frozenset(metered_paths)
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("method") == "OPTIONS" \
+                or scope["path"] not in self.metered_paths:
+            await self.app(scope, receive, send)
+            return
+
+        api_key = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-api-key":
+                api_key = value.decode("latin-1")
+                break
+        client_host = scope["client"][0] if scope.get("client") else None
+        client = self.resolve_client(api_key, client_host)
+        if client is None:
+            await self.app(scope, receive, send)
+            return
+
+        characters = 0
+        if scope.get("method") == "POST":
+            too_large = False
+            for name, value in scope.get("headers", ()):
+                if name == b"content-length":
+                    too_large = value.isdigit() and int(value) > self.max_body_bytes
+                    break
+            chunks, size, more_body = [], 0, not too_large
+            while more_body:
+                message = await receive()
+                if message["type"] != "http.request":
+                    break
+                chunks.append(message.get("body", b""))
+                size += len(chunks[-1])
+                if size > self.max_body_bytes:
+                    too_large = True
+                    break
+                more_body = message.get("more_body", False)
+            if too_large:
+                await _send_error(send, 413, f"Request body exceeds {self.max_body_bytes} bytes")
+                return
+            body = b"".join(chunks)
+            characters = _count_characters(body)
+            receive = _replay(body, receive)
+
+        wait = await self.limiter.acheck(client[0], client[1], characters)
+        if wait:
+            retry_after = str(max(1, math.ceil(wait)))
+            await _send_error(
+                send, 429, "Rate limit exceeded, please slow down",
+                [(b"retry-after", retry_after.encode("latin-1"))]
+            )
+            return
+
+        await self.app(scope, receive, send)
+
+
+async def _send_error(send, status: int, detail: str, headers: Optional[List[Tuple[bytes, bytes]]] = None):
+    """Send a JSON error response in FastAPI's {"detail": ...} shape."""
+    payload = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode("latin-1")),
+            *(headers or [])
+        ]
+    })
+    await send({"type": "http.response.body", "body": payload})
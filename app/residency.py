@@ -0,0 +1,188 @@
+"""Tracks which CTranslate2 models are loaded and unloads them under a memory budget."""
+from typing import Optional, Dict, Any, Tuple, Set
+from collections import OrderedDict
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+try:
+    import argostranslate.settings
+    import ctranslate2
+except ImportError:
+    ctranslate2 = None
+
+
+def model_size_bytes(model_path: str) -> int:
+    """
+    Estimate the resident size of a CTranslate2 model from its files on disk.
+
+    CTranslate2 loads the weights in model.bin as stored, so the directory
+    size is a close approximation of the memory a loaded model occupies.
+    """
+    total = 0
+    for root, _dirs, files in os.walk(model_path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class ModelResidencyManager:
+    """
+    Loads package models on first use and keeps them within a memory budget.
+
+    Every use of a package translation goes through touch(), which loads the
+    CTranslate2 translator if needed and marks the model as most recently used.
+    When the estimated size of all loaded models exceeds the budget, the least
+    recently used models are unloaded by dropping their translator; requests
+    already running on an evicted model keep their own reference and finish.
+    """
+
+    def __init__(self, budget_bytes: Optional[int] = None):
+        """
+        Initialize the residency manager.
+
+        Args:
+            budget_bytes: Maximum estimated memory for loaded models (None for unlimited)
+        """
+        self.budget_bytes = budget_bytes
+        self._resident: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per pair so concurrent first uses wait for a single load
+        self._load_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def resident_bytes(self) -> int:
+        """Estimated memory used by all loaded models."""
+        return sum(entry["bytes"] for entry in self._resident.values())
+
+    def touch(self, pair: Tuple[str, str], translation: Any) -> Any:
+        """
+        Make sure a package translation's model is loaded and mark it as used.
+
+        Args:
+            pair: (from_code, to_code) of the package
+            translation: argostranslate PackageTranslation handle
+
+        Returns:
+            The loaded CTranslate2 translator
+        """
+        with self._lock:
+            translator = self._use(pair, translation)
+            if translator is not None:
+                return translator
+            load_lock = self._load_locks.setdefault(pair, threading.Lock())
+
+        # Load outside the main lock so other pairs are not blocked by a slow
+        # load; the per-pair lock makes concurrent callers wait for this one
+        with load_lock:
+            with self._lock:
+                translator = self._use(pair, translation)
+                if translator is not None:
+                    return translator
+
+            model_path = str(translation.pkg.package_path / "model")
+            translator = translation.translator
+            if translator is None:
+                started = time.perf_counter()
+                translator = ctranslate2.Translator(model_path, device=argostranslate.settings.device)
+                logger.info(
+                    f"Loaded model {pair[0]} -> {pair[1]} in {time.perf_counter() - started:.2f}s"
+                )
+            size = model_size_bytes(model_path)
+
+            with self._lock:
+                if translation.translator is None:
+                    translation.translator = translator
+                    self.loads += 1
+                self._resident[pair] = {
+                    "translation": translation,
+                    "bytes": size,
+                    "loaded_at": time.time(),
+                    "last_used": time.time(),
+                    "uses": 1
+                }
+                self._resident.move_to_end(pair)
+                self._enforce_budget(keep=pair)
+                return translation.translator
+
+    def resident_pairs(self) -> Set[Tuple[str, str]]:
+        """Pairs whose model is loaded right now."""
+        with self._lock:
+            return set(self._resident)
+
+    def evict(self, pair: Tuple[str, str]) -> bool:
+        """Unload a model. Returns True if it was loaded."""
+        with self._lock:
+            return self._unload(pair)
+
+    def forget_missing(self, translations: Dict[Tuple[str, str], Any]):
+        """Drop bookkeeping for models whose handle is no longer installed."""
+        with self._lock:
+            for pair in list(self._resident):
+                if translations.get(pair) is not self._resident[pair]["translation"]:
+                    self._unload(pair)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report loaded models and budget usage."""
+        now = time.time()
+        with self._lock:
+            models = [
+                {
+                    "pair": f"{pair[0]}->{pair[1]}",
+                    "bytes": entry["bytes"],
+                    "uses": entry["uses"],
+                    "loaded_seconds_ago": round(now - entry["loaded_at"], 1),
+                    "idle_seconds": round(now - entry["last_used"], 1)
+                }
+                for pair, entry in reversed(self._resident.items())
+            ]
+            return {
+                "budget_bytes": self.budget_bytes,
+                "resident_bytes": self.resident_bytes,
+                "resident_models": len(models),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "models": models
+            }
+
+    def _use(self, pair: Tuple[str, str], translation: Any) -> Any:
+        """Mark a loaded model as used and return its translator (None if not loaded). Caller holds the lock."""
+        entry = self._resident.get(pair)
+        if entry is None or entry["translation"] is not translation or translation.translator is None:
+            return None
+        entry["last_used"] = time.time()
+        entry["uses"] += 1
+        self._resident.move_to_end(pair)
+        return translation.translator
+
+    def _enforce_budget(self, keep: Tuple[str, str]):
+        """Unload least recently used models until under budget. Caller holds the lock."""
+        if self.budget_bytes is None:
+            return
+        while self.resident_bytes > self.budget_bytes:
+            victim = next((pair for pair in self._resident if pair != keep), None)
+            if victim is None:
+                logger.warning(
+                    f"Model {keep[0]} -> {keep[1]} alone exceeds MODEL_MEMORY_BUDGET "
+                    f"({self.resident_bytes} > {self.budget_bytes} bytes)"
+                )
+                return
+            self._unload(victim)
+            self.evictions += 1
+            logger.info(f"Unloaded model {victim[0]} -> {victim[1]} to stay within memory budget")
+
+    def _unload(self, pair: Tuple[str, str]) -> bool:
+        """Drop a model's translator. Caller holds the lock."""
+        entry = self._resident.pop(pair, None)
+        if entry is None:
+            return False
+        entry["translation"].translator = None
+        return True
@@ -0,0 +1,204 @@
+"""Precomputed pivot routes between every pair of installed languages."""
+from typing import Optional, List, Dict, Any, Tuple
+import heapq
+import logging
+import threading
+import time
+
+from app.package_index import PackageIndex
+
+logger = logging.getLogger(__name__)
+
+# Assumed cost of a hop that has not been measured yet (ms per 100 characters)
+_DEFAULT_HOP_LATENCY_MS = 100.0
+# Weight of a new latency sample in the moving average
+_LATENCY_EWMA_ALPHA = 0.2
+# Relative latency change that marks the table as stale
+_LATENCY_CHANGE_THRESHOLD = 0.25
+
+
+class RoutingTable:
+    """
+    Best translation route for every (source, target) language pair.
+
+    Each installed package is an edge whose cost is its measured latency
+    (exponential moving average, in ms per 100 characters) divided by its
+    quality score. Routes are found with Dijkstra from every source language
+    and stored, so request handling is a dictionary lookup. The table is
+    rebuilt when packages change and, at most once per refresh interval,
+    on a background timer when measured latencies drift.
+    """
+
+    def __init__(
+        self,
+        quality: Optional[Dict[Tuple[str, str], float]] = None,
+        max_hops: int = 4,
+        refresh_interval: float = 300.0
+    ):
+        """
+        Initialize the routing table.
+
+        Args:
+            quality: Optional quality score in (0, 1] per (from_code, to_code) package
+            max_hops: Maximum number of packages chained in one route
+            refresh_interval: Minimum seconds between latency-driven rebuilds
+        """
+        self.quality = quality or {}
+        self.max_hops = max_hops
+        self.refresh_interval = refresh_interval
+        self._index = PackageIndex([])
+        self._routes: Dict[Tuple[str, str], Tuple[List[str], float]] = {}
+        self._latency_ms: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._built_at = 0.0
+        self._timer_lock = threading.Lock()
+        self._rebuild_timer: Optional[threading.Timer] = None
+
+    def rebuild(self, index: Optional[PackageIndex] = None):
+        """
+        Recompute every route.
+
+        Args:
+            index: New package index (defaults to the one used for the last build)
+        """
+        with self._lock:
+            if index is not None:
+                self._index = index
+            index = self._index
+            hop_costs = self._hop_costs(index)
+
+            routes: Dict[Tuple[str, str], Tuple[List[str], float]] = {}
+            for source in index.targets:
+                for target, (path, cost) in self._shortest_paths(index, source, hop_costs).items():
+                    routes[(source, target)] = (path, cost)
+
+            self._routes = routes
+            self._dirty = False
+            self._built_at = time.monotonic()
+        logger.debug(f"Routing table rebuilt: {len(routes)} routes")
+
+    def route(self, from_code: str, to_code: str) -> Optional[List[str]]:
+        """
+        Look up the best route for a pair.
+
+        Returns:
+            Language codes from source to target, or None if unreachable
+        """
+        entry = self._routes.get((from_code, to_code))
+        return list(entry[0]) if entry else None
+
+    def reachable_targets(self, from_code: str) -> List[str]:
+        """Get every language reachable from a source language, directly or via pivots."""
+        return sorted(target for source, target in self._routes if source == from_code)
+
+    def reachable_map(self) -> Dict[str, List[str]]:
+        """Get every source language's reachable targets, directly or via pivots."""
+        reachable: Dict[str, List[str]] = {}
+        for source, target in self._routes:
+            reachable.setdefault(source, []).append(target)
+        return {source: sorted(targets) for source, targets in reachable.items()}
+
+    def record_latency(self, from_code: str, to_code: str, seconds: float, characters: int):
+        """
+        Record how long one hop took.
+
+        Args:
+            from_code: Source language of the hop
+            to_code: Target language of the hop
+            seconds: Wall-clock time spent in inference
+            characters: Number of input characters translated
+        """
+        if characters <= 0:
+            return
+        sample = seconds * 1000.0 * 100.0 / characters
+        pair = (from_code, to_code)
+        previous = self._latency_ms.get(pair)
+        if previous is None:
+            current = sample
+        else:
+            current = previous + _LATENCY_EWMA_ALPHA * (sample - previous)
+        self._latency_ms[pair] = current
+
+        if previous is None or abs(current - previous) > _LATENCY_CHANGE_THRESHOLD * previous:
+            self._dirty = True
+            self._schedule_rebuild()
+
+    def _schedule_rebuild(self):
+        """Start a timer that rebuilds the stale table once the refresh interval has passed."""
+        with self._timer_lock:
+            if self._rebuild_timer is not None:
+                return
+            delay = max(0.0, self.refresh_interval - (time.monotonic() - self._built_at))
+            self._rebuild_timer = threading.Timer(delay, self._rebuild_stale)
+            self._rebuild_timer.daemon = True
+            self._rebuild_timer.start()
+
+    def _rebuild_stale(self):
+        """Timer callback: rebuild if latencies still differ from the last build."""
+        with self._timer_lock:
+            self._rebuild_timer = None
+        if self._dirty:
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.warning(f"Routing table rebuild failed: {e}")
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Get the routing table as a list of route dictionaries."""
+        routes = self._routes
+        return [
+            {
+                "source": source,
+                "target": target,
+                "path": path,
+                "hops": len(path) - 1,
+                "cost": round(cost, 3)
+            }
+            for (source, target), (path, cost) in sorted(routes.items())
+        ]
+
+    def _hop_costs(self, index: PackageIndex) -> Dict[Tuple[str, str], float]:
+        """Compute the cost of every installed package."""
+        measured = sorted(self._latency_ms.values())
+        default_latency = measured[len(measured) // 2] if measured else _DEFAULT_HOP_LATENCY_MS
+
+        costs = {}
+        for pair in index.pairs:
+            latency = self._latency_ms.get(pair, default_latency)
+            quality = min(max(self.quality.get(pair, 1.0), 0.01), 1.0)
+            costs[pair] = latency / quality
+        return costs
+
+    def _shortest_paths(
+        self,
+        index: PackageIndex,
+        source: str,
+        hop_costs: Dict[Tuple[str, str], float]
+    ) -> Dict[str, Tuple[List[str], float]]:
+        """
+        Dijkstra from one source, limited to max_hops packages per route.
+
+        Search states are (language, hops) so a cheap route that uses up the
+        hop budget does not hide a costlier one that can still be extended.
+        """
+        best: Dict[str, Tuple[List[str], float]] = {}
+        heap = [(0.0, [source])]
+        settled = set()
+
+        while heap:
+            cost, path = heapq.heappop(heap)
+            lang = path[-1]
+            hops = len(path) - 1
+            if (lang, hops) in settled:
+                continue
+            settled.add((lang, hops))
+            if lang != source and lang not in best:
+                best[lang] = (path, cost)
+            if hops >= self.max_hops:
+                continue
+            for next_lang in index.targets_of(lang):
+                if next_lang not in path and (next_lang, hops + 1) not in settled:
+                    heapq.heappush(heap, (cost + hop_costs[(lang, next_lang)], path + [next_lang]))
+
+        return best
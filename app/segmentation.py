@@ -0,0 +1,111 @@
+"""Lightweight sentence segmentation that keeps the original whitespace intact."""
+from typing import List, Tuple
+import re
+
+# Sentence terminators followed by whitespace, CJK terminators, or line breaks
+_BOUNDARY = re.compile(
+    r"(?P<term>[.!?…]+[\"'»”’)\]]*)\s+"
+    r"|(?P<cjk>[。！？]+)\s*"
+    r"|(?P<newline>[^\S\n]*\n\s*)"
+)
+
+# Abbreviations that end with a period but do not end a sentence
+_ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "vs", "etc",
+    "e.g", "i.e", "approx", "no", "fig", "inc", "ltd", "co",
+}
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """
+    Split text into sentences.
+
+    Args:
+        text: Text to split
+
+    Returns:
+        (start, end) spans of each sentence. Everything between spans
+        (and before the first / after the last) is whitespace.
+    """
+    spans: List[Tuple[int, int]] = []
+    start = len(text) - len(text.lstrip())
+
+    for match in _BOUNDARY.finditer(text):
+        if match.start() < start:
+            continue
+
+        if match.group("term"):
+            end = match.end("term")
+            next_char = text[match.end():match.end() + 1]
+            if next_char.islower():
+                # "... e.g. apples" - lowercase continuation is not a new sentence
+                continue
+            word = text[start:match.start("term")].rsplit(None, 1)[-1:]
+            if word and word[0].lower().lstrip("(\"'") in _ABBREVIATIONS:
+                continue
+        elif match.group("cjk"):
+            end = match.end("cjk")
+        else:
+            end = match.start()
+
+        if end > start:
+            spans.append((start, end))
+        start = match.end()
+
+    tail = text[start:].rstrip()
+    if tail:
+        spans.append((start, start + len(tail)))
+    return spans
+
+
+def join_sentences(text: str, spans: List[Tuple[int, int]], sentences: List[str]) -> str:
+    """
+    Rebuild text with each span replaced by the matching sentence.
+
+    Args:
+        text: Original text the spans were computed from
+        spans: Sentence spans from split_sentences()
+        sentences: Replacement for each span, in order
+
+    Returns:
+        Text with the original whitespace between sentences preserved
+    """
+    parts = []
+    position = 0
+    for (start, end), sentence in zip(spans, sentences):
+        parts.append(text[position:start])
+        parts.append(sentence)
+        position = end
+    parts.append(text[position:])
+    return "".join(parts)
+
+
+def group_spans(spans: List[Tuple[int, int]], max_chars: int) -> List[Tuple[int, int]]:
+    """
+    Merge consecutive sentence spans into chunks of up to max_chars characters.
+
+    The first sentence always forms a chunk of its own so that streaming
+    clients receive something as early as possible; a sentence longer than
+    max_chars becomes a chunk by itself.
+
+    Args:
+        spans: Sentence spans from split_sentences()
+        max_chars: Target maximum length of a chunk
+
+    Returns:
+        (start, end) spans of each chunk, covering the same sentences in order
+    """
+    if not spans:
+        return []
+    chunks = [spans[0]]
+    start, end = None, None
+    for span_start, span_end in spans[1:]:
+        if start is not None and span_end - start > max_chars:
+            chunks.append((start, end))
+            start = None
+        if start is None:
+            start = span_start
+        end = span_end
+    if start is not None:
+        chunks.append((start, end))
+    return chunks
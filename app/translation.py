@@ -1,15 +1,230 @@
 """Translation service using Argos Translate (the engine behind LibreTranslate)."""
-from typing import Optional, List, Dict, Any
-from collections import deque
+from typing import Optional, List, Dict, Any, Tuple, Callable
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
 import logging
+import os
+import threading
 import time
 
+from app.cache import TranslationCache, make_cache_key
+from app.segmentation import split_sentences, join_sentences
+from app.package_index import PackageIndex
+from app.routing import RoutingTable
+from app.residency import ModelResidencyManager
+from app.installer import install_packages, select_packages
+from app.manifest import PackageManifest
+from app.langdetect import LanguageDetector, SEED_SENTENCES, detect_script, np
+
 logger = logging.getLogger(__name__)
 
 # Cache for recent error messages to reduce log spam
 _error_cache: Dict[str, float] = {}
 _ERROR_CACHE_TTL = 60  # Log same error at most once per 60 seconds
 
+# Batched inference settings (mirrors argostranslate's own CTranslate2 call)
+_CT2_MAX_BATCH_SIZE = 32
+# Sentences longer than this (no punctuation to split on) are cut at spaces
+# before batching, so no sequence runs into the decoding length cap
+_BATCH_MAX_SENTENCE_CHARS = 1000
+
+# Seconds between checks of the language profiles file for changes
+_PROFILES_CHECK_INTERVAL = 5.0
+
+# Text run through each model during warm-up
+_WARMUP_TEXT = "Hello, this is a warm-up sentence."
+
+# Human-readable names of language codes, for /languages
+LANGUAGE_NAMES = {
+    # European languages
+    "en": "English",
+    "es": "Spanish",
+    "fr": "French",
+    "de": "German",
+    "it": "Italian",
+    "pt": "Portuguese",
+    "ru": "Russian",
+    "pl": "Polish",
+    "nl": "Dutch",
+    "el": "Greek",
+    "cs": "Czech",
+    "ro": "Romanian",
+    "hu": "Hungarian",
+    "sv": "Swedish",
+    "no": "Norwegian",
+    "nb": "Norwegian Bokmål",
+    "da": "Danish",
+    "fi": "Finnish",
+    "bg": "Bulgarian",
+    "hr": "Croatian",
+    "sr": "Serbian",
+    "sk": "Slovak",
+    "sl": "Slovenian",
+    "lt": "Lithuanian",
+    "lv": "Latvian",
+    "et": "Estonian",
+    "ga": "Irish",
+    "ca": "Catalan",
+    "uk": "Ukrainian",
+    "be": "Belarusian",
+    "is": "Icelandic",
+    "mk": "Macedonian",
+    "sq": "Albanian",
+    # Note: UK regional languages (cy, gd, kw, gv) require custom models
+    # Major world languages
+    "zh": "Chinese",
+    "ja": "Japanese",
+    "ko": "Korean",
+    "ar": "Arabic",
+    "hi": "Hindi",
+    "tr": "Turkish",
+    "he": "Hebrew",
+    "th": "Thai",
+    "vi": "Vietnamese",
+    "id": "Indonesian",
+    "ms": "Malay",
+    "tl": "Tagalog",
+    "sw": "Swahili",
+    "af": "Afrikaans",
+    "az": "Azerbaijani",
+    "eu": "Basque",
+    "bn": "Bengali",
+    "bs": "Bosnian",
+    "br": "Breton",
+    "eo": "Esperanto",
+    "fa": "Persian",
+    "gl": "Galician",
+    "gu": "Gujarati",
+    "ha": "Hausa",
+    "haw": "Hawaiian",
+    "hy": "Armenian",
+    "ig": "Igbo",
+    "jw": "Javanese",
+    "ka": "Georgian",
+    "km": "Khmer",
+    "kn": "Kannada",
+    "kk": "Kazakh",
+    "ky": "Kyrgyz",
+    "lo": "Lao",
+    "lb": "Luxembourgish",
+    "ml": "Malayalam",
+    "mr": "Marathi",
+    "mn": "Mongolian",
+    "my": "Myanmar",
+    "ne": "Nepali",
+    "ps": "Pashto",
+    "pa": "Punjabi",
+    "si": "Sinhala",
+    "so": "Somali",
+    "su": "Sundanese",
+    "tg": "Tajik",
+    "ta": "Tamil",
+    "te": "Telugu",
+    "ur": "Urdu",
+    "uz": "Uzbek",
+    "yi": "Yiddish",
+    "yo": "Yoruba",
+    "zu": "Zulu",
+}
+
+# Languages installed by default when models are updated (INSTALL_ALL_LANGUAGES=false).
+# Includes European + major world languages.
+DEFAULT_INSTALL_LANGUAGES = [
+    # European languages
+    "en",   # English
+    "es",   # Spanish
+    "fr",   # French
+    "de",   # German
+    "it",   # Italian
+    "pt",   # Portuguese
+    "ru",   # Russian
+    "pl",   # Polish
+    "nl",   # Dutch
+    "el",   # Greek
+    "cs",   # Czech
+    "ro",   # Romanian
+    "hu",   # Hungarian
+    "sv",   # Swedish
+    "no",   # Norwegian
+    "nb",   # Norwegian Bokmål
+    "da",   # Danish
+    "fi",   # Finnish
+    "bg",   # Bulgarian
+    "hr",   # Croatian
+    "sr",   # Serbian
+    "sk",   # Slovak
+    "sl",   # Slovenian
+    "lt",   # Lithuanian
+    "lv",   # Latvian
+    "et",   # Estonian
+    "ga",   # Irish
+    "ca",   # Catalan
+    "uk",   # Ukrainian
+    "be",   # Belarusian
+    "is",   # Icelandic
+    "mk",   # Macedonian
+    "sq",   # Albanian
+    # Note: UK regional languages (cy, gd, kw, gv) are not available in default Argos Translate models
+    # They require custom trained models. See README for details.
+    # Major world languages
+    "zh",   # Chinese
+    "ja",   # Japanese
+    "ko",   # Korean
+    "ar",   # Arabic
+    "hi",   # Hindi
+    "tr",   # Turkish
+    "he",   # Hebrew
+    "th",   # Thai
+    "vi",   # Vietnamese
+    "id",   # Indonesian
+    "ms",   # Malay
+    "tl",   # Tagalog/Filipino
+    "sw",   # Swahili
+    "af",   # Afrikaans
+    "az",   # Azerbaijani
+    "eu",   # Basque
+    "bn",   # Bengali
+    "bs",   # Bosnian
+    "br",   # Breton
+    "eo",   # Esperanto
+    "fa",   # Persian/Farsi
+    "gl",   # Galician
+    "gu",   # Gujarati
+    "ha",   # Hausa
+    "haw",  # Hawaiian
+    "hy",   # Armenian
+    "ig",   # Igbo
+    "is",   # Icelandic
+    "jw",   # Javanese
+    "ka",   # Georgian
+    "km",   # Khmer
+    "kn",   # Kannada
+    "kk",   # Kazakh
+    "ky",   # Kyrgyz
+    "lo",   # Lao
+    "lb",   # Luxembourgish
+    "ml",   # Malayalam
+    "mr",   # Marathi
+    "mn",   # Mongolian
+    "my",   # Myanmar/Burmese
+    "ne",   # Nepali
+    "ps",   # Pashto
+    "pa",   # Punjabi
+    "si",   # Sinhala
+    "so",   # Somali
+    "su",   # Sundanese
+    "tg",   # Tajik
+    "ta",   # Tamil
+    "te",   # Telugu
+    "ur",   # Urdu
+    "uz",   # Uzbek
+    "yi",   # Yiddish
+    "yo",   # Yoruba
+    "zu",   # Zulu
+]
+
 try:
     import argostranslate.package
     import argostranslate.translate
@@ -18,21 +233,100 @@ except ImportError:
     argostranslate = None
 
 
+def _split_long_sentence(sentence: str, max_chars: int) -> List[str]:
+    """Cut a sentence at spaces into pieces of at most max_chars (longer words stay whole)."""
+    if len(sentence) <= max_chars:
+        return [sentence]
+    pieces, current = [], ""
+    for word in sentence.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
 class TranslationService:
     """Service for handling translation operations using Argos Translate."""
     
-    def __init__(self, load_only: Optional[List[str]] = None, model_directory: Optional[str] = None):
+    def __init__(
+        self,
+        load_only: Optional[List[str]] = None,
+        model_directory: Optional[str] = None,
+        cache_size: int = 0,
+        cache_path: Optional[str] = None,
+        sentence_cache_size: int = 0,
+        route_quality: Optional[Dict[str, float]] = None,
+        model_memory_budget: Optional[int] = None,
+        install_concurrency: int = 4,
+        manifest_path: Optional[str] = None,
+        language_profiles_path: Optional[str] = None
+    ):
         """
         Initialize the translation service.
         
         Args:
             load_only: List of language codes to load (for faster startup)
             model_directory: Custom directory for storing models (for persistent volumes)
+            cache_size: Number of translations kept in the in-memory result cache (0 disables it)
+            cache_path: SQLite file for the persistent result cache (None disables it)
+            sentence_cache_size: Number of translated sentences kept in memory (0 disables
+                sentence-level translation and caching)
+            route_quality: Optional quality score in (0, 1] per package, keyed "from-to",
+                used to weight pivot route selection
+            model_memory_budget: Maximum estimated bytes of loaded models before the least
+                recently used ones are unloaded (None for unlimited)
+            install_concurrency: Simultaneous package downloads when updating models
+            manifest_path: JSON file recording the installed packages, loaded at startup
+                instead of scanning the package directories (None disables it)
+            language_profiles_path: JSON file holding the sample text language detection
+                profiles are built from (None keeps them in memory only)
         """
         self.load_only = load_only
         self.model_directory = model_directory
+        # Constructor arguments, used to build identical services in worker processes
+        self.options: Dict[str, Any] = {
+            "load_only": load_only,
+            "model_directory": model_directory,
+            "cache_size": cache_size,
+            "cache_path": cache_path,
+            "sentence_cache_size": sentence_cache_size,
+            "route_quality": route_quality,
+            "model_memory_budget": model_memory_budget,
+            "install_concurrency": install_concurrency,
+            "manifest_path": manifest_path,
+            "language_profiles_path": language_profiles_path,
+        }
+        self.install_concurrency = install_concurrency
         self._installed_packages: List[Any] = []
+        self._refresh_lock = threading.Lock()
+        self._index = PackageIndex([])
+        self._translations: Dict[Tuple[str, str], Any] = {}
+        self._residency = ModelResidencyManager(budget_bytes=model_memory_budget)
+        self._traffic: Counter = Counter()
+        self._traffic_lock = threading.Lock()
+        self._routes = RoutingTable(quality={
+            tuple(pair.split("-", 1)): score
+            for pair, score in (route_quality or {}).items()
+            if "-" in pair
+        })
+        self._cache = TranslationCache(max_entries=cache_size, disk_path=cache_path)
+        self._sentence_cache = TranslationCache(max_entries=sentence_cache_size)
         self._initialized = False
+        self._packages_lock = threading.Lock()
+        self._manifest = PackageManifest(manifest_path)
+        # include_targets -> (index fingerprint, languages, JSON body, ETag)
+        self._languages_cache: Dict[bool, Tuple[str, List[Dict[str, Any]], bytes, str]] = {}
+        self._profiles_path = language_profiles_path
+        self._detector = LanguageDetector()
+        # (index fingerprint, samples file mtime) the detector was fitted for
+        self._detector_source: Optional[Tuple[str, Optional[int]]] = None
+        self._detector_checked_at = 0.0
+        self._detector_lock = threading.Lock()
+        self._profile_samples: Dict[str, Dict[str, Any]] = {}
         
         # Set custom model directory if provided
         if model_directory:
@@ -78,164 +372,12 @@ class TranslationService:
         try:
             # Update packages if requested
             if update_models:
-                logger.info("Updating translation models...")
-                argostranslate.package.update_package_index()
-                available_packages = argostranslate.package.get_available_packages()
-                
-                # Get languages to install from environment or use default comprehensive list
-                # If INSTALL_ALL_LANGUAGES=true, install all available languages
-                import os
-                install_all = os.getenv("INSTALL_ALL_LANGUAGES", "false").lower() == "true"
-                
-                if install_all:
-                    # Install ALL available language pairs for maximum coverage
-                    # This enables translation between ANY language to ANY language
-                    logger.info("INSTALL_ALL_LANGUAGES=true: Installing ALL available language pairs for maximum translation coverage...")
-                    
-                    # Get already installed pairs to avoid duplicates
-                    installed_pairs = set()
-                    try:
-                        current_installed = argostranslate.package.get_installed_packages()
-                        installed_pairs = set((p.from_code, p.to_code) for p in current_installed)
-                        logger.info(f"Found {len(installed_pairs)} already installed packages")
-                    except Exception as e:
-                        logger.warning(f"Could not check installed packages: {e}")
-                    
-                    # Filter out already installed packages
-                    packages_to_install = [
-                        pkg for pkg in available_packages
-                        if (pkg.from_code, pkg.to_code) not in installed_pairs
-                    ]
-                    
-                    if installed_pairs:
-                        logger.info(f"Installing {len(packages_to_install)} new packages (total available: {len(available_packages)})...")
-                        logger.info(f"This will enable translation between ANY language to ANY language")
-                    else:
-                        packages_to_install = available_packages
-                        logger.info(f"Installing all {len(packages_to_install)} available packages for complete language coverage...")
-                else:
-                    # Default: Install comprehensive set of popular global languages
-                    # Includes European + major world languages
-                    supported_languages = [
-                        # European languages
-                        "en",   # English
-                        "es",   # Spanish
-                        "fr",   # French
-                        "de",   # German
-                        "it",   # Italian
-                        "pt",   # Portuguese
-                        "ru",   # Russian
-                        "pl",   # Polish
-                        "nl",   # Dutch
-                        "el",   # Greek
-                        "cs",   # Czech
-                        "ro",   # Romanian
-                        "hu",   # Hungarian
-                        "sv",   # Swedish
-                        "no",   # Norwegian
-                        "nb",   # Norwegian Bokmål
-                        "da",   # Danish
-                        "fi",   # Finnish
-                        "bg",   # Bulgarian
-                        "hr",   # Croatian
-                        "sr",   # Serbian
-                        "sk",   # Slovak
-                        "sl",   # Slovenian
-                        "lt",   # Lithuanian
-                        "lv",   # Latvian
-                        "et",   # Estonian
-                        "ga",   # Irish
-                        "ca",   # Catalan
-                        "uk",   # Ukrainian
-                        "be",   # Belarusian
-                        "is",   # Icelandic
-                        "mk",   # Macedonian
-                        "sq",   # Albanian
-                        # Note: UK regional languages (cy, gd, kw, gv) are not available in default Argos Translate models
-                        # They require custom trained models. See README for details.
-                        # Major world languages
-                        "zh",   # Chinese
-                        "ja",   # Japanese
-                        "ko",   # Korean
-                        "ar",   # Arabic
-                        "hi",   # Hindi
-                        "tr",   # Turkish
-                        "he",   # Hebrew
-                        "th",   # Thai
-                        "vi",   # Vietnamese
-                        "id",   # Indonesian
-                        "ms",   # Malay
-                        "tl",   # Tagalog/Filipino
-                        "sw",   # Swahili
-                        "af",   # Afrikaans
-                        "az",   # Azerbaijani
-                        "eu",   # Basque
-                        "bn",   # Bengali
-                        "bs",   # Bosnian
-                        "br",   # Breton
-                        "eo",   # Esperanto
-                        "fa",   # Persian/Farsi
-                        "gl",   # Galician
-                        "gu",   # Gujarati
-                        "ha",   # Hausa
-                        "haw",  # Hawaiian
-                        "hy",   # Armenian
-                        "ig",   # Igbo
-                        "is",   # Icelandic
-                        "jw",   # Javanese
-                        "ka",   # Georgian
-                        "km",   # Khmer
-                        "kn",   # Kannada
-                        "kk",   # Kazakh
-                        "ky",   # Kyrgyz
-                        "lo",   # Lao
-                        "lb",   # Luxembourgish
-                        "ml",   # Malayalam
-                        "mr",   # Marathi
-                        "mn",   # Mongolian
-                        "my",   # Myanmar/Burmese
-                        "ne",   # Nepali
-                        "ps",   # Pashto
-                        "pa",   # Punjabi
-                        "si",   # Sinhala
-                        "so",   # Somali
-                        "su",   # Sundanese
-                        "tg",   # Tajik
-                        "ta",   # Tamil
-                        "te",   # Telugu
-                        "ur",   # Urdu
-                        "uz",   # Uzbek
-                        "yi",   # Yiddish
-                        "yo",   # Yoruba
-                        "zu",   # Zulu
-                    ]
-                    
-                    # Filter packages to supported language pairs
-                    packages_to_install = []
-                    for package in available_packages:
-                        if package.from_code in supported_languages and package.to_code in supported_languages:
-                            packages_to_install.append(package)
-                
-                if packages_to_install:
-                    logger.info(f"Installing {len(packages_to_install)} translation models...")
-                    installed_count = 0
-                    # Install all language pairs
-                    for package in packages_to_install:
-                        try:
-                            logger.info(f"Downloading {package.from_code} -> {package.to_code}...")
-                            download_path = package.download()
-                            logger.info(f"Installing {package.from_code} -> {package.to_code}...")
-                            argostranslate.package.install_from_path(download_path)
-                            installed_count += 1
-                            logger.info(f"Successfully installed: {package.from_code} -> {package.to_code}")
-                        except Exception as e:
-                            logger.warning(f"Failed to install {package.from_code}->{package.to_code}: {e}")
-                    logger.info(f"Installed {installed_count} out of {len(packages_to_install)} language packages")
-                else:
-                    logger.warning("No matching packages found to install")
+                self.install_models()
             
-            # Get installed packages
-            self._installed_packages = argostranslate.package.get_installed_packages()
+            # Get installed packages (from the manifest when it is up to date)
+            self._set_installed_packages(self.load_installed_packages())
+            # Fit the language detector now rather than on the first request
+            self._current_detector()
             
             # Log detailed information about installed packages
             if self._installed_packages:
@@ -283,6 +425,111 @@ class TranslationService:
             self._initialized = False
             return False
     
+    def install_models(
+        self,
+        progress: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """
+        Download and install translation packages, then switch to the new package set.
+        
+        Installs every available package when INSTALL_ALL_LANGUAGES=true,
+        otherwise the packages between DEFAULT_INSTALL_LANGUAGES. Requests keep
+        being served from the current package set while this runs; the package
+        index, translation handles and routing table are replaced together once
+        installation finishes (or is cancelled after installing some packages).
+        
+        Args:
+            progress: Optional callback receiving per-package status updates
+            cancel_event: Set it to stop the installation
+        
+        Returns:
+            Installer report (see PackageInstaller.install())
+        """
+        if argostranslate is None:
+            raise RuntimeError("argostranslate package is not available")
+        
+        logger.info("Updating translation models...")
+        argostranslate.package.update_package_index()
+        available_packages = argostranslate.package.get_available_packages()
+        
+        if os.getenv("INSTALL_ALL_LANGUAGES", "false").lower() == "true":
+            # Install ALL available language pairs for maximum coverage
+            # This enables translation between ANY language to ANY language
+            logger.info("INSTALL_ALL_LANGUAGES=true: Installing ALL available language pairs for maximum translation coverage...")
+            packages_to_install = available_packages
+        else:
+            packages_to_install = select_packages(available_packages, DEFAULT_INSTALL_LANGUAGES)
+        
+        if not packages_to_install:
+            logger.warning("No matching packages found to install")
+        
+        # Already installed (from, to, version) packages are skipped by the installer
+        report = install_packages(
+            packages_to_install,
+            concurrency=self.install_concurrency,
+            progress=progress,
+            cancel_event=cancel_event
+        )
+        self.reload_packages()
+        return report
+    
+    def load_installed_packages(self) -> List[Any]:
+        """
+        Get the installed packages without switching to them.
+        
+        Reads the package manifest when it matches the package directories,
+        otherwise scans them (and rewrites the manifest).
+        """
+        packages = self._manifest.load()
+        if packages is None:
+            packages = self._scan_packages()
+        return packages
+    
+    def reload_packages(self) -> int:
+        """
+        Rescan installed packages, record them in the manifest and switch to them.
+        
+        Returns:
+            Number of installed packages
+        """
+        self._set_installed_packages(self._scan_packages())
+        return len(self._installed_packages)
+    
+    def refresh_packages(self) -> bool:
+        """
+        Reload packages if the package directories changed since they were last read.
+        
+        Costs a stat of each package directory when nothing changed. A reload
+        rescans the packages and rewrites the manifest, so call this off the
+        event loop; concurrent callers do not wait for a reload already in
+        progress and keep using the current packages.
+        
+        Returns:
+            True if packages were reloaded
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            if not self._manifest.changed():
+                return False
+            logger.info("Package directories changed, reloading installed packages")
+            self.reload_packages()
+            return True
+        finally:
+            self._refresh_lock.release()
+    
+    def installed_package_count(self) -> int:
+        """Number of packages currently served, without touching the package directories."""
+        return len(self._installed_packages)
+    
+    def _scan_packages(self) -> List[Any]:
+        """Scan the package directories and record the result in the manifest."""
+        stamp = self._manifest.stamp()
+        packages = argostranslate.package.get_installed_packages()
+        self._manifest.write(packages, stamp)
+        return packages
+    
     def translate(
         self,
         text: str,
@@ -317,42 +564,27 @@ class TranslationService:
                     source = "en"  # Default fallback
                     logger.warning(f"Could not detect language, using default: {source}")
             
-            # Validate that we have a package for this language pair
-            if not self._has_translation_package(source, target):
+            if source == target:
+                return text
+            
+            # Look up the best direct or pivot route for this language pair
+            path = self._find_translation_path(source, target)
+            if path is None:
                 error_key = f"no_package_{source}_{target}"
-                if not self._should_log_error(error_key):
-                    # Silently return None if we've logged this error recently
-                    return None
-                
-                logger.error(f"No translation package available for {source} -> {target}")
-                # Try to find an alternative path through intermediate languages
-                alternative_path = self._find_translation_path(source, target)
-                if alternative_path:
-                    logger.info(f"Using alternative translation path: {' -> '.join(alternative_path)}")
-                    # Translate through intermediate languages
-                    current_text = text
-                    for i in range(len(alternative_path) - 1):
-                        from_lang = alternative_path[i]
-                        to_lang = alternative_path[i + 1]
-                        if not self._has_translation_package(from_lang, to_lang):
-                            path_error_key = f"no_package_{from_lang}_{to_lang}"
-                            if self._should_log_error(path_error_key):
-                                logger.error(f"Alternative path failed: no package for {from_lang} -> {to_lang}")
-                            return None
-                        current_text = argostranslate.translate.translate(current_text, from_lang, to_lang)
-                    return current_text
-                else:
-                    # Get available languages for better error message (only log once)
-                    available_langs = self.get_languages()
-                    available_codes = [lang["code"] for lang in available_langs] if available_langs else []
+                if self._should_log_error(error_key):
                     logger.error(
                         f"Cannot translate {source} -> {target}: no direct or indirect path available. "
-                        f"Available languages: {', '.join(sorted(available_codes))}"
+                        f"Available languages: {', '.join(sorted(self._index.languages))}"
                     )
-                    return None
+                return None
+            
+            if len(path) > 2:
+                logger.debug(f"Using pivot translation path: {' -> '.join(path)}")
             
             # Get the translation
-            translated_text = argostranslate.translate.translate(text, source, target)
+            with self._traffic_lock:
+                self._traffic[(source, target)] += 1
+            translated_text = self._translate_along_path(text, path)
             
             if format_type == "html":
                 # For HTML, we'd need to preserve tags, but argostranslate handles text
@@ -372,201 +604,794 @@ class TranslationService:
             logger.debug(f"Translation error traceback: {traceback.format_exc()}")
             return None
     
-    def get_languages(self) -> Optional[List[Dict[str, Any]]]:
+    def translate_batch(
+        self,
+        texts: List[str],
+        source: str,
+        target: str,
+        format_type: str = "text"
+    ) -> List[Dict[str, Optional[str]]]:
         """
-        Get list of supported languages.
+        Translate many segments, running each language pair through the model as one batch.
+        
+        Segments are grouped by (source, target) - with source 'auto' each segment is
+        detected separately - and every group is sent to CTranslate2 in a single
+        translate_batch call per hop.
+        
+        Args:
+            texts: Segments to translate
+            source: Source language code or 'auto'
+            target: Target language code
+            format_type: Format of text ('text' or 'html') - currently only 'text' supported
         
         Returns:
-            List of language dictionaries with 'code' and 'name' keys
+            One dictionary per input segment, in input order, with 'translatedText'
+            and 'error' keys (exactly one of them is set)
         """
+        results: List[Dict[str, Optional[str]]] = [
+            {"translatedText": None, "error": None} for _ in texts
+        ]
+        
         if not self._initialized:
             logger.error("Translation service not initialized")
-            return None
+            for result in results:
+                result["error"] = "Translation service not initialized"
+            return results
         
-        try:
-            # Refresh installed packages list to get latest packages
-            # This ensures we detect newly installed packages
-            import argostranslate.package
-            current_installed = argostranslate.package.get_installed_packages()
+        # Detect every segment's language in one vectorized pass
+        sources = [source] * len(texts)
+        if source == "auto":
+            detected = self.detect_languages(texts, k=1) or []
+            sources = [item["language"] for item in detected] or ["en"] * len(texts)
+        
+        # Group segment indices by language pair
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for i, item_source in enumerate(sources):
+            groups.setdefault((item_source, target), []).append(i)
+        
+        with self._traffic_lock:
+            self._traffic.update(groups.keys())
+        
+        for (group_source, group_target), indices in groups.items():
+            if group_source == group_target:
+                for i in indices:
+                    results[i]["translatedText"] = texts[i]
+                continue
             
-            languages_dict = {}
+            path = self._find_translation_path(group_source, group_target)
+            if not path:
+                error_key = f"no_package_{group_source}_{group_target}"
+                if self._should_log_error(error_key):
+                    logger.error(f"No translation path available for {group_source} -> {group_target}")
+                for i in indices:
+                    results[i]["error"] = f"No translation package available for {group_source} -> {group_target}"
+                continue
             
-            # Get unique languages from installed packages
-            for package in current_installed:
-                from_code = package.from_code
-                to_code = package.to_code
-                
-                # Add source language
-                if from_code not in languages_dict:
-                    languages_dict[from_code] = self._get_language_name(from_code)
-                
-                # Add target language
-                if to_code not in languages_dict:
-                    languages_dict[to_code] = self._get_language_name(to_code)
+            # Serve what we can from the result cache, only misses go to the model
+            model_version = self._path_version(path)
+            cache_keys = {
+                i: make_cache_key(texts[i], group_source, group_target, model_version)
+                for i in indices
+            }
+            misses = []
+            for i in indices:
+                cached = self._cache.get(cache_keys[i])
+                if cached is not None:
+                    results[i]["translatedText"] = cached
+                else:
+                    misses.append(i)
+            if not misses:
+                continue
+            
+            try:
+                current_texts = [texts[i] for i in misses]
+                for from_lang, to_lang in zip(path, path[1:]):
+                    current_texts = self._translate_segments(current_texts, from_lang, to_lang)
+                for i, translated_text in zip(misses, current_texts):
+                    results[i]["translatedText"] = translated_text
+                    self._cache.set(cache_keys[i], translated_text)
+            except Exception as e:
+                logger.error(f"Batch translation failed for {group_source} -> {group_target}: {e}")
+                for i in misses:
+                    results[i]["error"] = "Translation failed"
+        
+        return results
+    
+    def _translate_along_path(self, text: str, path: List[str]) -> str:
+        """
+        Translate text hop by hop along a language path, using the result cache.
+        
+        Args:
+            text: Text to translate
+            path: Language codes from source to target (two codes for a direct package)
+        
+        Returns:
+            Translated text
+        """
+        model_version = self._path_version(path)
+        cache_key = make_cache_key(text, path[0], path[-1], model_version)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        if self._sentence_cache.enabled:
+            current_text = self._translate_by_sentence(text, path, model_version)
+        else:
+            current_text = text
+            for from_lang, to_lang in zip(path, path[1:]):
+                # Translate with the translator touch() hands out, so a concurrent
+                # eviction cannot make Argos reload the model outside the budget
+                current_text = self._translate_segments([current_text], from_lang, to_lang)[0]
+        
+        self._cache.set(cache_key, current_text)
+        return current_text
+    
+    def _translate_by_sentence(self, text: str, path: List[str], model_version: str) -> str:
+        """
+        Translate text sentence by sentence, sending only uncached sentences to the model.
+        
+        Args:
+            text: Text to translate
+            path: Language codes from source to target
+            model_version: Package versions along the path (see _path_version)
+        
+        Returns:
+            Translated text with the original whitespace between sentences
+        """
+        spans = split_sentences(text)
+        if not spans:
+            return text
+        
+        sentences = [text[start:end] for start, end in spans]
+        keys = [make_cache_key(sentence, path[0], path[-1], model_version) for sentence in sentences]
+        translated: List[Optional[str]] = [self._sentence_cache.get(key) for key in keys]
+        
+        # Each distinct uncached sentence goes to the model once, as a single batch
+        misses: Dict[str, str] = {}
+        for key, sentence, result in zip(keys, sentences, translated):
+            if result is None:
+                misses.setdefault(key, sentence)
+        
+        if misses:
+            miss_keys = list(misses)
+            current_texts = [misses[key] for key in miss_keys]
+            for from_lang, to_lang in zip(path, path[1:]):
+                current_texts = self._translate_segments(current_texts, from_lang, to_lang)
+            fresh = dict(zip(miss_keys, current_texts))
+            for key, result in fresh.items():
+                self._sentence_cache.set(key, result)
+            translated = [result if result is not None else fresh[key] for key, result in zip(keys, translated)]
+        
+        return join_sentences(text, spans, translated)
+    
+    def _path_version(self, path: List[str]) -> str:
+        """Describe the package versions used along a path, for cache keys."""
+        return "|".join(
+            f"{from_lang}-{to_lang}@{self._index.versions.get((from_lang, to_lang), '')}"
+            for from_lang, to_lang in zip(path, path[1:])
+        )
+    
+    def _set_installed_packages(self, packages: List[Any]):
+        """
+        Replace the installed package list and rebuild the package index.
+        
+        The index is built first and swapped in with a single assignment so
+        concurrent requests never see a half-built index; translation handles
+        and routes are rebuilt before the swap, so a pair is only advertised
+        once it can be translated. Concurrent reloads are serialized. The result caches
+        are invalidated whenever the set of installed (from, to, version)
+        packages changes.
+        """
+        index = PackageIndex(packages)
+        with self._packages_lock:
+            # Handles and routes for new pairs exist before the index advertises them
+            if index.fingerprint != self._index.fingerprint:
+                self._build_translations(packages)
+                self._routes.rebuild(index)
+            self._installed_packages = packages
+            self._index = index
             
-            # Convert to list format
-            languages = [
-                {"code": code, "name": name}
-                for code, name in sorted(languages_dict.items())
-            ]
+            self._cache.sync_fingerprint(index.fingerprint)
+            self._sentence_cache.sync_fingerprint(index.fingerprint)
+    
+    def _build_translations(self, packages: List[Any]):
+        """
+        Resolve a translation handle for every installed package, once.
+        
+        argostranslate.translate.translate() rescans the package directories and
+        rebuilds every Language/Translation object on each call; holding the
+        handles here leaves only inference on the request path. Pivot routes are
+        chains of these per-hop handles. Handles of unchanged packages are kept
+        so their loaded CTranslate2 models survive a rebuild.
+        """
+        if argostranslate is None:
+            return
+        
+        languages: Dict[str, Any] = {}
+        translations: Dict[Tuple[str, str], Any] = {}
+        for pkg in packages:
+            if getattr(pkg, "type", "translate") != "translate":
+                continue
+            pair = (pkg.from_code, pkg.to_code)
             
-            # Update cached installed packages list
-            self._installed_packages = current_installed
+            existing = self._translations.get(pair)
+            if existing is not None and getattr(existing.pkg, "package_path", None) == pkg.package_path \
+                    and getattr(existing.pkg, "package_version", None) == getattr(pkg, "package_version", None):
+                translations[pair] = existing
+                continue
             
-            return languages
-        except Exception as e:
-            logger.error(f"Failed to get languages: {e}")
+            for code, name in ((pkg.from_code, pkg.from_name), (pkg.to_code, pkg.to_name)):
+                if code not in languages:
+                    languages[code] = argostranslate.translate.Language(code, name)
+            translations[pair] = argostranslate.translate.PackageTranslation(
+                languages[pkg.from_code], languages[pkg.to_code], pkg
+            )
+        
+        self._translations = translations
+        self._residency.forget_missing(translations)
+        logger.debug(f"Resolved {len(translations)} translation handles")
+    
+    def _get_translation(self, from_code: str, to_code: str) -> Any:
+        """
+        Get the cached translation handle for an installed package.
+        
+        Raises:
+            LookupError: If no package is installed for the pair
+        """
+        translation = self._translations.get((from_code, to_code))
+        if translation is None:
+            raise LookupError(f"No translation package installed for {from_code} -> {to_code}")
+        return translation
+    
+    def get_routes(self) -> List[Dict[str, Any]]:
+        """Get the precomputed routing table."""
+        return self._routes.describe()
+    
+    def get_model_residency(self) -> Dict[str, Any]:
+        """Report which models are loaded and how much of the memory budget they use."""
+        report = self._residency.stats()
+        report["installed_models"] = len(self._translations)
+        return report
+    
+    def loaded_model_count(self) -> int:
+        """Number of models loaded right now."""
+        return len(self._residency.resident_pairs())
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Return statistics for the document and sentence caches."""
+        return {
+            "results": self._cache.stats(),
+            "sentences": self._sentence_cache.stats()
+        }
+    
+    def _translate_segments(self, texts: List[str], from_code: str, to_code: str) -> List[str]:
+        """
+        Translate segments over a single installed package with one CTranslate2 call.
+        
+        Args:
+            texts: Segments to translate
+            from_code: Source language code
+            to_code: Target language code
+        
+        Returns:
+            Translated segments in input order
+        """
+        # Model load time is not inference latency, so cold calls are not measured
+        was_loaded = getattr(self._translations.get((from_code, to_code)), "translator", None) is not None
+        started = time.perf_counter()
+        translated = self._translate_segments_untimed(texts, from_code, to_code)
+        if was_loaded:
+            self._routes.record_latency(
+                from_code, to_code, time.perf_counter() - started, sum(len(text) for text in texts)
+            )
+        return translated
+    
+    def _translate_segments_untimed(self, texts: List[str], from_code: str, to_code: str) -> List[str]:
+        """Batched translation over one package, see _translate_segments."""
+        translation = self._get_translation(from_code, to_code)
+        # Argos wraps installed packages in a CachedTranslation
+        package_translation = getattr(translation, "underlying", translation)
+        pkg = getattr(package_translation, "pkg", None)
+        if pkg is None or getattr(pkg, "tokenizer", None) is None:
+            # Not a plain package translation, fall back to one call per segment
+            return [translation.translate(text) for text in texts]
+        
+        # Split segments into sentences like Argos does and batch every sentence;
+        # a "sentence" without punctuation that is still too long is cut at spaces
+        spans_per_text = [split_sentences(text) for text in texts]
+        batch_positions: List[Tuple[int, int]] = []
+        batch_tokens: List[List[str]] = []
+        for i, (text, spans) in enumerate(zip(texts, spans_per_text)):
+            for j, (start, end) in enumerate(spans):
+                for piece in _split_long_sentence(text[start:end], _BATCH_MAX_SENTENCE_CHARS):
+                    batch_positions.append((i, j))
+                    batch_tokens.append(pkg.tokenizer.encode(piece))
+        
+        translated_per_text: List[List[List[str]]] = [[[] for _ in spans] for spans in spans_per_text]
+        if batch_tokens:
+            translator = self._residency.touch((from_code, to_code), package_translation)
+            target_prefix = None
+            if getattr(pkg, "target_prefix", ""):
+                target_prefix = [[pkg.target_prefix]] * len(batch_tokens)
+            
+            batch_results = translator.translate_batch(
+                batch_tokens,
+                target_prefix=target_prefix,
+                replace_unknowns=True,
+                max_batch_size=_CT2_MAX_BATCH_SIZE,
+                beam_size=4,
+                num_hypotheses=1,
+                length_penalty=0.2
+            )
+            for (i, j), batch_result in zip(batch_positions, batch_results):
+                translated_per_text[i][j].append(self._decode_tokens(pkg, batch_result.hypotheses[0]))
+        
+        return [
+            join_sentences(text, spans, [" ".join(pieces) for pieces in translated])
+            for text, spans, translated in zip(texts, spans_per_text, translated_per_text)
+        ]
+    
+    @staticmethod
+    def _decode_tokens(pkg: Any, tokens: List[str]) -> str:
+        """Detokenize a CTranslate2 hypothesis the same way Argos does."""
+        value = pkg.tokenizer.decode(tokens)
+        target_prefix = getattr(pkg, "target_prefix", "")
+        if target_prefix and value.startswith(target_prefix):
+            value = value[len(target_prefix):]
+        if value.startswith(" "):
+            # Remove the space added at the beginning by the tokenizer
+            value = value[1:]
+        return value
+    
+    def get_languages(self, include_targets: bool = False) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get list of supported languages.
+        
+        Built once per installed package set and shared between calls, so
+        callers must not modify it.
+        
+        Args:
+            include_targets: Add each language's reachable targets, directly or via pivots
+        
+        Returns:
+            List of language dictionaries with 'code' and 'name' keys (and 'targets')
+        """
+        document = self._get_languages_document(include_targets)
+        return document[0] if document else None
+    
+    def get_languages_json(self, include_targets: bool = False) -> Optional[Tuple[bytes, str]]:
+        """
+        Get the serialized language list and its ETag.
+        
+        Args:
+            include_targets: Add each language's reachable targets, directly or via pivots
+        
+        Returns:
+            (JSON body, quoted ETag), or None if the service is not initialized
+        """
+        document = self._get_languages_document(include_targets)
+        return document[1:] if document else None
+    
+    def _get_languages_document(self, include_targets: bool) -> Optional[Tuple[List[Dict[str, Any]], bytes, str]]:
+        """Language list, its JSON and ETag, rebuilt only when the package set changes."""
+        if not self._initialized:
+            logger.error("Translation service not initialized")
             return None
+        
+        with self._packages_lock:
+            fingerprint = self._index.fingerprint
+            cached = self._languages_cache.get(include_targets)
+            if cached is not None and cached[0] == fingerprint:
+                return cached[1:]
+            
+            try:
+                languages_dict = {}
+                # Get unique languages from installed packages
+                for package in self._installed_packages:
+                    for code in (package.from_code, package.to_code):
+                        if code not in languages_dict:
+                            languages_dict[code] = self._get_language_name(code)
+                
+                reachable = self._routes.reachable_map() if include_targets else {}
+                languages = []
+                for code, name in sorted(languages_dict.items()):
+                    language = {"code": code, "name": name}
+                    if include_targets:
+                        language["targets"] = reachable.get(code, [])
+                    languages.append(language)
+                
+                body = json.dumps(languages, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            except Exception as e:
+                logger.error(f"Failed to get languages: {e}")
+                return None
+            
+            etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+            self._languages_cache[include_targets] = (fingerprint, languages, body, etag)
+            return languages, body, etag
     
     def _get_language_name(self, code: str) -> str:
         """Get human-readable language name from code."""
-        # Comprehensive language names mapping
-        language_names = {
-            # European languages
-            "en": "English",
-            "es": "Spanish",
-            "fr": "French",
-            "de": "German",
-            "it": "Italian",
-            "pt": "Portuguese",
-            "ru": "Russian",
-            "pl": "Polish",
-            "nl": "Dutch",
-            "el": "Greek",
-            "cs": "Czech",
-            "ro": "Romanian",
-            "hu": "Hungarian",
-            "sv": "Swedish",
-            "no": "Norwegian",
-            "nb": "Norwegian Bokmål",
-            "da": "Danish",
-            "fi": "Finnish",
-            "bg": "Bulgarian",
-            "hr": "Croatian",
-            "sr": "Serbian",
-            "sk": "Slovak",
-            "sl": "Slovenian",
-            "lt": "Lithuanian",
-            "lv": "Latvian",
-            "et": "Estonian",
-            "ga": "Irish",
-            "ca": "Catalan",
-            "uk": "Ukrainian",
-            "be": "Belarusian",
-            "is": "Icelandic",
-            "mk": "Macedonian",
-            "sq": "Albanian",
-            # Note: UK regional languages (cy, gd, kw, gv) require custom models
-            # Major world languages
-            "zh": "Chinese",
-            "ja": "Japanese",
-            "ko": "Korean",
-            "ar": "Arabic",
-            "hi": "Hindi",
-            "tr": "Turkish",
-            "he": "Hebrew",
-            "th": "Thai",
-            "vi": "Vietnamese",
-            "id": "Indonesian",
-            "ms": "Malay",
-            "tl": "Tagalog",
-            "sw": "Swahili",
-            "af": "Afrikaans",
-            "az": "Azerbaijani",
-            "eu": "Basque",
-            "bn": "Bengali",
-            "bs": "Bosnian",
-            "br": "Breton",
-            "eo": "Esperanto",
-            "fa": "Persian",
-            "gl": "Galician",
-            "gu": "Gujarati",
-            "ha": "Hausa",
-            "haw": "Hawaiian",
-            "hy": "Armenian",
-            "ig": "Igbo",
-            "jw": "Javanese",
-            "ka": "Georgian",
-            "km": "Khmer",
-            "kn": "Kannada",
-            "kk": "Kazakh",
-            "ky": "Kyrgyz",
-            "lo": "Lao",
-            "lb": "Luxembourgish",
-            "ml": "Malayalam",
-            "mr": "Marathi",
-            "mn": "Mongolian",
-            "my": "Myanmar",
-            "ne": "Nepali",
-            "ps": "Pashto",
-            "pa": "Punjabi",
-            "si": "Sinhala",
-            "so": "Somali",
-            "su": "Sundanese",
-            "tg": "Tajik",
-            "ta": "Tamil",
-            "te": "Telugu",
-            "ur": "Urdu",
-            "uz": "Uzbek",
-            "yi": "Yiddish",
-            "yo": "Yoruba",
-            "zu": "Zulu",
-        }
-        return language_names.get(code, code.upper())
+        return LANGUAGE_NAMES.get(code, code.upper())
     
-    def detect_language(self, text: str) -> Optional[Dict[str, Any]]:
+    def detect_language(self, text: str, k: int = 3) -> Optional[Dict[str, Any]]:
         """
         Detect the language of the given text.
         
+        Scores the text against the character n-gram profile of every
+        installed language (see build_language_profiles()). Until profiles
+        exist, distinctive scripts are recognized and anything else is
+        reported as English with zero confidence.
+        
         Args:
             text: Text to detect language for
+            k: Number of ranked candidates to return
+        
+        Returns:
+            Dictionary with 'language', 'confidence' and ranked 'candidates',
+            or None if detection fails
+        """
+        results = self.detect_languages([text], k)
+        return results[0] if results else None
+    
+    def detect_languages(self, texts: List[str], k: int = 3) -> Optional[List[Dict[str, Any]]]:
+        """
+        Detect the language of every text, scoring the whole batch at once.
+        
+        Args:
+            texts: Texts to detect languages for
+            k: Number of ranked candidates to return per text
         
         Returns:
-            Dictionary with 'language' and 'confidence' keys, or None if detection fails
+            One result per text, as for detect_language(), or None if detection fails
         """
         if not self._initialized:
             logger.error("Translation service not initialized")
             return None
         
         try:
-            # Try to detect by attempting translations with common languages
-            # This is a simple heuristic approach
-            common_languages = ["en", "es", "fr", "de", "it", "pt", "ru", "zh", "ja"]
-            
-            # Get available language pairs
-            available_languages = set()
-            for package in self._installed_packages:
-                available_languages.add(package.from_code)
-                available_languages.add(package.to_code)
-            
-            # Filter to only languages we have models for
-            test_languages = [lang for lang in common_languages if lang in available_languages]
-            
-            if not test_languages:
-                # Fallback to English if no models available
-                return {"language": "en", "confidence": 0.5}
-            
-            # Try to translate to English (most common target)
-            # If it works well, the source is likely correct
-            # This is a simplified detection - for production, use a proper language detection library
-            best_match = test_languages[0]
-            
-            # Simple heuristic: if we have a translation package from this language, use it
-            for lang in test_languages:
-                # Check if we have a package from this language to English
-                for package in self._installed_packages:
-                    if package.from_code == lang and package.to_code == "en":
-                        best_match = lang
-                        break
+            detector = self._current_detector()
+            if detector.ready:
+                if len(texts) == 1:
+                    ranked = [detector.detect(texts[0], k)]
+                else:
+                    ranked = detector.detect_batch(texts, k)
+            else:
+                ranked = [[] for _ in texts]
             
-            return {
-                "language": best_match,
-                "confidence": 0.7  # Simplified detection with moderate confidence
-            }
+            results = []
+            for text, candidates in zip(texts, ranked):
+                if not candidates:
+                    candidates = self._guess_language(text)
+                results.append({
+                    "language": candidates[0]["language"],
+                    "confidence": candidates[0]["confidence"],
+                    "candidates": candidates
+                })
+            return results
         except Exception as e:
             logger.error(f"Language detection failed: {e}")
-            # Fallback: return English
-            return {"language": "en", "confidence": 0.5}
+            return None
+    
+    def _guess_language(self, text: str) -> List[Dict[str, Any]]:
+        """Fallback candidates for texts the detector cannot score."""
+        languages = self._index.languages
+        script_language = detect_script(text, languages)
+        if script_language:
+            return [{"language": script_language, "confidence": 0.5}]
+        default = "en" if "en" in languages or not languages else min(languages)
+        return [{"language": default, "confidence": 0.0}]
+    
+    def stale_language_profiles(self) -> List[str]:
+        """Installed languages reachable from English whose stored profile is missing or out of date."""
+        stored = self._read_profile_samples()
+        stale = []
+        for code in sorted(self._index.languages):
+            route = self._profile_route(code)
+            if route is not None and not self._profile_current(stored.get(code), route[1]):
+                stale.append(code)
+        return stale
+    
+    def build_language_profiles(
+        self,
+        languages: Optional[List[str]] = None,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
+        """
+        Create language detection profiles for installed languages.
+        
+        SEED_SENTENCES is translated from English into each installed language
+        reachable from English (see build_language_profile), and the
+        translations are stored in the profiles file together with the route's
+        package versions. Languages whose route is unchanged reuse their
+        stored text, so after the first run only newly installed languages
+        cost any inference. The profiles file is written and the detector
+        refitted once, after every language is built.
+        
+        The server drives the same steps itself through the inference executor
+        (build_language_profile per stale language, then save_language_profiles),
+        so it never holds a worker for long and runs where the models are served.
+        
+        Args:
+            languages: Only build these languages (None for every stale language)
+            cancel_event: Set it to stop after the current language; what was
+                built so far is still saved
+        
+        Returns:
+            Report with the languages built and skipped, and elapsed seconds
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for language detection profiles")
+        
+        started = time.perf_counter()
+        built: Dict[str, Dict[str, Any]] = {}
+        skipped = []
+        for code in self.stale_language_profiles():
+            if languages is not None and code not in languages:
+                continue
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info("Language profile build cancelled")
+                break
+            entry = self.build_language_profile(code)
+            if entry is None:
+                skipped.append(code)
+            else:
+                built[code] = entry
+        self.save_language_profiles(built)
+        
+        report = {
+            "built": sorted(built),
+            "skipped": skipped,
+            "seconds": round(time.perf_counter() - started, 1)
+        }
+        logger.info(
+            f"Language profiles: {len(built)} built, {len(skipped)} skipped in {report['seconds']}s"
+        )
+        return report
+    
+    def build_language_profile(self, code: str) -> Optional[Dict[str, Any]]:
+        """
+        Translate SEED_SENTENCES into one language along its route from English.
+        
+        Nothing is stored or refitted; pass the results to save_language_profiles().
+        Models loaded only for the build are unloaded again afterwards.
+        
+        Args:
+            code: Language code
+        
+        Returns:
+            Profile entry ({"version", "sentences"}), or None if the language
+            is unreachable from English or translation failed
+        """
+        route = self._profile_route(code)
+        if route is None:
+            return None
+        path, version = route
+        
+        resident = self._residency.resident_pairs()
+        try:
+            sentences = list(SEED_SENTENCES)
+            for from_lang, to_lang in zip(path, path[1:]):
+                sentences = self._translate_segments(sentences, from_lang, to_lang)
+        except Exception as e:
+            logger.warning(f"Could not build language profile for {code}: {e}")
+            return None
+        finally:
+            # Do not let the build keep en->X models that no request asked for
+            for hop in zip(path, path[1:]):
+                if hop not in resident:
+                    self._residency.evict(hop)
+        return {"version": version, "sentences": sentences}
+    
+    def save_language_profiles(self, built: Dict[str, Dict[str, Any]]):
+        """
+        Merge newly built profiles into the profiles file and refit the detector once.
+        
+        Args:
+            built: Profile entries from build_language_profile(), by language code
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for language detection profiles")
+        
+        stored = self._read_profile_samples()
+        samples = dict(stored)
+        samples.update(built)
+        self._profile_samples = samples
+        
+        if self._profiles_path and samples != stored:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self._profiles_path)), exist_ok=True)
+                tmp_path = f"{self._profiles_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump({"updated_at": time.time(), "languages": samples}, f, ensure_ascii=False)
+                os.replace(tmp_path, self._profiles_path)
+            except OSError as e:
+                logger.warning(f"Could not save language profiles to {self._profiles_path}: {e}")
+        if (self._index.fingerprint, self._profiles_mtime()) != self._detector_source or built:
+            with self._detector_lock:
+                self._fit_detector(samples, mtime=self._profiles_mtime())
+    
+    def _profile_route(self, code: str) -> Optional[Tuple[List[str], str]]:
+        """(path from English, route version) used to build a language's profile, or None if unreachable."""
+        if code == "en":
+            return ["en"], "seed"
+        path = self._routes.route("en", code)
+        if not path:
+            return None
+        return path, self._path_version(path)
+    
+    @staticmethod
+    def _profile_current(entry: Optional[Dict[str, Any]], version: str) -> bool:
+        """Check if a stored profile was built along the current route."""
+        return bool(entry) and entry.get("version") == version \
+            and len(entry.get("sentences", ())) == len(SEED_SENTENCES)
+    
+    def _current_detector(self) -> LanguageDetector:
+        """
+        Get the detector, refitting it when packages or the profiles file changed.
+        
+        The profiles file is checked at most every few seconds, which is how
+        worker processes pick up profiles built by another worker.
+        """
+        now = time.monotonic()
+        if self._detector_source is not None and self._detector_source[0] == self._index.fingerprint \
+                and now - self._detector_checked_at < _PROFILES_CHECK_INTERVAL:
+            return self._detector
+        
+        with self._detector_lock:
+            self._detector_checked_at = now
+            source = (self._index.fingerprint, self._profiles_mtime())
+            if source != self._detector_source and np is not None:
+                self._fit_detector(self._read_profile_samples(), mtime=source[1])
+        return self._detector
+    
+    def _fit_detector(self, samples: Dict[str, Dict[str, Any]], mtime: Optional[int]):
+        """Fit a new detector on the samples of installed languages and swap it in."""
+        fingerprint = self._index.fingerprint
+        languages = self._index.languages
+        detector = LanguageDetector()
+        detector.fit({
+            code: entry.get("sentences", [])
+            for code, entry in samples.items() if code in languages
+        })
+        self._detector = detector
+        self._detector_source = (fingerprint, mtime)
+    
+    def _read_profile_samples(self) -> Dict[str, Dict[str, Any]]:
+        """Read stored sample text per language from the profiles file."""
+        if not self._profiles_path:
+            return self._profile_samples
+        if not os.path.exists(self._profiles_path):
+            return {}
+        try:
+            with open(self._profiles_path, 'r') as f:
+                return json.load(f).get("languages", {})
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read language profiles from {self._profiles_path}: {e}")
+            return {}
+    
+    def _profiles_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self._profiles_path).st_mtime_ns if self._profiles_path else None
+        except OSError:
+            return None
+    
+    def warm_up(self, pairs: List[Tuple[str, str]], concurrency: int = 4) -> Dict[str, Any]:
+        """
+        Load the models for hot language pairs and run a dummy translation through each.
+        
+        Every package on the routes of the given pairs is warmed once, in parallel,
+        so the first real requests do not pay for model loading and tokenizer setup.
+        
+        Args:
+            pairs: (source, target) language pairs to warm up
+            concurrency: Number of models loaded at the same time
+        
+        Returns:
+            Dictionary with the warmed hops, failures and elapsed time
+        """
+        started = time.perf_counter()
+        hops = []
+        for source, target in pairs:
+            path = self._find_translation_path(source, target)
+            if path is None:
+                logger.warning(f"Warm-up: no translation path for {source} -> {target}")
+                continue
+            for hop in zip(path, path[1:]):
+                if hop not in hops:
+                    hops.append(hop)
+        
+        def warm(hop: Tuple[str, str]) -> Optional[str]:
+            try:
+                self._translate_segments([_WARMUP_TEXT], hop[0], hop[1])
+                return None
+            except Exception as e:
+                return str(e)
+        
+        failed = {}
+        if hops:
+            logger.info(f"Warming up {len(hops)} models for {len(pairs)} language pairs...")
+            with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="warmup") as pool:
+                for hop, error in zip(hops, pool.map(warm, hops)):
+                    if error:
+                        failed[f"{hop[0]}->{hop[1]}"] = error
+                        logger.warning(f"Warm-up failed for {hop[0]} -> {hop[1]}: {error}")
+        
+        elapsed = time.perf_counter() - started
+        logger.info(f"Warm-up finished in {elapsed:.1f}s ({len(hops) - len(failed)}/{len(hops)} models)")
+        return {
+            "pairs": [f"{source}->{target}" for source, target in pairs],
+            "models": [f"{from_lang}->{to_lang}" for from_lang, to_lang in hops],
+            "failed": failed,
+            "seconds": round(elapsed, 2)
+        }
+    
+    def take_traffic(self) -> Dict[Tuple[str, str], int]:
+        """Get and reset the per-pair request counts recorded since the last call."""
+        with self._traffic_lock:
+            counts, self._traffic = dict(self._traffic), Counter()
+        return counts
+    
+    def record_traffic(self, counts: Dict[Tuple[str, str], int]):
+        """Add per-pair request counts served elsewhere (by inference worker processes)."""
+        if counts:
+            with self._traffic_lock:
+                self._traffic.update(counts)
+    
+    def save_traffic_stats(self, path: str):
+        """
+        Persist per-pair request counts so the next start can warm up the busiest pairs.
+        
+        Counts from the previous file are merged in. Nothing is written if this
+        process served no translations.
+        """
+        with self._traffic_lock:
+            traffic = dict(self._traffic)
+        if not traffic:
+            return
+        try:
+            counts = Counter()
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    for pair, count in json.load(f).get("pairs", {}).items():
+                        counts[pair] = int(count)
+            for (source, target), count in traffic.items():
+                counts[f"{source}-{target}"] += count
+            
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"updated_at": time.time(), "pairs": dict(counts.most_common())}, f, indent=2)
+            os.replace(tmp_path, path)
+            logger.info(f"Saved traffic stats for {len(counts)} language pairs to {path}")
+        except Exception as e:
+            logger.warning(f"Could not save traffic stats to {path}: {e}")
+    
+    @staticmethod
+    def load_hot_pairs(path: str, limit: int) -> List[Tuple[str, str]]:
+        """
+        Get the most requested language pairs recorded by save_traffic_stats().
+        
+        Args:
+            path: Traffic stats file
+            limit: Maximum number of pairs to return
+        
+        Returns:
+            (source, target) pairs, busiest first
+        """
+        if limit <= 0 or not os.path.exists(path):
+            return []
+        try:
+            with open(path, 'r') as f:
+                counts = Counter(json.load(f).get("pairs", {}))
+        except Exception as e:
+            logger.warning(f"Could not read traffic stats from {path}: {e}")
+            return []
+        pairs = []
+        for pair, _count in counts.most_common(limit):
+            source, _, target = pair.partition("-")
+            if source and target:
+                pairs.append((source, target))
+        return pairs
     
     def is_initialized(self) -> bool:
         """Check if the service is initialized."""
@@ -599,30 +1424,25 @@ class TranslationService:
         if not self._initialized:
             return False
         
-        for package in self._installed_packages:
-            if package.from_code == from_code and package.to_code == to_code:
-                return True
-        return False
+        return self._index.has_pair(from_code, to_code)
     
     def _get_available_language_pairs(self) -> List[str]:
         """Get list of available language pairs as strings."""
         if not self._initialized:
             return []
         
-        pairs = []
-        for package in self._installed_packages:
-            pairs.append(f"{package.from_code}->{package.to_code}")
-        return pairs
+        return [f"{from_code}->{to_code}" for from_code, to_code in sorted(self._index.pairs)]
     
-    def _find_translation_path(self, from_code: str, to_code: str, max_depth: int = 3) -> Optional[List[str]]:
+    def _find_translation_path(self, from_code: str, to_code: str) -> Optional[List[str]]:
         """
-        Find a translation path through intermediate languages.
-        Uses breadth-first search to find the shortest path.
+        Find the best translation path, possibly through intermediate languages.
+        
+        Routes are precomputed by the routing table (weighted by measured
+        per-hop latency and optional package quality), so this is a lookup.
         
         Args:
             from_code: Source language code
             to_code: Target language code
-            max_depth: Maximum number of intermediate languages (default: 2)
         
         Returns:
             List of language codes representing the path, or None if no path found
@@ -630,30 +1450,4 @@ class TranslationService:
         if not self._initialized:
             return None
         
-        # If direct path exists, use it
-        if self._has_translation_package(from_code, to_code):
-            return [from_code, to_code]
-        
-        # BFS to find shortest path
-        # Queue: (current_lang, path_so_far)
-        queue = deque([(from_code, [from_code])])
-        visited = {from_code}
-        
-        while queue and len(queue[0][1]) <= max_depth + 1:
-            current_lang, path = queue.popleft()
-            
-            # Check all packages that start from current_lang
-            for package in self._installed_packages:
-                if package.from_code == current_lang:
-                    next_lang = package.to_code
-                    
-                    if next_lang == to_code:
-                        # Found path!
-                        return path + [to_code]
-                    
-                    if next_lang not in visited and len(path) < max_depth + 1:
-                        visited.add(next_lang)
-                        queue.append((next_lang, path + [next_lang]))
-        
-        return None
-
+        return self._routes.route(from_code, to_code)
@@ -0,0 +1,488 @@
+"""User account storage backends."""
+from typing import Optional, Dict, Any, Iterator
+from abc import ABC, abstractmethod
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Columns with a fixed place in the SQLite schema; any other user field is kept in "extra"
+_USER_COLUMNS = ("email", "name", "password_hash", "plan", "api_key_hash", "created_at")
+
+
+def api_key_digest(api_key: str) -> str:
+    """Digest under which an API key is stored and indexed; plaintext keys are never persisted."""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+class UserStore(ABC):
+    """
+    Interface shared by the user storage backends.
+
+    Users are plain dictionaries shaped like the entries of users.json:
+    email, name, password_hash, plan, api_key_hash, created_at and
+    usage = {"used": int, "reset_date": ISO timestamp}. Backends return
+    copies, so callers may modify what they get without affecting the store.
+    A plaintext api_key handed to create(), update() or import_users() (as in
+    users.json files from earlier releases) is replaced by its digest.
+    """
+
+    @abstractmethod
+    def get(self, email: str) -> Optional[Dict[str, Any]]:
+        """Get a user by email."""
+
+    @abstractmethod
+    def get_by_api_key_hash(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Get a user by the digest of their API key (see api_key_digest)."""
+
+    @abstractmethod
+    def create(self, user: Dict[str, Any]):
+        """Add a new user. Raises ValueError if the email is taken."""
+
+    @abstractmethod
+    def update(self, email: str, **fields):
+        """Set top-level fields (plan, api_key_hash, password_hash, ...) of a user. Raises ValueError if not found."""
+
+    @abstractmethod
+    def add_usage(self, email: str, characters: int):
+        """Add characters to a user's usage for the current period."""
+
+    @abstractmethod
+    def add_usage_batch(self, usage: Dict[str, int]):
+        """Add characters to several users' usage atomically (all or nothing)."""
+
+    @abstractmethod
+    def reset_usage(self, email: str, reset_date: str):
+        """Start a new usage period ending at reset_date."""
+
+    @abstractmethod
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over every user."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Get the number of users."""
+
+    @abstractmethod
+    def import_users(self, users: Dict[str, Dict[str, Any]], overwrite: bool = False) -> int:
+        """
+        Import users in the users.json format.
+
+        Args:
+            users: Mapping of email to user dictionary
+            overwrite: Replace users that already exist instead of skipping them
+
+        Returns:
+            Number of users written
+        """
+
+    def close(self):
+        """Release any resources held by the store."""
+
+
+class JsonUserStore(UserStore):
+    """
+    Users kept in a JSON file, as in earlier releases.
+
+    The file is read once and served from memory with an index on the API key
+    digest; every change rewrites the file atomically (temporary file + rename).
+    Plaintext keys left by earlier releases are hashed when the file is read.
+    Suitable for small installations; use SqliteUserStore for anything larger.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the store.
+
+        Args:
+            path: users.json file (created on first write)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._users: Dict[str, Dict[str, Any]] = {}
+        self._by_api_key_hash: Dict[str, str] = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self._users = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Could not read users file {path}: {e}")
+        migrated = 0
+        for email, user in self._users.items():
+            if 'api_key' in user:
+                _hash_api_key(user)
+                migrated += 1
+            if user.get('api_key_hash'):
+                self._by_api_key_hash[user['api_key_hash']] = email
+        if migrated:
+            try:
+                self._save()
+                logger.info(f"Replaced {migrated} plaintext API keys in {path} with their digests")
+            except OSError as e:
+                logger.warning(f"Could not rewrite users file {path}: {e}")
+
+    def get(self, email: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return _copy_user(self._users.get(email))
+
+    def get_by_api_key_hash(self, digest: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            email = self._by_api_key_hash.get(digest)
+            return _copy_user(self._users.get(email)) if email else None
+
+    def create(self, user: Dict[str, Any]):
+        with self._lock:
+            if user['email'] in self._users:
+                raise ValueError("User already exists")
+            self._put(user)
+            self._save()
+
+    def update(self, email: str, **fields):
+        with self._lock:
+            user = self._users.get(email)
+            if user is None:
+                raise ValueError("User not found")
+            fields = _hash_api_key(dict(fields))
+            if 'api_key_hash' in fields and user.get('api_key_hash'):
+                self._by_api_key_hash.pop(user['api_key_hash'], None)
+            user.update(fields)
+            if user.get('api_key_hash'):
+                self._by_api_key_hash[user['api_key_hash']] = email
+            self._save()
+
+    def add_usage(self, email: str, characters: int):
+        with self._lock:
+            user = self._users.get(email)
+            if user is None:
+                return
+            user['usage']['used'] += characters
+            self._save()
+
+    def add_usage_batch(self, usage: Dict[str, int]):
+        with self._lock:
+            applied = []
+            for email, characters in usage.items():
+                user = self._users.get(email)
+                if user is not None:
+                    user['usage']['used'] += characters
+                    applied.append((user, characters))
+            try:
+                self._save()
+            except OSError:
+                for user, characters in applied:
+                    user['usage']['used'] -= characters
+                raise
+
+    def reset_usage(self, email: str, reset_date: str):
+        with self._lock:
+            user = self._users.get(email)
+            if user is None:
+                return
+            user['usage'] = {'used': 0, 'reset_date': reset_date}
+            self._save()
+
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            users = [_copy_user(user) for user in self._users.values()]
+        return iter(users)
+
+    def count(self) -> int:
+        return len(self._users)
+
+    def import_users(self, users: Dict[str, Dict[str, Any]], overwrite: bool = False) -> int:
+        written = 0
+        with self._lock:
+            for email, user in users.items():
+                if email in self._users and not overwrite:
+                    continue
+                self._put(dict(user, email=email))
+                written += 1
+            if written:
+                self._save()
+        return written
+
+    def _put(self, user: Dict[str, Any]):
+        """Insert or replace a user in memory. Caller holds the lock."""
+        previous = self._users.get(user['email'])
+        if previous and previous.get('api_key_hash'):
+            self._by_api_key_hash.pop(previous['api_key_hash'], None)
+        user = _hash_api_key(_copy_user(user))
+        self._users[user['email']] = user
+        if user.get('api_key_hash'):
+            self._by_api_key_hash[user['api_key_hash']] = user['email']
+
+    def _save(self):
+        """Write every user to disk atomically. Caller holds the lock."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._users, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+class SqliteUserStore(UserStore):
+    """
+    Users kept in a SQLite database in WAL mode.
+
+    Lookups by email (primary key) and API key digest (unique index) touch one row,
+    and usage updates are single UPDATE statements, so the cost of
+    authentication and metering does not grow with the number of users.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the store.
+
+        Args:
+            path: SQLite database file (created if missing)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS users ("
+            "email TEXT PRIMARY KEY, name TEXT, password_hash TEXT NOT NULL, "
+            "plan TEXT NOT NULL DEFAULT 'free', api_key_hash TEXT, created_at TEXT, "
+            "used INTEGER NOT NULL DEFAULT 0, reset_date TEXT NOT NULL, "
+            "extra TEXT NOT NULL DEFAULT '{}')"
+        )
+        self._migrate_api_keys()
+        self._db.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_api_key_hash ON users (api_key_hash)"
+        )
+        logger.info(f"User store: {path}")
+
+    def _migrate_api_keys(self):
+        """Replace the plaintext api_key column of databases from earlier releases with api_key_hash."""
+        columns = {row['name'] for row in self._db.execute("PRAGMA table_info(users)")}
+        if 'api_key' not in columns:
+            return
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            if 'api_key_hash' not in columns:
+                self._db.execute("ALTER TABLE users ADD COLUMN api_key_hash TEXT")
+            rows = self._db.execute(
+                "SELECT email, api_key FROM users WHERE api_key IS NOT NULL"
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE users SET api_key_hash = ? WHERE email = ?",
+                [(api_key_digest(row['api_key']), row['email']) for row in rows]
+            )
+            self._db.execute("DROP INDEX IF EXISTS idx_users_api_key")
+            if sqlite3.sqlite_version_info >= (3, 35, 0):
+                self._db.execute("ALTER TABLE users DROP COLUMN api_key")
+            else:
+                # DROP COLUMN needs SQLite 3.35; at least erase the keys
+                self._db.execute("UPDATE users SET api_key = NULL")
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        logger.info(f"Replaced {len(rows)} plaintext API keys in {self.path} with their digests")
+
+    def get(self, email: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM users WHERE email = ?", (email,)).fetchone()
+        return _row_to_user(row)
+
+    def get_by_api_key_hash(self, digest: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM users WHERE api_key_hash = ?", (digest,)).fetchone()
+        return _row_to_user(row)
+
+    def create(self, user: Dict[str, Any]):
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT INTO users (email, name, password_hash, plan, api_key_hash, created_at, "
+                    "used, reset_date, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    _user_to_row(user)
+                )
+            except sqlite3.IntegrityError:
+                raise ValueError("User already exists")
+
+    def update(self, email: str, **fields):
+        fields = _hash_api_key(fields)
+        columns = {name: value for name, value in fields.items() if name in _USER_COLUMNS}
+        extra = {name: value for name, value in fields.items() if name not in _USER_COLUMNS}
+        if 'email' in columns:
+            raise ValueError("Email cannot be changed")
+
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT extra FROM users WHERE email = ?", (email,)).fetchone()
+                if row is None:
+                    raise ValueError("User not found")
+                if extra:
+                    columns['extra'] = json.dumps(dict(json.loads(row['extra']), **extra))
+                if columns:
+                    assignments = ", ".join(f"{name} = ?" for name in columns)
+                    self._db.execute(
+                        f"UPDATE users SET {assignments} WHERE email = ?",
+                        (*columns.values(), email)
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def add_usage(self, email: str, characters: int):
+        with self._lock:
+            self._db.execute(
+                "UPDATE users SET used = used + ? WHERE email = ?", (characters, email)
+            )
+
+    def add_usage_batch(self, usage: Dict[str, int]):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "UPDATE users SET used = used + ? WHERE email = ?",
+                    [(characters, email) for email, characters in usage.items()]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def reset_usage(self, email: str, reset_date: str):
+        with self._lock:
+            self._db.execute(
+                "UPDATE users SET used = 0, reset_date = ? WHERE email = ?", (reset_date, email)
+            )
+
+    def iter_users(self) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM users ORDER BY email").fetchall()
+        return (_row_to_user(row) for row in rows)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def import_users(self, users: Dict[str, Dict[str, Any]], overwrite: bool = False) -> int:
+        verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+        written = 0
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for email, user in users.items():
+                    cursor = self._db.execute(
+                        f"{verb} INTO users (email, name, password_hash, plan, api_key_hash, created_at, "
+                        "used, reset_date, extra) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        _user_to_row(dict(user, email=email))
+                    )
+                    written += cursor.rowcount
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return written
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_user_store(backend: str, path: str) -> UserStore:
+    """
+    Open a user store.
+
+    Args:
+        backend: "sqlite" or "json"
+        path: File backing the store
+
+    Returns:
+        The user store
+    """
+    if backend == "sqlite":
+        return SqliteUserStore(path)
+    if backend == "json":
+        return JsonUserStore(path)
+    raise ValueError(f"Unknown user store backend: {backend}")
+
+
+def hash_users_file(path: str) -> int:
+    """
+    Replace the plaintext API keys in a users.json file with their digests.
+
+    Run after importing the file into another store, so no copy of the raw
+    keys stays on disk. The file is rewritten atomically and remains
+    importable (imports accept api_key_hash).
+
+    Returns:
+        Number of keys replaced
+    """
+    with open(path, 'r') as f:
+        users = json.load(f)
+    replaced = 0
+    for user in users.values():
+        if 'api_key' in user:
+            _hash_api_key(user)
+            replaced += 1
+    if replaced:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(users, f, indent=2)
+        os.replace(tmp_path, path)
+    return replaced
+
+
+def _copy_user(user: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Copy a user dictionary, including its nested usage dictionary."""
+    if user is None:
+        return None
+    copy = dict(user)
+    if isinstance(copy.get('usage'), dict):
+        copy['usage'] = dict(copy['usage'])
+    return copy
+
+
+def _hash_api_key(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace a plaintext api_key in a user dictionary (or update fields) with api_key_hash, in place."""
+    api_key = user.pop('api_key', None)
+    if api_key:
+        user['api_key_hash'] = api_key_digest(api_key)
+    return user
+
+
+def _user_to_row(user: Dict[str, Any]) -> tuple:
+    """Convert a user dictionary to an INSERT parameter tuple."""
+    user = _hash_api_key(dict(user))
+    usage = user.get('usage') or {}
+    extra = {
+        name: value for name, value in user.items()
+        if name not in _USER_COLUMNS and name != 'usage'
+    }
+    return (
+        user['email'],
+        user.get('name'),
+        user['password_hash'],
+        user.get('plan', 'free'),
+        user.get('api_key_hash'),
+        user.get('created_at'),
+        int(usage.get('used', 0)),
+        usage.get('reset_date', ''),
+        json.dumps(extra)
+    )
+
+
+def _row_to_user(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+    """Convert a users row back to the users.json dictionary shape."""
+    if row is None:
+        return None
+    user = json.loads(row['extra'])
+    user.update({name: row[name] for name in _USER_COLUMNS})
+    user['usage'] = {'used': row['used'], 'reset_date': row['reset_date']}
+    return user
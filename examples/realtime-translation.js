@@ -66,6 +66,154 @@ class RealtimeTranslator {
     }
   }
 
+  /**
+   * Translate many texts with a single /translate/batch request.
+   * Returns translations in input order; failed items keep their original text.
+   */
+  async translateBatch(texts, source = 'auto', target = 'en') {
+    const results = texts.slice();
+    const pending = [];
+
+    texts.forEach((text, index) => {
+      if (!text || !text.trim()) return;
+      const cacheKey = `${source}-${target}-${text}`;
+      if (this.cache.has(cacheKey)) {
+        results[index] = this.cache.get(cacheKey);
+      } else {
+        pending.push(index);
+      }
+    });
+
+    if (pending.length === 0) return results;
+
+    try {
+      const headers = { 'Content-Type': 'application/json' };
+      if (this.apiKey) headers['X-API-Key'] = this.apiKey;
+
+      const response = await fetch(`${this.apiUrl}/translate/batch`, {
+        method: 'POST',
+        headers,
+        body: JSON.stringify({ q: pending.map(i => texts[i]), source, target, format: 'text' })
+      });
+
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+      const data = await response.json();
+      data.translations.forEach((item, n) => {
+        const index = pending[n];
+        if (item.translatedText !== null && item.translatedText !== undefined) {
+          results[index] = item.translatedText;
+          this.cache.set(`${source}-${target}-${texts[index]}`, item.translatedText);
+        }
+      });
+    } catch (error) {
+      console.error('Batch translation failed:', error);
+    }
+
+    return results;
+  }
+
+  /**
+   * Translate long text with /translate/stream, calling onProgress(partialText)
+   * as each sentence arrives. Resolves with the full translation.
+   */
+  async translateStream(text, source = 'auto', target = 'en', onProgress = null) {
+    if (!text || !text.trim()) return text;
+
+    const cacheKey = `${source}-${target}-${text}`;
+    if (this.cache.has(cacheKey)) {
+      const cached = this.cache.get(cacheKey);
+      if (onProgress) onProgress(cached);
+      return cached;
+    }
+
+    const headers = { 'Content-Type': 'application/json' };
+    if (this.apiKey) headers['X-API-Key'] = this.apiKey;
+
+    const response = await fetch(`${this.apiUrl}/translate/stream`, {
+      method: 'POST',
+      headers,
+      body: JSON.stringify({ q: text, source, target, format: 'text' })
+    });
+
+    if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+    // Each line is one JSON message: a translated segment, an error, or the final "done"
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let translated = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let newline;
+      while ((newline = buffer.indexOf('\n')) >= 0) {
+        const line = buffer.slice(0, newline).trim();
+        buffer = buffer.slice(newline + 1);
+        if (!line) continue;
+
+        const message = JSON.parse(line);
+        if (message.error) throw new Error(message.error);
+        if (message.done) {
+          translated += message.trailing || '';
+          this.cache.set(cacheKey, translated);
+          return translated;
+        }
+        translated += message.separator + message.translatedText;
+        if (onProgress) onProgress(translated);
+      }
+    }
+
+    return translated;
+  }
+
+  /**
+   * Open a /ws/translate session for as-you-type translation.
+   * Call session.update(text) on every keystroke; onResult(translatedText) only
+   * receives the translation of the latest text, and the server drops work for
+   * text that was superseded before it was translated.
+   */
+  openRealtimeSession(target, onResult, source = 'auto', onError = null) {
+    const wsUrl = new URL('/ws/translate', this.apiUrl.replace(/^http/, 'ws'));
+    if (this.apiKey) wsUrl.searchParams.set('api_key', this.apiKey);
+
+    const socket = new WebSocket(wsUrl);
+    let pending = null;
+    let revision = 0;
+
+    socket.addEventListener('open', () => {
+      if (pending !== null) socket.send(JSON.stringify(pending));
+      pending = null;
+    });
+
+    socket.addEventListener('message', event => {
+      const message = JSON.parse(event.data);
+      // Results for older revisions are never sent, but ignore them defensively
+      if (message.revision !== undefined && message.revision < revision) return;
+      if (message.error) {
+        if (onError) onError(new Error(message.error));
+      } else {
+        onResult(message.translatedText);
+      }
+    });
+
+    return {
+      update: (text) => {
+        revision += 1;
+        const message = { q: text, source, target };
+        if (socket.readyState === WebSocket.OPEN) {
+          socket.send(JSON.stringify(message));
+        } else {
+          pending = message;
+        }
+      },
+      close: () => socket.close()
+    };
+  }
+
   /**
    * Translate a DOM element's text content
    */
@@ -81,7 +229,12 @@ class RealtimeTranslator {
     element.textContent = 'Translating...';
 
     try {
-      const translated = await this.translate(originalText, 'auto', targetLang);
+      // Long text is streamed so the first sentences show up right away
+      const translated = originalText.length > 500
+        ? await this.translateStream(originalText, 'auto', targetLang, partial => {
+            element.textContent = partial;
+          })
+        : await this.translate(originalText, 'auto', targetLang);
       element.textContent = translated;
       element.setAttribute('data-translated', targetLang);
       element.setAttribute('data-original', originalText);
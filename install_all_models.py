@@ -6,7 +6,10 @@ This script installs every available language pair to make the translation
 service world-class with maximum language coverage.
 
 Usage:
-    python install_all_models.py [--model-dir /path/to/models] [--dry-run]
+    python install_all_models.py [--model-dir /path/to/models] [--concurrency 4] [--dry-run]
+
+Downloads run in parallel, resume after interruption, are checksum-verified,
+and packages that are already installed are skipped.
 """
 
 import argparse
@@ -20,6 +23,8 @@ except ImportError:
     print("Error: argostranslate not installed. Install with: pip install argostranslate")
     sys.exit(1)
 
+from app.installer import install_packages
+
 
 def setup_model_directory(model_dir: Optional[str] = None):
     """Set up model directory and symlink."""
@@ -44,7 +49,7 @@ def setup_model_directory(model_dir: Optional[str] = None):
             print(f"✅ Created symlink: {packages_dir} -> {model_dir}")
 
 
-def install_all_models(model_dir: Optional[str] = None, dry_run: bool = False):
+def install_all_models(model_dir: Optional[str] = None, dry_run: bool = False, concurrency: int = 4):
     """Install all available translation models."""
     print("="*70)
     print("INSTALLING ALL AVAILABLE TRANSLATION MODELS")
@@ -77,51 +82,36 @@ def install_all_models(model_dir: Optional[str] = None, dry_run: bool = False):
             print(f"   ... and {len(available_packages) - 20} more")
         return
     
-    # Get already installed packages
+    # Already installed (from, to, version) packages are skipped; partial downloads resume
     installed_packages = argostranslate.package.get_installed_packages()
-    installed_pairs = set(
-        (p.from_code, p.to_code) for p in installed_packages
-    )
     print(f"✅ Found {len(installed_packages)} already installed packages")
     
-    # Filter out already installed
-    packages_to_install = [
-        pkg for pkg in available_packages
-        if (pkg.from_code, pkg.to_code) not in installed_pairs
-    ]
-    
-    print(f"\n📥 Installing {len(packages_to_install)} new packages...")
+    print(f"\n📥 Installing up to {len(available_packages)} packages, {concurrency} at a time...")
     print("   (This may take a long time - each package is 50-500MB)")
     
-    installed_count = 0
-    failed_count = 0
-    failed_packages = []
+    def show_progress(label, status):
+        if status["state"] == "installed":
+            print(f"   ✅ Installed {label}")
+        elif status["state"] == "failed":
+            print(f"   ❌ Failed {label}: {status['error']}")
     
-    for i, package in enumerate(packages_to_install, 1):
-        try:
-            print(f"\n[{i}/{len(packages_to_install)}] Installing {package.from_code} -> {package.to_code}...")
-            download_path = package.download()
-            print(f"   ✅ Downloaded: {download_path}")
-            argostranslate.package.install_from_path(download_path)
-            installed_count += 1
-            print(f"   ✅ Installed successfully")
-        except Exception as e:
-            failed_count += 1
-            failed_packages.append((package.from_code, package.to_code, str(e)))
-            print(f"   ❌ Failed: {e}")
+    report = install_packages(available_packages, concurrency=concurrency, progress=show_progress)
+    installed_count = len(report["installed"])
+    failed_packages = report["failed"]
     
     # Summary
     print("\n" + "="*70)
     print("INSTALLATION SUMMARY")
     print("="*70)
     print(f"✅ Successfully installed: {installed_count} packages")
-    print(f"❌ Failed: {failed_count} packages")
-    print(f"📦 Total installed packages: {len(installed_packages) + installed_count}")
+    print(f"⏭️  Already installed: {len(report['skipped'])} packages")
+    print(f"❌ Failed: {len(failed_packages)} packages")
+    print(f"📦 Downloaded: {report['bytes_downloaded'] / (1024 * 1024):.0f} MB in {report['seconds']}s")
     
     if failed_packages:
         print(f"\n⚠️  Failed packages:")
-        for from_code, to_code, error in failed_packages[:10]:
-            print(f"   {from_code} -> {to_code}: {error}")
+        for failure in failed_packages[:10]:
+            print(f"   {failure['package']}: {failure['error']}")
         if len(failed_packages) > 10:
             print(f"   ... and {len(failed_packages) - 10} more")
     
@@ -150,6 +140,12 @@ def main():
         default=None,
         help="Custom directory for storing models (default: ~/.local/share/argos-translate/packages)"
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Number of packages downloaded in parallel (default: 4)"
+    )
     parser.add_argument(
         "--dry-run",
         action="store_true",
@@ -161,7 +157,8 @@ def main():
     try:
         install_all_models(
             model_dir=args.model_dir,
-            dry_run=args.dry_run
+            dry_run=args.dry_run,
+            concurrency=args.concurrency
         )
         return 0
     except KeyboardInterrupt:
@@ -1,26 +1,44 @@
 """Main application entry point for LibreTranslate server."""
+import asyncio
+import json
 import logging
+import math
+import threading
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Header, Depends, Request
+from fastapi import FastAPI, HTTPException, Header, Depends, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Optional, List, Union
 from pydantic import BaseModel
 
 from app.config import settings
 from app.models import (
     TranslateRequest,
     TranslateResponse,
+    BatchTranslateRequest,
+    BatchTranslateResponse,
+    BatchTranslateResult,
     LanguageInfo,
     DetectRequest,
     DetectResponse,
+    DetectCandidate,
     HealthResponse
 )
 from app.translation import TranslationService
+from app.executor import InferenceExecutor, InferenceQueueFull
+from app.metrics import LatencyTracker
+from app.jobs import JobManager
+from app.segmentation import split_sentences, group_spans
 from app.auth import (
-    create_user, authenticate_user, get_user, update_user_usage,
-    check_usage_limit, get_user_usage, upgrade_user_plan,
-    generate_token, verify_token, get_user_by_api_key
+    create_user, authenticate_user, get_user, reserve_usage, commit_usage,
+    get_user_usage, upgrade_user_plan,
+    generate_token, get_user_by_token, get_user_by_api_key, is_system_api_key,
+    api_key_digest, flush_usage, run_password_task, public_user, regenerate_api_key,
+    PLAN_RATE_LIMITS
 )
+from app.ratelimit import RateLimiter, RateLimitMiddleware, MemoryBucketBackend, SqliteBucketBackend
 
 # Configure logging
 logging.basicConfig(
@@ -32,14 +50,108 @@ logger = logging.getLogger(__name__)
 # Initialize translation service
 translation_service = TranslationService(
     load_only=settings.allowed_languages,
-    model_directory=settings.model_directory
+    model_directory=settings.model_directory,
+    cache_size=settings.translation_cache_size,
+    cache_path=settings.translation_cache_file,
+    sentence_cache_size=settings.sentence_cache_size,
+    route_quality=settings.route_quality_map,
+    model_memory_budget=settings.model_memory_budget_bytes,
+    install_concurrency=settings.install_concurrency,
+    manifest_path=settings.package_manifest_file,
+    language_profiles_path=settings.language_profiles_file
 )
 
+# Worker pool for blocking inference calls
+inference_executor = InferenceExecutor(
+    translation_service,
+    backend=settings.inference_backend,
+    workers=settings.inference_workers,
+    queue_size=settings.inference_queue_size
+)
+
+# Recent end-to-end inference latency (queue wait included), reported by /ready
+inference_latency = LatencyTracker(window_seconds=settings.ready_latency_window)
+
+# Background model installation jobs started from /admin/install-models
+install_jobs = JobManager()
+
+# Startup progress, reported by /ready
+startup_state = {
+    "initialized": False,
+    "warmup": "pending",  # pending, running, done or failed
+    "warmup_report": None
+}
+
+
+async def run_warmup(pairs: list):
+    """Preload hot language pairs in the background; /ready reports not ready until done."""
+    startup_state["warmup"] = "running"
+    try:
+        startup_state["warmup_report"] = await inference_executor.warm_up(
+            pairs, concurrency=settings.warmup_concurrency
+        )
+        startup_state["warmup"] = "done"
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # A failed warm-up only costs latency, it must not keep the node out of rotation
+        logger.error(f"Warm-up failed: {e}")
+        startup_state["warmup"] = "failed"
+
+
+# Set on shutdown to stop a language profile build between languages
+profiles_stop = threading.Event()
+# Serializes profile builds; created with the event loop in lifespan()
+profiles_lock: Optional[asyncio.Lock] = None
+# Event loop the server runs on, for scheduling work from install job threads
+server_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def build_language_profiles():
+    """
+    Build language detection profiles for languages that lack an up-to-date one.
+    
+    Each language is one call on the inference executor, so the build runs in
+    the workers that serve translations (never in the server process with the
+    process backend) and holds at most one worker at a time. The results are
+    saved, and the detector refitted, in one final call.
+    """
+    async with profiles_lock:
+        try:
+            stale = await inference_executor.run_background("stale_language_profiles")
+            if not stale:
+                return
+            logger.info(f"Building language profiles for {len(stale)} languages")
+            built = {}
+            for code in stale:
+                if profiles_stop.is_set():
+                    break
+                entry = await inference_executor.run_background("build_language_profile", code)
+                if entry is not None:
+                    built[code] = entry
+            if built:
+                await inference_executor.run_background("save_language_profiles", built)
+            logger.info(f"Language profiles: {len(built)} built, {len(stale) - len(built)} not built")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Detection falls back to script heuristics until profiles exist
+            logger.error(f"Language profile build failed: {e}")
+
+
+async def run_startup_tasks(pairs: list):
+    """Warm up hot pairs, then build language detection profiles for installed languages."""
+    await run_warmup(pairs)
+    await build_language_profiles()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifespan events."""
+    global profiles_lock, server_loop
     # Startup
+    profiles_lock = asyncio.Lock()
+    server_loop = asyncio.get_running_loop()
     logger.info("Starting LibreTranslate server...")
     logger.info(f"Configuration: host={settings.host}, port={settings.port}")
     
@@ -51,8 +163,8 @@ async def lifespan(app: FastAPI):
     if settings.auto_install_models:
         # Check if any models are installed
         try:
-            import argostranslate.package
-            installed = argostranslate.package.get_installed_packages()
+            # Answered from the package manifest when it is up to date
+            installed = translation_service.load_installed_packages()
             if not installed:
                 logger.info("No models found. Auto-installing default models...")
                 update_models = True
@@ -68,12 +180,32 @@ async def lifespan(app: FastAPI):
         logger.error("Failed to initialize translation service")
         raise RuntimeError("Translation service initialization failed")
     
+    # Warm up configured pairs, or the busiest pairs of the previous run
+    warmup_pairs = settings.warmup_pair_list or TranslationService.load_hot_pairs(
+        settings.traffic_stats_file, settings.warmup_top_pairs
+    )
+    if warmup_pairs:
+        logger.info(f"Warm-up pairs: {', '.join(f'{s}->{t}' for s, t in warmup_pairs)}")
+    
+    # Process workers warm these pairs as they start
+    inference_executor.start(warmup_pairs, settings.warmup_concurrency)
+    startup_state["initialized"] = True
+    warmup_task = asyncio.create_task(run_startup_tasks(warmup_pairs))
+    
     logger.info("Server started successfully")
     
     yield  # Application runs here
     
-    # Shutdown (if needed)
+    # Shutdown
     logger.info("Shutting down server...")
+    warmup_task.cancel()
+    profiles_stop.set()
+    active_job = install_jobs.active()
+    if active_job is not None:
+        install_jobs.cancel(active_job.id)
+    translation_service.save_traffic_stats(settings.traffic_stats_file)
+    flush_usage()
+    inference_executor.shutdown()
 
 
 # Create FastAPI app
@@ -84,6 +216,38 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+def resolve_rate_limit_client(api_key: Optional[str], client_host: Optional[str]):
+    """Identify who a request is charged to for rate limiting: (client id, plan)."""
+    if api_key:
+        if is_system_api_key(api_key):
+            return f"key:{api_key_digest(api_key)}", "system"
+        user = get_user_by_api_key(api_key)
+        if user:
+            return f"key:{api_key_digest(api_key)}", user.get('plan', 'free')
+    return f"ip:{client_host or 'unknown'}", "anonymous"
+
+
+# Rate limiting (added before CORS so 429 responses still carry CORS headers).
+# The middleware only sees HTTP requests; /ws/translate calls rate_limiter itself.
+rate_limiter: Optional[RateLimiter] = None
+if settings.rate_limit_enabled:
+    if settings.rate_limit_backend == "sqlite":
+        rate_limit_backend = SqliteBucketBackend(settings.rate_limit_file)
+    else:
+        rate_limit_backend = MemoryBucketBackend()
+    rate_limiter = RateLimiter(
+        {**PLAN_RATE_LIMITS, **settings.rate_limit_map},
+        rate_limit_backend,
+        burst_seconds=settings.rate_limit_burst
+    )
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=rate_limiter,
+        resolve_client=resolve_rate_limit_client,
+        metered_paths=("/translate", "/translate/batch", "/translate/stream", "/detect"),
+        max_body_bytes=settings.max_request_body_bytes
+    )
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -112,8 +276,7 @@ def verify_api_key(api_key: Optional[str] = Header(None, alias="X-API-Key")) ->
         return user
     
     # Check configured API keys
-    valid_keys = settings.valid_api_keys
-    if valid_keys and api_key in valid_keys:
+    if is_system_api_key(api_key):
         return None  # Valid system API key, no user tracking
     
     raise HTTPException(status_code=403, detail="Invalid API key")
@@ -127,65 +290,180 @@ def verify_api_key_optional(api_key: Optional[str] = Header(None, alias="X-API-K
         if user:
             return user
         # Check configured API keys for tracking
-        valid_keys = settings.valid_api_keys
-        if valid_keys and api_key in valid_keys:
+        if is_system_api_key(api_key):
             return None  # Valid system API key, no user tracking
     return None
 
 
+def reserve_quota(user: dict, characters: int):
+    """Reserve characters from a user's monthly quota, or fail with 403 if the plan limit would be exceeded."""
+    if not reserve_usage(user['email'], characters):
+        limit = get_user_usage(user['email'])['limit']
+        raise HTTPException(
+            status_code=403,
+            detail=f"Usage limit exceeded. Current plan allows {limit:,} characters per month. Please upgrade your plan."
+        )
+
+
+async def run_inference(method: str, *args, **kwargs):
+    """Run a TranslationService method on the inference pool, rejecting work when saturated."""
+    started = time.perf_counter()
+    try:
+        result = await inference_executor.submit(method, *args, **kwargs)
+        inference_latency.record(time.perf_counter() - started)
+        return result
+    except InferenceQueueFull as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
     return HealthResponse(status="ok")
 
 
-@app.post("/admin/install-models")
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness check for load balancers and orchestrators.
+    
+    Returns 503 while initialization or warm-up is still running, when the
+    inference queue is close to full, or when recent p99 latency is above
+    READY_MAX_P99_MS. /health keeps answering 200 in all of these cases.
+    """
+    reasons = []
+    
+    if not startup_state["initialized"]:
+        reasons.append("initializing")
+    elif startup_state["warmup"] not in ("done", "failed"):
+        reasons.append("warming_up")
+    
+    queue_depth = inference_executor.queue_depth
+    queue_capacity = inference_executor.capacity
+    if queue_depth >= queue_capacity * settings.ready_max_queue_ratio:
+        reasons.append("queue_saturated")
+    
+    latency = inference_latency.summary()
+    if settings.ready_max_p99_ms and latency["p99"] is not None and latency["p99"] > settings.ready_max_p99_ms:
+        reasons.append("slow")
+    
+    models = {"installed": 0, "loaded": 0}
+    if translation_service.is_initialized():
+        residency = translation_service.get_model_residency()
+        models = {"installed": residency["installed_models"], "loaded": residency["resident_models"]}
+        if inference_executor.backend == "process":
+            # Models are loaded in the workers; each reports its count with every call
+            per_worker = inference_executor.loaded_models_per_worker()
+            models["loaded"] = min(per_worker.values()) if per_worker else 0
+            models["loaded_per_worker"] = {str(pid): count for pid, count in sorted(per_worker.items())}
+    
+    ready = not reasons
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "reasons": reasons,
+            "initialized": startup_state["initialized"],
+            "warmup": startup_state["warmup"],
+            "models": models,
+            "queue": {
+                "depth": queue_depth,
+                "capacity": queue_capacity,
+                "workers": inference_executor.workers,
+                "backend": inference_executor.backend
+            },
+            "latency_ms": latency
+        }
+    )
+
+
+@app.post("/admin/install-models", status_code=202)
 async def install_models(
     force: bool = False,
     user: Optional[dict] = Depends(verify_api_key)
 ):
     """
-    Trigger model installation/update.
+    Start model installation/update as a background job.
     Requires API key authentication.
     
+    Returns immediately with the job; poll GET /admin/jobs/{job_id} for
+    per-package progress. Translation keeps serving the current models and
+    switches to the new package set when the job finishes.
+    
     Args:
         force: If True, install even if models exist
     """
     import os
-    import argostranslate.package
     
     try:
-        # Check if models should be installed
-        installed = argostranslate.package.get_installed_packages()
+        # Check if models should be installed (packages in memory, no directory scan)
+        installed_count = translation_service.installed_package_count()
         install_all = os.getenv("INSTALL_ALL_LANGUAGES", "false").lower() == "true"
         
-        if not force and installed and not install_all:
-            return {
+        if not force and installed_count and not install_all:
+            return JSONResponse(content={
                 "message": "Models already installed. Set force=true or INSTALL_ALL_LANGUAGES=true to install more.",
-                "installed_count": len(installed),
+                "installed_count": installed_count,
                 "install_all": install_all
-            }
-        
-        # Trigger model installation
-        logger.info("Manual model installation triggered via API")
-        success = translation_service.initialize(update_models=True)
+            })
         
-        if success:
-            final_installed = argostranslate.package.get_installed_packages()
-            languages = translation_service.get_languages()
-            
-            return {
-                "message": "Model installation completed",
-                "installed_packages": len(final_installed),
-                "supported_languages": len(languages) if languages else 0,
-                "languages": languages
-            }
-        else:
-            raise HTTPException(status_code=500, detail="Model installation failed")
-            
+        job, created = install_jobs.start_install(
+            translation_service.install_models,
+            on_complete=finish_install_job
+        )
     except Exception as e:
-        logger.error(f"Failed to install models: {e}")
+        logger.error(f"Failed to start model installation: {e}")
         raise HTTPException(status_code=500, detail=f"Model installation failed: {str(e)}")
+    
+    if created:
+        logger.info(f"Manual model installation triggered via API (job {job.id})")
+    return JSONResponse(
+        status_code=202,
+        content={
+            "message": "Model installation started" if created else "Model installation already in progress",
+            "job": job.to_dict()
+        },
+        headers={"Location": f"/admin/jobs/{job.id}"}
+    )
+
+
+def finish_install_job(job):
+    """Point every worker at the packages a finished install job left on disk."""
+    if not translation_service.is_initialized():
+        translation_service.initialize(update_models=False)
+    inference_executor.packages_changed()
+    # New languages become detectable once their profiles exist. The build is
+    # scheduled on the server loop and runs after the job, not as part of it.
+    if server_loop is not None and not server_loop.is_closed():
+        asyncio.run_coroutine_threadsafe(build_language_profiles(), server_loop)
+
+
+@app.get("/admin/jobs/{job_id}")
+async def get_job(job_id: str, user: Optional[dict] = Depends(verify_api_key)):
+    """Get the state and per-package progress of a background job."""
+    job = install_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.delete("/admin/jobs/{job_id}")
+async def cancel_job(job_id: str, user: Optional[dict] = Depends(verify_api_key)):
+    """
+    Cancel a background job.
+    
+    Packages that finished installing are kept and become available; partial
+    downloads are kept so the next installation resumes them.
+    """
+    job = install_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
 
 
 @app.get("/packages")
@@ -248,25 +526,124 @@ async def get_packages(user: Optional[dict] = Depends(verify_api_key)):
         raise HTTPException(status_code=500, detail=f"Failed to retrieve package information: {str(e)}")
 
 
-@app.get("/languages", response_model=list[LanguageInfo])
-async def get_languages(user: Optional[dict] = Depends(verify_api_key_optional)):
-    """Get list of supported languages. Public endpoint - no authentication required."""
-    languages = translation_service.get_languages()
-    if languages is None:
-        raise HTTPException(status_code=500, detail="Failed to retrieve languages")
+@app.get("/routes")
+async def get_routes(user: Optional[dict] = Depends(verify_api_key)):
+    """Get the precomputed translation routing table (diagnostic endpoint)."""
+    if not translation_service.is_initialized():
+        raise HTTPException(
+            status_code=503,
+            detail="Translation service not available"
+        )
+    
+    routes = translation_service.get_routes()
+    return {
+        "total_routes": len(routes),
+        "pivot_routes": sum(1 for route in routes if route["hops"] > 1),
+        "routes": routes
+    }
+
+
+@app.get("/models")
+async def get_models(user: Optional[dict] = Depends(verify_api_key)):
+    """
+    Get loaded models and memory budget usage (diagnostic endpoint).
+    
+    With the process backend every worker has its own models and budget, so
+    the report lists each worker.
+    """
+    if not translation_service.is_initialized():
+        raise HTTPException(
+            status_code=503,
+            detail="Translation service not available"
+        )
+    
+    if inference_executor.backend != "process":
+        return translation_service.get_model_residency()
+    
+    reports = await inference_executor.collect("get_model_residency")
+    return {
+        "backend": "process",
+        "installed_models": translation_service.get_model_residency()["installed_models"],
+        "resident_models": sum(report["resident_models"] for report in reports.values()),
+        "resident_bytes": sum(report["resident_bytes"] for report in reports.values()),
+        "workers": [dict(report, pid=pid) for pid, report in sorted(reports.items())]
+    }
+
+
+def sum_cache_stats(reports: list) -> dict:
+    """Add up the hit/miss counters and sizes of several workers' cache stats."""
+    total = {
+        name: sum(report.get(name) or 0 for report in reports)
+        for name in ("hits", "disk_hits", "misses", "memory_entries")
+    }
+    lookups = total["hits"] + total["misses"]
+    total["hit_rate"] = round(total["hits"] / lookups, 4) if lookups else 0.0
+    return total
+
+
+@app.get("/admin/cache")
+async def get_cache_stats(user: Optional[dict] = Depends(verify_api_key)):
+    """
+    Get translation result cache statistics (diagnostic endpoint).
     
-    # Convert to LanguageInfo format
-    result = []
-    for lang in languages:
-        if isinstance(lang, dict):
-            code = lang.get("code", "")
-            name = lang.get("name", code)
-            result.append(LanguageInfo(code=code, name=name))
-        else:
-            # Handle case where languages might be returned in different format
-            logger.warning(f"Unexpected language format: {lang}")
+    With the process backend each worker has its own caches; the counters
+    are summed and each worker's stats are listed.
+    """
+    if inference_executor.backend != "process":
+        return translation_service.get_cache_stats()
     
-    return result
+    reports = await inference_executor.collect("get_cache_stats")
+    return {
+        "backend": "process",
+        "results": sum_cache_stats([report["results"] for report in reports.values()]),
+        "sentences": sum_cache_stats([report["sentences"] for report in reports.values()]),
+        "workers": [dict(report, pid=pid) for pid, report in sorted(reports.items())]
+    }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+@app.get("/languages", response_model=list[LanguageInfo], response_model_exclude_none=True)
+async def get_languages(
+    targets: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    user: Optional[dict] = Depends(verify_api_key_optional)
+):
+    """
+    Get list of supported languages. Public endpoint - no authentication required.
+    
+    The response is serialized once per installed package set and carries an
+    ETag; requests with a matching If-None-Match get 304 Not Modified.
+    
+    Args:
+        targets: Include each language's reachable targets (direct and via pivot)
+    """
+    # Pick up packages installed or removed outside this server (a stat when nothing
+    # changed, but a rescan and manifest rewrite when something did)
+    if translation_service.is_initialized() and await asyncio.to_thread(translation_service.refresh_packages):
+        inference_executor.packages_changed()
+    
+    document = translation_service.get_languages_json(include_targets=targets)
+    if document is None:
+        raise HTTPException(status_code=500, detail="Failed to retrieve languages")
+    body, etag = document
+    
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.languages_cache_max_age}"
+    }
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.post("/translate", response_model=TranslateResponse)
@@ -281,67 +658,361 @@ async def translate(
             detail="Translation service not available"
         )
     
-    # Check usage limit for authenticated users
+    # Reserve usage for authenticated users; settled below whatever happens
+    text_length = len(request.q)
     if user:
-        text_length = len(request.q)
-        if not check_usage_limit(user['email'], text_length):
-            limit = get_user_usage(user['email'])['limit']
+        reserve_quota(user, text_length)
+    used = 0
+    
+    try:
+        translated_text = await run_inference(
+            "translate",
+            text=request.q,
+            source=request.source,
+            target=request.target,
+            format_type=request.format
+        )
+        
+        if translated_text is None:
             raise HTTPException(
-                status_code=403,
-                detail=f"Usage limit exceeded. Current plan allows {limit:,} characters per month. Please upgrade your plan."
+                status_code=400,
+                detail="Translation failed"
             )
+        used = text_length
+    finally:
+        if user:
+            commit_usage(user['email'], text_length, used)
     
-    translated_text, error_message = translation_service.translate(
-        text=request.q,
-        source=request.source,
-        target=request.target,
-        format_type=request.format
-    )
+    return TranslateResponse(translatedText=translated_text)
+
+
+@app.post("/translate/batch", response_model=BatchTranslateResponse)
+async def translate_batch(
+    request: BatchTranslateRequest,
+    user: Optional[dict] = Depends(verify_api_key)
+):
+    """Translate many segments in one request. Results are returned in input order."""
+    if not translation_service.is_initialized():
+        raise HTTPException(
+            status_code=503,
+            detail="Translation service not available"
+        )
     
-    if translated_text is None:
+    if len(request.q) > settings.batch_max_items:
         raise HTTPException(
             status_code=400,
-            detail=error_message or "Translation failed"
+            detail=f"Too many segments. A batch may contain at most {settings.batch_max_items} items."
         )
     
-    # Update usage for authenticated users
+    # Reserve usage for authenticated users; settled below whatever happens
+    text_length = sum(len(text) for text in request.q)
     if user:
-        update_user_usage(user['email'], len(request.q))
+        reserve_quota(user, text_length)
+    used = 0
     
-    return TranslateResponse(translatedText=translated_text)
+    try:
+        results = await run_inference(
+            "translate_batch",
+            texts=request.q,
+            source=request.source,
+            target=request.target,
+            format_type=request.format
+        )
+        
+        # Only successfully translated segments count towards usage
+        used = sum(
+            len(text) for text, result in zip(request.q, results)
+            if result["translatedText"] is not None
+        )
+    finally:
+        if user:
+            commit_usage(user['email'], text_length, used)
+    
+    return BatchTranslateResponse(
+        translations=[BatchTranslateResult(**result) for result in results]
+    )
+
+
+@app.post("/translate/stream")
+async def translate_stream(
+    request: TranslateRequest,
+    http_request: Request,
+    user: Optional[dict] = Depends(verify_api_key)
+):
+    """
+    Translate a long text and stream the result sentence by sentence.
+    
+    Each translated chunk is sent as soon as it is ready, in order, as one
+    NDJSON line (or a Server-Sent Event when the client accepts
+    text/event-stream) with its offset and length in the original text and the
+    whitespace that preceded it. A final {"done": true} message follows.
+    """
+    if not translation_service.is_initialized():
+        raise HTTPException(
+            status_code=503,
+            detail="Translation service not available"
+        )
+    
+    text_length = len(request.q)
+    if user:
+        reserve_quota(user, text_length)
+    
+    source = request.source
+    chunks = group_spans(split_sentences(request.q), settings.stream_chunk_chars)
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+    
+    def encode(message: dict) -> str:
+        line = json.dumps(message, ensure_ascii=False)
+        return f"data: {line}\n\n" if use_sse else f"{line}\n"
+    
+    # The reservation is settled once, by whichever runs first: the generator's
+    # finally, or the response's background task (which also runs when the client
+    # disconnects before the generator starts, so its finally never runs)
+    metered = {"used": 0, "settled": False}
+    
+    def settle_usage():
+        if user and not metered["settled"]:
+            metered["settled"] = True
+            commit_usage(user['email'], text_length, metered["used"])
+    
+    async def generate():
+        nonlocal source
+        position = 0
+        try:
+            if source == "auto":
+                detected = await run_inference("detect_language", request.q)
+                source = detected.get("language", "en") if detected else "en"
+            
+            for index, (start, end) in enumerate(chunks):
+                translated = await run_inference(
+                    "translate",
+                    text=request.q[start:end],
+                    source=source,
+                    target=request.target,
+                    format_type=request.format
+                )
+                if translated is None:
+                    yield encode({"error": "Translation failed", "offset": start})
+                    return
+                metered["used"] += end - start
+                yield encode({
+                    "index": index,
+                    "offset": start,
+                    "length": end - start,
+                    "separator": request.q[position:start],
+                    "translatedText": translated
+                })
+                position = end
+            
+            yield encode({
+                "done": True,
+                "source": source,
+                "trailing": request.q[position:],
+                "segments": len(chunks)
+            })
+        except HTTPException as e:
+            yield encode({"error": e.detail, "offset": position})
+        finally:
+            settle_usage()
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(settle_usage)
+    )
 
 
-@app.post("/detect", response_model=DetectResponse)
+@app.websocket("/ws/translate")
+async def translate_websocket(websocket: WebSocket):
+    """
+    Realtime as-you-type translation over a WebSocket.
+    
+    The API key (X-API-Key header or ?api_key= query parameter) is checked once
+    when the socket opens. The client sends updates, each of which starts a new
+    revision of its text:
+    
+        {"q": "full text", "source": "auto", "target": "es"}
+        {"edit": {"offset": 12, "delete": 3, "insert": "new"}}
+    
+    source/target persist until changed. Only the latest revision is
+    translated: an update cancels the superseded revision's work if it is
+    still queued, and results of superseded revisions are never sent. Each
+    revision that is translated is charged against the plan's rate limits like
+    one /translate request. The server replies with
+    {"revision": n, "translatedText": "..."} or {"revision": n, "error": "..."}
+    (plus "retry_after" in seconds when rate limited).
+    """
+    api_key = websocket.headers.get("x-api-key") or websocket.query_params.get("api_key")
+    try:
+        user = verify_api_key(api_key)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=str(e.detail))
+        return
+    await websocket.accept()
+    
+    rate_limit_client = None
+    if rate_limiter is not None:
+        rate_limit_client = resolve_rate_limit_client(
+            api_key, websocket.client.host if websocket.client else None
+        )
+    
+    session = {"text": "", "source": "auto", "target": None, "revision": 0, "task": None}
+    changed = asyncio.Event()
+    
+    async def translate_latest():
+        while True:
+            await changed.wait()
+            changed.clear()
+            revision = session["revision"]
+            try:
+                await translate_revision(revision, session["text"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Report the failure and keep serving later revisions
+                logger.error(f"WebSocket translation error: {e}")
+                await websocket.send_json({"revision": revision, "error": "Translation failed"})
+    
+    async def translate_revision(revision: int, text: str):
+        if not session["target"]:
+            return
+        if not text.strip() or session["source"] == session["target"]:
+            await websocket.send_json({"revision": revision, "translatedText": text})
+            return
+        
+        if rate_limit_client is not None:
+            wait = await rate_limiter.acheck(rate_limit_client[0], rate_limit_client[1], len(text))
+            if wait:
+                await websocket.send_json({
+                    "revision": revision,
+                    "error": "Rate limit exceeded, please slow down",
+                    "retry_after": max(1, math.ceil(wait))
+                })
+                return
+        
+        if user and not reserve_usage(user['email'], len(text)):
+            await websocket.send_json({"revision": revision, "error": "Usage limit exceeded"})
+            return
+        used = 0
+        task = asyncio.ensure_future(run_inference(
+            "translate",
+            text=text,
+            source=session["source"],
+            target=session["target"]
+        ))
+        session["task"] = task
+        try:
+            await asyncio.wait({task})
+            if task.cancelled() or revision != session["revision"]:
+                return  # Superseded while queued or running
+            try:
+                translated = task.result()
+            except HTTPException as e:
+                await websocket.send_json({"revision": revision, "error": e.detail})
+                return
+            if translated is None:
+                await websocket.send_json({"revision": revision, "error": "Translation failed"})
+                return
+            used = len(text)
+            await websocket.send_json({"revision": revision, "translatedText": translated})
+        finally:
+            session["task"] = None
+            if user:
+                commit_usage(user['email'], len(text), used)
+    
+    worker = asyncio.create_task(translate_latest())
+    try:
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                await websocket.send_json({"error": "Expected a JSON object"})
+                continue
+            
+            text = session["text"]
+            if isinstance(message.get("q"), str):
+                text = message["q"]
+            elif isinstance(message.get("edit"), dict):
+                edit = message["edit"]
+                try:
+                    offset = min(max(int(edit.get("offset", 0)), 0), len(text))
+                    delete = max(int(edit.get("delete", 0)), 0)
+                except (TypeError, ValueError):
+                    await websocket.send_json({"error": "Invalid edit"})
+                    continue
+                text = text[:offset] + str(edit.get("insert", "")) + text[offset + delete:]
+            
+            session["text"] = text
+            session["source"] = message.get("source") or session["source"]
+            session["target"] = message.get("target") or session["target"]
+            session["revision"] += 1
+            
+            # Drop the superseded revision if it is still waiting for a worker
+            if session["task"] is not None:
+                session["task"].cancel()
+            changed.set()
+    except WebSocketDisconnect:
+        pass
+    except ValueError:
+        await websocket.close(code=1003, reason="Messages must be JSON")
+    finally:
+        worker.cancel()
+        if session["task"] is not None:
+            session["task"].cancel()
+
+
+@app.post("/detect", response_model=Union[DetectResponse, List[DetectResponse]])
 async def detect_language(
     request: DetectRequest,
     user: Optional[dict] = Depends(verify_api_key)
 ):
-    """Detect the language of the given text."""
+    """
+    Detect the language of the given text.
+    
+    With a list of texts, every text is scored in one vectorized pass and a
+    list of results is returned in input order. Authentication, rate limiting
+    and quota are applied once for the whole request.
+    """
     if not translation_service.is_initialized():
         raise HTTPException(
             status_code=503,
             detail="Translation service not available"
         )
     
-    result = translation_service.detect_language(request.q)
-    
-    if result is None:
+    texts = [request.q] if isinstance(request.q, str) else request.q
+    if len(texts) > settings.batch_max_items:
         raise HTTPException(
-            status_code=500,
-            detail="Language detection failed"
+            status_code=400,
+            detail=f"Too many texts. A batch may contain at most {settings.batch_max_items} items."
         )
     
-    # Handle different response formats
-    if isinstance(result, dict):
-        language = result.get("language", "")
-        confidence = result.get("confidence", 0.0)
-    else:
-        # Fallback if result format is unexpected
-        logger.warning(f"Unexpected detection result format: {result}")
-        language = str(result) if result else ""
-        confidence = 0.0
+    # Reserve usage for authenticated users; settled below whatever happens
+    text_length = sum(len(text) for text in texts)
+    if user:
+        reserve_quota(user, text_length)
+    used = 0
+    
+    try:
+        results = await run_inference("detect_languages", texts, request.top_k) if texts else []
+        if results is None:
+            raise HTTPException(
+                status_code=500,
+                detail="Language detection failed"
+            )
+        used = text_length
+    finally:
+        if user:
+            commit_usage(user['email'], text_length, used)
     
-    return DetectResponse(language=language, confidence=confidence)
+    detections = [
+        DetectResponse(
+            language=result["language"],
+            confidence=result["confidence"],
+            candidates=[DetectCandidate(**candidate) for candidate in result["candidates"]]
+        )
+        for result in results
+    ]
+    return detections[0] if isinstance(request.q, str) else detections
 
 
 # Authentication Models
@@ -362,11 +1033,11 @@ class UpgradeRequest(BaseModel):
 async def signup(request: SignupRequest):
     """Create a new user account."""
     try:
-        user = create_user(request.email, request.password, request.name)
+        user = await run_password_task(create_user, request.email, request.password, request.name)
         token = generate_token(user)
         
-        # Remove sensitive data
-        user_data = {k: v for k, v in user.items() if k != 'password_hash'}
+        # Remove sensitive data; the API key is shown this once, only its digest is stored
+        user_data = dict(public_user(user), api_key=user['api_key'])
         
         return {
             "token": token,
@@ -382,7 +1053,7 @@ async def signup(request: SignupRequest):
 @app.post("/api/auth/login")
 async def login(request: LoginRequest):
     """Authenticate user and return token."""
-    user = authenticate_user(request.email, request.password)
+    user = await run_password_task(authenticate_user, request.email, request.password)
     
     if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
@@ -390,7 +1061,7 @@ async def login(request: LoginRequest):
     token = generate_token(user)
     
     # Remove sensitive data
-    user_data = {k: v for k, v in user.items() if k != 'password_hash'}
+    user_data = public_user(user)
     
     return {
         "token": token,
@@ -405,14 +1076,9 @@ def get_current_user(authorization: Optional[str] = Header(None)) -> dict:
     
     try:
         token = authorization.replace("Bearer ", "")
-        email = verify_token(token)
-        
-        if not email:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        user = get_user(email)
+        user = get_user_by_token(token)
         if not user:
-            raise HTTPException(status_code=401, detail="User not found")
+            raise HTTPException(status_code=401, detail="Invalid token")
         
         return user
     except HTTPException:
@@ -432,13 +1098,18 @@ async def update_usage(request: dict, user: dict = Depends(get_current_user)):
     # This is mainly for frontend to sync, actual usage is tracked in translate endpoint
     return get_user_usage(user['email'])
 
+@app.post("/api/user/api-key")
+async def rotate_api_key(user: dict = Depends(get_current_user)):
+    """Replace the user's API key. The new key is returned once; only its digest is stored."""
+    return {"api_key": regenerate_api_key(user['email'])}
+
 @app.post("/api/subscription/upgrade")
 async def upgrade_subscription(request: UpgradeRequest, user: dict = Depends(get_current_user)):
     """Upgrade user subscription plan."""
     try:
         upgrade_user_plan(user['email'], request.plan)
         updated_user = get_user(user['email'])
-        user_data = {k: v for k, v in updated_user.items() if k != 'password_hash'}
+        user_data = public_user(updated_user)
         
         return {
             "user": user_data,
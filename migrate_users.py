@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Import user accounts from users.json into the configured user store.
+
+The server does this automatically the first time it starts with an empty
+SQLite store; use this script to migrate explicitly, to a custom location,
+or to re-import after editing users.json.
+
+Usage:
+    python migrate_users.py [--source users.json] [--target users.sqlite3] [--backend sqlite] [--overwrite]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from app.auth import USERS_FILE
+from app.config import settings
+from app.user_store import open_user_store, hash_users_file
+
+
+def migrate_users(source: str, target: str, backend: str, overwrite: bool = False) -> int:
+    """Copy every user from a users.json file into a user store."""
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Users file not found: {source}")
+
+    with open(source, 'r') as f:
+        users = json.load(f)
+
+    print(f"📦 Found {len(users)} users in {source}")
+
+    store = open_user_store(backend, target)
+    try:
+        written = store.import_users(users, overwrite=overwrite)
+        skipped = len(users) - written
+        print(f"✅ Imported {written} users into {target} ({backend})")
+        if skipped:
+            print(f"⏭️  Skipped {skipped} users that already exist (use --overwrite to replace them)")
+        print(f"👥 Store now holds {store.count()} users")
+    finally:
+        store.close()
+
+    # The store keeps only key digests; do not leave the raw keys in the source file
+    replaced = hash_users_file(source)
+    if replaced:
+        print(f"🔒 Replaced {replaced} plaintext API keys in {source} with their digests")
+    return written
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        description="Import users.json into the user store"
+    )
+    parser.add_argument(
+        "--source",
+        type=str,
+        default=os.path.abspath(USERS_FILE),
+        help="users.json file to import (default: users.json in the project root)"
+    )
+    parser.add_argument(
+        "--target",
+        type=str,
+        default=None,
+        help="Store file to write (default: USER_STORE_PATH or users.sqlite3 in the project root)"
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default="sqlite",
+        choices=["sqlite", "json"],
+        help="User store backend to write (default: sqlite)"
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Replace users that already exist in the target store"
+    )
+
+    args = parser.parse_args()
+
+    target = args.target
+    if target is None:
+        if settings.user_store_path and settings.user_store == args.backend:
+            target = settings.user_store_path
+        else:
+            filename = "users.json" if args.backend == "json" else "users.sqlite3"
+            target = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+
+    try:
+        migrate_users(args.source, target, args.backend, overwrite=args.overwrite)
+        return 0
+    except Exception as e:
+        print(f"\n❌ Error: {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
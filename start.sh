@@ -23,49 +23,15 @@ if [ "${UPDATE_MODELS}" = "true" ] || [ -z "$(ls -A ${MODEL_DIR} 2>/dev/null)" ]
     echo "Installing/updating translation models..."
     echo "This may take several minutes on first run..."
     
-    # Run Python script to install models
-    python << EOF
-import argostranslate.package
-import sys
-
-print("Updating package index...")
-argostranslate.package.update_package_index()
-
-print("Fetching available packages...")
-available_packages = argostranslate.package.get_available_packages()
-print(f"Found {len(available_packages)} available packages")
-
-# Install packages
-if "${LOAD_ONLY:-}" != "":
-    languages = [lang.strip() for lang in "${LOAD_ONLY}".split(",")]
-    print(f"Installing models for languages: {languages}")
-    
-    installed_count = 0
-    for pkg in available_packages:
-        if pkg.from_code in languages or pkg.to_code in languages:
-            try:
-                print(f"Installing {pkg.from_code} -> {pkg.to_code}...")
-                argostranslate.package.install_from_path(pkg.download())
-                installed_count += 1
-            except Exception as e:
-                print(f"Warning: Failed to install {pkg.from_code}->{pkg.to_code}: {e}")
-    
-    print(f"Installed {installed_count} packages")
-else:
-    print("Installing all available models (this may take a while)...")
-    installed_count = 0
-    for pkg in available_packages:
-        try:
-            print(f"Installing {pkg.from_code} -> {pkg.to_code}...")
-            argostranslate.package.install_from_path(pkg.download())
-            installed_count += 1
-        except Exception as e:
-            print(f"Warning: Failed to install {pkg.from_code}->{pkg.to_code}: {e}")
-    
-    print(f"Installed {installed_count} packages")
-
-print("Model installation complete!")
-EOF
+    # Parallel, resumable install; already installed packages are skipped
+    if [ -n "${LOAD_ONLY:-}" ]; then
+        echo "Installing models for languages: ${LOAD_ONLY}"
+        python -m app.installer --languages "${LOAD_ONLY}" --concurrency "${INSTALL_CONCURRENCY:-4}"
+    else
+        echo "Installing all available models (this may take a while)..."
+        python -m app.installer --concurrency "${INSTALL_CONCURRENCY:-4}"
+    fi
+    echo "Model installation complete!"
 else
     echo "Models already installed in ${MODEL_DIR}, skipping download..."
     echo "Set UPDATE_MODELS=true to update models"